@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Script to run the performance benchmarks of the simulator. The suite consists
+of the shipped configurations and a number of scaled-up synthetic ones (see the
+benchmarks directory). All runs use a fixed seed. The results are appended to a
+results file, together with the git commit they were measured on, and compared
+with the most recent results of another commit so regressions are visible.
+
+@file   benchmark.py
+"""
+
+# dependencies
+from lib.Runner import Runner
+
+# 3rd party dependencies
+import os
+import json
+import subprocess
+from datetime import datetime
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+# we need to setup logging configuration here,
+# so all other loggers will properly function
+# and behave the same
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# Find directory of this file
+FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# benchmark suite, as (name, path to configuration)
+SUITE = [(name, os.path.join(FILE_DIR, name + '.json'))
+         for name in ('config', 'one_low', 'one_high', 'one_error', 'one_low_day')]
+SUITE += [(name, os.path.join(FILE_DIR, 'benchmarks', name + '.json'))
+          for name in ('servers_1k', 'hops_10', 'week')]
+
+# seed that all benchmarks are run with
+SEED = 42
+
+# default location of the results file
+RESULTS_FILE = os.path.join(FILE_DIR, 'benchmarks', 'results.jsonl')
+
+# metrics that are compared between commits, and whether higher is better
+METRICS = {
+    "events_per_sec":               True,
+    "transactions_per_sec":         True,
+    "peak_rss_mb":                  False,
+    "log_bytes_per_transaction":    False,
+}
+
+
+def parse_args():
+    "Parses inputs from commandline and returns them as a Namespace object."
+
+    parser = ArgumentParser(prog='benchmark.py',
+                            formatter_class=RawTextHelpFormatter,
+                            description=' Runs the performance benchmarks of the simulator.')
+    parser.add_argument('-b', '--benchmark', action='append',
+                        help='name of a benchmark to run (default: all), can be repeated\n'
+                             'available: ' + ', '.join(name for (name, path) in SUITE))
+    parser.add_argument('-q', '--quick', type=float, default=1, metavar='SCALE',
+                        help='scale the runtime of all benchmarks, e.g. 0.1 for a quick run')
+    parser.add_argument('-n', '--processes', type=int, default=1,
+                        help='number of benchmarks to run in parallel (default: 1, so they\n'
+                             "don't compete for the cpu)")
+    parser.add_argument('-o', '--results', default=RESULTS_FILE,
+                        help='path to the results file')
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help='relative change that is reported as regression (default: 0.1)')
+
+    return parser.parse_args()
+
+
+def commit():
+    """
+    Function to get the git commit the benchmarks run on.
+
+    Returns
+    -------
+    string
+    """
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'],
+                                       cwd=FILE_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous(path, name, current):
+    """
+    Function to find the most recent results of a benchmark on another commit.
+
+    Parameters
+    ----------
+    path: string
+        Path to the results file.
+    name: string
+        Name of the benchmark.
+    current: string
+        Commit the benchmarks currently run on.
+
+    Returns
+    -------
+    dict|None
+    """
+    if not os.path.exists(path):
+        return None
+
+    # the results file is append-only, so the last match is the most recent
+    found = None
+    with open(path) as f:
+        for line in f:
+            result = json.loads(line)
+            if result['name'] == name and result['commit'] != current:
+                found = result
+
+    return found
+
+
+def compare(result, baseline, threshold):
+    """
+    Function to compare the result of a benchmark with a baseline.
+
+    Parameters
+    ----------
+    result: dict
+        Result of the benchmark.
+    baseline: dict
+        Result of the same benchmark on another commit.
+    threshold: float
+        Relative change that counts as regression.
+
+    Returns
+    -------
+    list
+        Lines describing the changes.
+    """
+    lines = []
+
+    for (metric, higher_is_better) in METRICS.items():
+
+        # we can't compare against nothing
+        if not baseline[metric]:
+            continue
+
+        change = (result[metric] - baseline[metric]) / baseline[metric]
+        regression = -change if higher_is_better else change
+
+        lines.append("    {0:<28} {1:>14.2f} -> {2:>14.2f} ({3:+.1%}){4}".format(
+            metric, baseline[metric], result[metric], change,
+            '  REGRESSION' if regression > threshold else ''))
+
+    return lines
+
+
+# run this as main
+if __name__ == "__main__":
+
+    args = parse_args()
+
+    # the benchmarks to run
+    suite = [(name, path) for (name, path) in SUITE
+             if not args.benchmark or name in args.benchmark]
+
+    # load the configurations, all with the same seed
+    configs = []
+    for (name, path) in suite:
+        with open(path) as f:
+            config = json.load(f)
+        config['seed'] = SEED
+        config['runtime'] = max(1, int(config['runtime'] * args.quick))
+        configs.append(config)
+
+    # run the benchmarks, every run in a fresh worker process
+    results = Runner(processes=args.processes).map(configs)
+
+    # we need to know which commit we measured
+    current = commit()
+    date = datetime.now().isoformat(timespec='seconds')
+
+    with open(args.results, 'a') as f:
+        for ((name, path), config, result) in zip(suite, configs, results):
+
+            result.update(name=name, commit=current, date=date, seed=SEED,
+                          runtime=config['runtime'])
+
+            # tell how we did, compared to the last time
+            print("{0:<14} {1:>10.0f} events/s {2:>9.0f} transactions/s {3:>8.1f} MB {4:>8.0f} log bytes/transaction".format(
+                name, result['events_per_sec'], result['transactions_per_sec'],
+                result['peak_rss_mb'], result['log_bytes_per_transaction']))
+
+            baseline = previous(args.results, name, current)
+            if baseline is not None and baseline['runtime'] == result['runtime']:
+                print(f"    compared to {baseline['commit']} ({baseline['date']}):")
+                print("\n".join(compare(result, baseline, args.threshold)))
+
+            # store the result, so later commits can be compared to it
+            f.write(json.dumps(result) + "\n")
+
+    print(f"Results written to {args.results}")
@@ -6,17 +6,15 @@ Script to run the simulation as CLI tool.
 """
 
 # dependencies
-from lib.Environment import Environment
-from lib.MultiServers import MultiServers
-from lib.Servers import Servers
-from lib.Logger import Logger
-from lib.MessageGenerator import MessageGenerator
-from lib.ErrorGenerator import ErrorGenerator
-from lib.Seasonality import TransactionInterval as Seasonality
+from lib.Simulation import simulate
+from lib.Sharding import simulate as simulate_sharded
+from lib.Registry import Registry
+from lib.Analytic import Analytic, validate
+from lib.Checkpoint import load
+from lib.Optimizer import Optimizer
 
 # 3rd party dependencies
 import os
-import glob
 from datetime import datetime
 import json
 from argparse import ArgumentParser, RawTextHelpFormatter
@@ -36,97 +34,82 @@ def parse_args():
                             description=' Runs Simpy simulation from command line.')
     parser.add_argument('-c', '--config',
                         help='path to a json formatted configuration file')
-
-    return parser.parse_args()
-
-
-def main(n, config, seasonality, log_dir, log_prefix, description):
+    parser.add_argument('-s', '--seed', type=int,
+                        help='seed for the random number generators (overrides the config)')
+    parser.add_argument('-r', '--realtime', type=float, metavar='FACTOR',
+                        help='run at a scaled wall clock rate, FACTOR wall clock seconds\n'
+                             'per simulated second (e.g. 0.1 runs ten times faster than real time)')
+    parser.add_argument('-p', '--profile', metavar='PATH',
+                        help='profile where the wall time of the simulation goes, and write\n'
+                             'the profile as collapsed stacks (for flame graphs) to PATH')
+    parser.add_argument('-a', '--analytic', action='store_true',
+                        help='approximate the simulation with queueing theory instead of\n'
+                             'simulating every transaction, results come back in milliseconds')
+    parser.add_argument('--shards', type=int, metavar='N',
+                        help='experimental: run the simulation sharded over N processes by\n'
+                             'kind of server, which needs a network latency > 0 (see --latency),\n'
+                             'and gives the results of a single run with crn and that latency')
+    parser.add_argument('--window', type=float, metavar='SECONDS',
+                        help='simulated time the shards run between synchronizing (default: the\n'
+                             'network_latency), longer is faster but delivers some messages late')
+    parser.add_argument('--latency', type=float, metavar='SECONDS',
+                        help='network latency between two hops of a transaction (overrides the\n'
+                             'network_latency of the config)')
+    parser.add_argument('--validate', action='store_true',
+                        help='compare the analytic approximation against a full simulation')
+    parser.add_argument('-t', '--trace', metavar='PATH',
+                        help='replay the arrivals of a recorded trace (csv or .bin, optionally\n'
+                             'gzipped) instead of drawing them from the seasonality')
+    parser.add_argument('--trace-scale', type=float, default=1, metavar='FACTOR',
+                        help='scale the time of the trace, e.g. 0.5 replays it twice as fast')
+    parser.add_argument('--loop', action='store_true',
+                        help='replay the trace again once it is done')
+    parser.add_argument('--checkpoint', metavar='PATH',
+                        help='periodically write a checkpoint of the simulation to PATH,\n'
+                             'so a run that dies can be resumed with --resume')
+    parser.add_argument('--checkpoint-interval', type=float, default=3600, metavar='SECONDS',
+                        help='simulated time between two checkpoints (default: 3600)')
+    parser.add_argument('--resume', metavar='PATH',
+                        help='continue the simulation of the checkpoint at PATH, with its\n'
+                             'configuration and logfiles (overrides --config)')
+    parser.add_argument('--warmup', nargs='?', const=True, metavar='PATH',
+                        help='detect the end of the warm-up and only keep statistics of the\n'
+                             'steady state, and write a checkpoint of the steady state to PATH')
+    parser.add_argument('--optimize', nargs='?', const=True, metavar='PATH',
+                        help='search the smallest pools that meet the objective (slo) of the\n'
+                             'config, and write the cheapest config to PATH')
+    parser.add_argument('--records', action='store_true',
+                        help='write a summary record of every transaction (latency, outcome,\n'
+                             'queue wait versus service per hop) next to the logs')
+    parser.add_argument('--warm-start', metavar='PATH',
+                        help='start from the steady state checkpoint at PATH of the same\n'
+                             'scenario (see --warmup), and run for the runtime from there')
+
+    args = parser.parse_args()
+
+    # the shards only run the simulation itself, it can't be paced, profiled
+    # or continued, and has no records
+    if args.shards:
+        options = [option for (option, value) in (('--realtime', args.realtime), ('--profile', args.profile),
+                                                  ('--checkpoint', args.checkpoint), ('--resume', args.resume),
+                                                  ('--warmup', args.warmup), ('--warm-start', args.warm_start),
+                                                  ('--records', args.records)) if value]
+        if options:
+            parser.error(f"argument --shards: not allowed with {', '.join(options)}")
+
+    return args
+
+
+def main(n, config, seasonality, log_dir, log_prefix, description, **kwargs):
     """
-    Main loop that runs a simulation. This simulation can be configured by passing
-    a configuration dictionary, and specifying where all logs will be written to.
-
-    Parameters
-    ----------
-    n: int
-        The Nth simulation.
-    config: dict
-        Configuration for the simulation. Should contain the following keys:
-        - servers:      List of dictionaries, describing a server pool.
-        - process:      Sequence of kinds of servers, describing how a process within
-                        the simulation runs.
-        - runtime:      Until when the simulation should run.
-        - max_volumne:  Maximum number of events.
-    seasonality: Seasonality
-        Seasonality object to use for the simulation. This defines the intervals
-        between events.
-    log_dir: string
-        Path pointing to where all logs should be written.
-    log_prefix: string
-        Prefix of every log file.
+    Main loop that runs a simulation.
+    @see lib.Simulation.simulate
 
     Returns
     -------
-    bool
+    string
     """
-    # we need a new environment which we can run.
-    environment = Environment()
-
-    # we need a server pool
-    servers = MultiServers()
-
-    # iterate over all of the servers that need to be configured that
-    # we received from the client
-    for server in config['servers']:
-
-        # append a new server pool to the multiserver system
-        servers.append(
-            Servers(environment, size=server['size'], capacity=server['capacity'], kind=server['kind']))
-
-    # we need a logger that will log all events that happen in the simulation
-    name = "{0}_{1:04d}_{2}_{3}".format(log_prefix, n,
-                                        datetime.now().strftime("%Y-%m-%d_%H-%M"),
-                                        description.replace(" ", "-"))
-    logger = Logger(name, directory=log_dir, show_stdout=False, usequeue=False)
-
-    # we also need a logger for all error events that happen in the simulation
-    error_logger = Logger(f"error-{name}", directory=log_dir, show_stdout=False)
-
-    # Start QueueListener
-    if hasattr(logger, "listener"):
-        logger.listener.start()
-
-    # Enter first line for correct .csv headers
-    logger.log(
-        'Time;Server;Message_type;CPU Usage;Memory Usage;Latency;Transaction_ID;From_Server;Message')
-    error_logger.log('Time;Server;Error type;Start-Stop')
-
-    # we can use the logger for the simulation, so we know where all logs will be written
-    environment.logger(logger)
-    environment.logger(error_logger, type="error")
-
-    # we need a new form of seasonality
-    seasonality = Seasonality(seasonality, enviroment=environment, max_volume=config["max_volume"])
-
-    # now, we can attach the MessageGenerator to the simulation envoirment
-    for proc in config['process']:
-        MessageGenerator(environment, servers, seasonality, kinds=proc, timeout=config['timeout'])
-
-    # Add error generator if specified
-    if 'error' in config:
-        print("With error function")
-        ErrorGenerator(environment, servers, config['error']['errorwait'],
-                       config['error']['error_duration'])
-
-    # run the simulation with a certain runtime (runtime). this runtime is not equivalent
-    # to the current time (measurements). this should be the seasonality of the system.
-    # for example, day or week.
-    environment.run(until=int(config['runtime']))
-
-    # Start QueueListener
-    if hasattr(logger, "listener"):
-        logger.listener.stop()
-
-    return name
+    return simulate(n, config, seasonality, log_dir, log_prefix, description, **kwargs)
 
 
 # run this as main
@@ -138,6 +121,23 @@ if __name__ == "__main__":
     file_dir = os.path.dirname(os.path.abspath(__file__))
 
     args = parse_args()
+
+    # continue a simulation from its last checkpoint
+    if args.resume is not None:
+        snapshot = load(args.resume)
+        meta = snapshot['meta']
+        print(f"Resuming simulation {meta['name']} at {snapshot['time']}")
+
+        location_file = main(n=meta['n'], config=meta['config'], seasonality=meta['seasonality'],
+                             log_dir=meta['log_dir'], log_prefix=meta['log_prefix'],
+                             description=meta['description'], registry=Registry(),
+                             realtime=args.realtime, profile=args.profile, resume=snapshot,
+                             checkpoint=args.checkpoint or args.resume,
+                             checkpoint_interval=args.checkpoint_interval)
+        print(f"Simulation is done and can be found at {os.path.join(meta['log_dir'], location_file)}.")
+        print(f"Total time {datetime.now() - starttime}")
+        exit(0)
+
     # if hasattr(args, "config") & args.config is not None:
     if args.config is not None:
         config_file = args.config
@@ -152,17 +152,97 @@ if __name__ == "__main__":
     with open(config_file) as f:
         config = json.load(f)
 
+    # a seed on the command line takes precedence over the config
+    if args.seed is not None:
+        config['seed'] = args.seed
+
+    # and so does the network latency
+    if args.latency is not None:
+        config['network_latency'] = args.latency
+
+    # replay a trace instead of the seasonality
+    if args.trace is not None:
+        config['trace'] = {"path": args.trace, "scale": args.trace_scale, "loop": args.loop}
+
+    seasonality = os.path.join(file_dir, 'seasonality', 'week.csv')
+
+    # a quick what-if, without running the simulation itself
+    if args.analytic:
+        summary = Analytic(config, seasonality).summary()
+        print("{0:<16} {1:>11} {2:>8} {3:>8} {4:>10} {5:>10} {6:>9}".format(
+            'kind', 'utilization', 'cpu', 'memory', 'wait (s)', 'service (s)', 'timeout'))
+        for (kind, metrics) in summary['kinds'].items():
+            print("{0:<16} {1:>11.3f} {2:>8.3f} {3:>8.3f} {4:>10.4f} {5:>10.4f} {6:>9.4f}".format(
+                kind, metrics['utilization'], metrics['cpu'], metrics['memory'],
+                metrics['wait'], metrics['service'], metrics['timeout']))
+        print(f"Transactions {summary['transactions']:.0f}, of which {summary['timeouts']:.0f} time out, "
+              f"latency {summary['latency']:.4f}s")
+        if summary['saturated']:
+            print(f"Saturated: {', '.join(summary['saturated'])}, their messages are taken to time out, "
+                  f"so the latency is an upper bound")
+        print(f"Total time {datetime.now() - starttime}")
+        exit(0)
+
+    # compare the approximation with a full simulation
+    if args.validate:
+        print("{0:<14} {1:<16} {2:>12} {3:>12} {4:>8}".format(
+            'metric', 'kind', 'analytic', 'simulated', 'error'))
+        for row in validate(config, seasonality):
+            print("{0:<14} {1:<16} {2:>12.4f} {3:>12.4f} {4:>8.1%}".format(
+                row['metric'], row['kind'], row['analytic'], row['simulated'], row['error']))
+        print(f"Total time {datetime.now() - starttime}")
+        exit(0)
+
+    # find the cheapest pools that meet the objective
+    if args.optimize:
+        if 'slo' not in config:
+            print("The config needs an objective (slo) to optimize for")
+            exit(1)
+        result = Optimizer(config, config['slo'], seasonality=seasonality).optimize()
+        print("{0:<16} {1:>10} {2:>10}".format('kind', 'configured', 'optimized'))
+        for server in config['servers']:
+            print("{0:<16} {1:>10} {2:>10}".format(server['kind'], server['size'], result['sizes'][server['kind']]))
+        envelope = result['envelope']
+        print(f"Latency p99 {envelope['latency']['p99']['min']:.4f}-{envelope['latency']['p99']['max']:.4f}s, "
+              f"timeouts {envelope['timeouts']['min']:.2%}-{envelope['timeouts']['max']:.2%}, "
+              f"cost {envelope['cost']['min']:.0f}-{envelope['cost']['max']:.0f} server-seconds, "
+              f"{result['evaluations']} runs")
+        if isinstance(args.optimize, str):
+            with open(args.optimize, 'w') as f:
+                json.dump(result['config'], f, indent=4)
+            print(f"Cheapest config written to {args.optimize}")
+        print(f"Total time {datetime.now() - starttime}")
+        exit(0)
+
     # log_dir = os.path.join(file_dir, "CLI_Logs")
     log_dir = os.path.join(file_dir, "Logs")
-    seasonality = os.path.join(file_dir, 'seasonality', 'week.csv')
     log_prefix = "log"
 
-    # get simulation count by counting number of simulation files in folder
-    n = len(glob.glob(os.path.join(log_dir, log_prefix+'*'))) + 1
+    # reserve the id of the simulation in the registry of simulations
+    registry = Registry()
+    n = registry.reserve(description=config['description'])
+
+    try:
+        # run sharded, if requested
+        if args.shards:
+            location_file = simulate_sharded(n, config, seasonality, log_dir, log_prefix,
+                                             config['description'], registry=registry, shards=args.shards,
+                                             window=args.window)
+
+        # run main
+        else:
+            location_file = main(n=n, config=config, seasonality=seasonality,
+                                 log_dir=log_dir, log_prefix=log_prefix,
+                                 description=config['description'], registry=registry,
+                                 realtime=args.realtime, profile=args.profile,
+                                 checkpoint=args.checkpoint, checkpoint_interval=args.checkpoint_interval,
+                                 warmup=args.warmup, warm=load(args.warm_start) if args.warm_start else None,
+                                 records=args.records)
+
+    # a simulation that fails gives up its id
+    except BaseException:
+        registry.discard(n)
+        raise
 
-    # run main
-    location_file = main(n=n, config=config, seasonality=seasonality,
-                         log_dir=log_dir, log_prefix=log_prefix,
-                         description=config['description'])
     print(f"Simulation is done and can be found at {os.path.join(log_dir,location_file)}.")
     print(f"Total time {datetime.now() - starttime}")
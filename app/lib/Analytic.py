@@ -0,0 +1,513 @@
+"""
+Class for a fast, analytic approximation of a simulation. Instead of simulating
+every transaction, every server is modelled as an M/M/c queue (with c the
+capacity of the server) per segment of the seasonality curve, and the Erlang-C
+formula gives the probability of queueing, the expected queueing delay and the
+probability of a timeout. Results come back in milliseconds, which makes this
+useful for quick what-if sizing.
+
+The approximation follows the semantics of the simulation: a transaction holds
+its request on a server until the end of the transaction (or until it returns
+to a server of the same kind), and the service time of a message is
+exponentially distributed with a mean equal to the cpu usage of the server.
+Since the cpu usage depends on the occupancy, which in turn depends on the
+service times, the occupancy is solved as a fixed point.
+
+A message that times out doesn't stop its transaction, which continues with
+the next hop, so the latency of a transaction is the sum of its hops, each
+truncated at the timeout of its process. A saturated server (with more
+requests than capacity) has no steady state, its messages are taken to
+always time out. Its wait is infinite, and its kind is reported as saturated,
+as the latency of the approximation is no more than an upper bound in that
+regime.
+
+@file   lib/Analytic.py
+@scope  public
+"""
+
+# dependencies
+from lib.Seasonality import Seasonality
+from lib.MessageGenerator import mix
+from lib.ServiceTime import create as service_time
+from lib.Plan import graph, kinds as kinds_of
+
+# 3rd party dependencies
+import math
+
+
+def erlang_c(servers, load):
+    """
+    Function to compute the probability that an arrival has to queue in an
+    M/M/c queue (Erlang-C formula).
+
+    Parameters
+    ----------
+    servers: integer
+        Number of servers (c).
+    load: float
+        Offered load in Erlang (arrival rate times mean holding time).
+
+    Returns
+    -------
+    float
+    """
+    # a saturated queue always queues
+    if load >= servers:
+        return 1.0
+
+    # compute Erlang-B iteratively, this is numerically stable for large c
+    blocking = 1.0
+    for n in range(1, servers + 1):
+        blocking = load * blocking / (n + load * blocking)
+
+    # and convert it to Erlang-C
+    return blocking / (1 - (load / servers) * (1 - blocking))
+
+
+def exceeds(timeout, wait_probability, wait_rate, service_rate):
+    """
+    Function to compute the probability that queueing plus service takes
+    longer than a timeout. The waiting time is zero, or exponential with the
+    given rate (with the given probability), the service time is exponential.
+
+    Parameters
+    ----------
+    timeout: float
+    wait_probability: float
+    wait_rate: float
+    service_rate: float
+
+    Returns
+    -------
+    float
+    """
+    # probability that the service alone takes too long
+    service = math.exp(-service_rate * timeout)
+
+    # the sum of two exponentials is hypoexponential
+    if abs(wait_rate - service_rate) < 1e-9:
+        both = (1 + service_rate * timeout) * service
+    else:
+        both = (wait_rate * service - service_rate * math.exp(-wait_rate * timeout)) / (wait_rate - service_rate)
+
+    return (1 - wait_probability) * service + wait_probability * both
+
+
+def truncated(timeout, wait_probability, wait_rate, service_rate):
+    """
+    Function to compute the expected time until a message is processed or
+    times out, i.e. the mean of queueing plus service truncated at the
+    timeout, @see exceeds.
+
+    Parameters
+    ----------
+    timeout: float
+    wait_probability: float
+    wait_rate: float
+        Zero for a saturated server, whose messages always time out.
+    service_rate: float
+
+    Returns
+    -------
+    float
+    """
+    # a saturated server never gets to the message
+    if not wait_rate:
+        return timeout
+
+    # the mean of an exponential truncated at the timeout
+    service = (1 - math.exp(-service_rate * timeout)) / service_rate
+
+    # the integral of the survival function of the hypoexponential
+    if abs(wait_rate - service_rate) < 1e-9:
+        both = 2 * service - timeout * math.exp(-service_rate * timeout)
+    else:
+        both = (wait_rate * service - service_rate * (1 - math.exp(-wait_rate * timeout)) / wait_rate) / \
+            (wait_rate - service_rate)
+
+    return (1 - wait_probability) * service + wait_probability * both
+
+
+class Analytic(object):
+
+    def __init__(self, config, seasonality, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        config: dict
+            Configuration for the simulation, @see lib.Simulation.simulate.
+        seasonality: string
+            Path to the seasonality file.
+
+        Keyworded parameters
+        --------------------
+        memmax: integer
+            How many times the capacity of a server fits in memory.
+            Default: 10.
+        iterations: integer
+            Maximum number of iterations to find the occupancy.
+            Default: 200.
+        """
+        self._config = config
+        self._seasonality = Seasonality(seasonality)
+        self._memmax = kwargs['memmax'] if 'memmax' in kwargs else 10
+        self._iterations = kwargs['iterations'] if 'iterations' in kwargs else 200
+
+        # pools by kind
+        self._pools = {server['kind']: server for server in config['servers']}
+
+        # models of the service time by kind, if configured
+        self._services = {server['kind']: service_time(server['service'])
+                          for server in config['servers'] if 'service' in server}
+
+        # the processes are the same for every segment, so we compile them once
+        # a graph is flattened into the sequence of kinds it visits
+        self._processes = [self._compile(kinds_of(kinds) if graph(kinds) else kinds) for kinds in config['process']]
+
+        # share of every process in the arrivals, and its timeout, a mix of
+        # processes shares a single stream of arrivals by (static) weight
+        types = mix(config)
+        total = sum(kind_type['weight'] for kind_type in types)
+        self._shares = [kind_type['weight'] / total if 'mix' in config else 1.0 for kind_type in types]
+        self._timeouts = [kind_type['timeout'] for kind_type in types]
+
+    def _compile(self, kinds):
+        """
+        Method to compile a sequence of kinds into a list of hops, where every
+        hop knows until which hop its request is held.
+
+        Parameters
+        ----------
+        kinds: list
+
+        Returns
+        -------
+        list
+            List of (kind, position until which the request is held) tuples.
+        """
+        # the last hop holding each request, by default until the end
+        release = [len(kinds) - 1] * len(kinds)
+
+        # positions of the requests that are still open
+        open = []
+
+        for (position, kind) in enumerate(kinds):
+
+            # returning to a kind releases all requests since its first visit
+            first = next((index for (index, other) in enumerate(open) if kinds[other] == kind), None)
+
+            if first is not None:
+                for other in open[first:] + [position]:
+                    release[other] = position
+                open = open[:first]
+            else:
+                open.append(position)
+
+        return list(zip(kinds, release))
+
+    def segment(self, rate, shares=None):
+        """
+        Method to compute the steady state of the system for a given arrival
+        rate of transactions (per process).
+
+        Parameters
+        ----------
+        rate: float
+            Number of transactions per second of every process.
+        shares: list
+            Optional share of every process in the arrivals, when the weights
+            of a mix vary over time.
+            Default: the static weights of the mix.
+
+        Returns
+        -------
+        dict
+        """
+        shares = self._shares if shares is None else shares
+
+        # mean occupancy (number of held requests) per server, by kind
+        occupancy = {kind: 0.0 for kind in self._pools}
+
+        # per kind metrics, updated every iteration
+        metrics = {}
+
+        for iteration in range(self._iterations):
+
+            # compute the queueing metrics per kind for the current occupancy
+            for (kind, pool) in self._pools.items():
+                capacity, load = pool['capacity'], occupancy[kind]
+
+                # the service time is exponential with the cpu usage as mean,
+                # which includes the arriving request itself, unless it's
+                # modelled, then only its mean is used
+                service = min(load + 1, capacity) / capacity
+                if kind in self._services:
+                    model = self._services[kind]
+                    service = model.mean() * model.factor(service)
+
+                # servers that share their cores slow down all messages once
+                # there are more messages than cores, the messages wait for
+                # I/O on top of that
+                if 'sharing' in pool:
+                    cores = pool['sharing']['cores'] if 'cores' in pool['sharing'] else 1
+                    work = model.mean() * model.factor(min(load + 1, cores) / cores) \
+                        if kind in self._services else 1 / capacity
+                    service = work * max(1.0, min(load + 1, capacity) / cores) + \
+                        (pool['sharing']['io'] if 'io' in pool['sharing'] else 0)
+
+                # probability and mean duration of queueing
+                wait_probability = erlang_c(capacity, load)
+                arrivals = self._arrivals(kind, rate, shares)
+                hold = load / arrivals if arrivals and load else service
+                wait_rate = (capacity - load) / hold if load < capacity else 0.0
+                wait = wait_probability / wait_rate if wait_rate else math.inf
+
+                metrics[kind] = {"service": service, "wait": wait,
+                                 "wait_probability": wait_probability, "wait_rate": wait_rate}
+
+            # compute the new occupancy from the holding times of the requests
+            updated = {kind: 0.0 for kind in self._pools}
+            for (process, share, timeout) in zip(self._processes, shares, self._timeouts):
+                for (position, (kind, release)) in enumerate(process):
+
+                    # the request is held during its own service, and during
+                    # the hops until its release, which each take until they
+                    # time out at most
+                    hold = metrics[kind]['service'] + sum(
+                        truncated(timeout, metrics[other]['wait_probability'], metrics[other]['wait_rate'],
+                                  1 / metrics[other]['service'])
+                        for (other, _) in process[position + 1:release + 1])
+
+                    updated[kind] += rate * share * hold / self._pools[kind]['size']
+
+            # a server can't hold more requests than fit in memory
+            updated = {kind: min(value, self._pools[kind]['capacity'] * self._memmax)
+                       for (kind, value) in updated.items()}
+
+            # stop when the occupancy no longer changes
+            converged = all(abs(updated[kind] - occupancy[kind]) < 1e-6 for kind in occupancy)
+
+            # damp the update, so the iteration does not oscillate
+            occupancy = {kind: (occupancy[kind] + updated[kind]) / 2 for kind in occupancy}
+
+            if converged:
+                break
+
+        # probability that a message times out, and how long it takes at most,
+        # by process and kind, every process has its own timeout
+        outcomes = [{kind: (1.0 if not metrics[kind]['wait_rate'] else
+                            exceeds(timeout, metrics[kind]['wait_probability'], metrics[kind]['wait_rate'],
+                                    1 / metrics[kind]['service']),
+                            truncated(timeout, metrics[kind]['wait_probability'], metrics[kind]['wait_rate'],
+                                      1 / metrics[kind]['service']))
+                     for (kind, _) in process}
+                    for (process, timeout) in zip(self._processes, self._timeouts)]
+
+        # the messages on a kind time out by the timeouts of the processes
+        # that send them
+        visits = {kind: [share * sum(1 for (other, _) in process if other == kind)
+                         for (process, share) in zip(self._processes, shares)] for kind in self._pools}
+
+        # expose the metrics per kind
+        kinds = {}
+        for (kind, pool) in self._pools.items():
+            capacity, load = pool['capacity'], occupancy[kind]
+            current = metrics[kind]
+            saturated = load >= capacity
+            weights = visits[kind]
+
+            # requests in queue, on average
+            queue = math.inf if saturated else current['wait_probability'] * load / (capacity - load)
+
+            kinds[kind] = {
+                "utilization":  min(load / capacity, 1.0),
+                "cpu":          min(load + 1, capacity) / capacity,
+                "memory":       min((load + queue) / (capacity * self._memmax), 1.0),
+                "wait":         current['wait'],
+                "service":      current['service'],
+                "queue":        queue,
+                "arrivals":     self._arrivals(kind, rate, shares),
+                "timeout":      1.0 if saturated else
+                                sum(weight * outcome[kind][0] for (weight, outcome) in zip(weights, outcomes)
+                                    if weight) / (sum(weights) or 1),
+                "saturated":    saturated,
+            }
+
+        # expose the metrics per process, its hops end when they time out
+        processes = []
+        for (process, share, outcome) in zip(self._processes, shares, outcomes):
+            success = 1.0
+            for (kind, _) in process:
+                success *= 1 - outcome[kind][0]
+
+            processes.append({
+                "hops":     [kind for (kind, _) in process],
+                "latency":  sum(outcome[kind][1] for (kind, _) in process),
+                "timeout":  1 - success,
+                "share":    share,
+            })
+
+        return {"rate": rate, "kinds": kinds, "processes": processes}
+
+    def _arrivals(self, kind, rate, shares):
+        """
+        Method to compute the arrival rate of messages on a single server.
+
+        Parameters
+        ----------
+        kind: string
+        rate: float
+            Number of transactions per second of every process.
+        shares: list
+            Share of every process in the arrivals.
+
+        Returns
+        -------
+        float
+        """
+        visits = sum(share for (process, share) in zip(self._processes, shares)
+                     for (other, _) in process if other == kind)
+        return rate * visits / self._pools[kind]['size']
+
+    def segments(self):
+        """
+        Method to compute the steady state of every segment of the seasonality
+        curve within the runtime of the simulation.
+
+        Returns
+        -------
+        list
+            List of dicts with the start, end, and metrics of every segment.
+        """
+        runtime = self._config['runtime']
+        period = self._seasonality.max_time_seasonality
+        times = list(self._seasonality.seasonality_df['time'].values)
+
+        # the simulation uses the closest point of the curve, so a segment
+        # starts and ends halfway between two points
+        edges = [0] + [(a + b) / 2 for (a, b) in zip(times, times[1:])] + [period]
+
+        segments = []
+
+        # the seasonality loops, so we walk over it until the runtime is reached
+        offset = 0
+        while offset < runtime:
+            for (begin, end) in zip(edges, edges[1:]):
+
+                # boundaries of this segment in simulated time
+                begin, end = offset + begin, min(offset + end, runtime)
+                if begin >= end:
+                    continue
+
+                # the volume follows from the seasonality and the max volume, the
+                # interval between transactions is one over a gamma distributed
+                # volume with this shape, so the mean arrival rate is one less
+                volume = self._seasonality.scale(begin) * self._config['max_volume']
+                rate = max(volume - 1, 0.0)
+
+                segment = self.segment(rate)
+                segment.update(start=begin, end=end, volume=volume)
+                segments.append(segment)
+
+            offset += period
+
+        return segments
+
+    def summary(self):
+        """
+        Method to compute the time weighted average of all segments.
+
+        Returns
+        -------
+        dict
+        """
+        segments = self.segments()
+        duration = sum(segment['end'] - segment['start'] for segment in segments) or 1
+
+        def average(kind, metric):
+            return sum(segment['kinds'][kind][metric] * (segment['end'] - segment['start'])
+                       for segment in segments) / duration
+
+        # a transaction that arrives less than its latency before the end of
+        # the runtime is still in flight, so only the part of a segment before
+        # that counts
+        runtime = self._config['runtime']
+
+        def done(segment, process):
+            return max(min(segment['end'], runtime - process['latency']) - segment['start'], 0.0)
+
+        # number of transactions and timeouts that are done within the runtime
+        transactions = sum(segment['rate'] * done(segment, process) * process['share']
+                           for segment in segments for process in segment['processes'])
+        timeouts = sum(segment['rate'] * done(segment, process) * process['share'] * process['timeout']
+                       for segment in segments for process in segment['processes'])
+        latency = sum(segment['rate'] * done(segment, process) * process['share'] * process['latency']
+                      for segment in segments for process in segment['processes'])
+
+        return {
+            "segments":     len(segments),
+            "transactions": transactions,
+            "timeouts":     timeouts,
+            "latency":      latency / transactions if transactions else 0.0,
+            "kinds":        {kind: {metric: average(kind, metric)
+                                    for metric in ('utilization', 'cpu', 'memory', 'wait', 'service', 'timeout')}
+                             for kind in self._pools},
+            "saturated":    sorted({kind for segment in segments
+                                    for (kind, metrics) in segment['kinds'].items() if metrics['saturated']}),
+        }
+
+
+def validate(config, seasonality, **kwargs):
+    """
+    Function to validate the analytic approximation of a configuration against
+    a full simulation of it.
+
+    Parameters
+    ----------
+    config: dict
+        Configuration for the simulation, @see lib.Simulation.simulate.
+    seasonality: string
+        Path to the seasonality file.
+
+    Keyworded parameters
+    --------------------
+    @see lib.Runner.run
+
+    Returns
+    -------
+    list
+        List of dicts comparing the analytic and simulated value of a metric.
+    """
+    # we only need the runner when validating
+    from lib.Runner import run
+
+    # the approximation and the simulation of the same configuration
+    analytic = Analytic(config, seasonality).summary()
+    simulated = run(config, seasonality=seasonality, **kwargs)['statistics']
+
+    def compare(metric, kind, expected, actual):
+        return {"metric": metric, "kind": kind, "analytic": expected, "simulated": actual,
+                "error": abs(expected - actual) / actual if actual else abs(expected)}
+
+    rows = [compare('transactions', '', analytic['transactions'], simulated['transactions'])]
+
+    # the end-to-end latency is only known per process, so we compare the mean
+    # over all processes when there's a single one
+    if len(config['process']) == 1:
+        segments = Analytic(config, seasonality).segments()
+        weights = [segment['rate'] * (segment['end'] - segment['start']) for segment in segments]
+        latency = sum(segment['processes'][0]['latency'] * weight
+                      for (segment, weight) in zip(segments, weights)) / (sum(weights) or 1)
+        rows.append(compare('latency', '', latency, simulated['latency']['mean']))
+
+    for (kind, metrics) in analytic['kinds'].items():
+        counters = simulated['kinds'].get(kind, {"hops": 0, "timeouts": 0, "cpu": 0.0})
+        attempts = counters['hops'] + counters['timeouts']
+
+        rows.append(compare('cpu', kind, metrics['cpu'], counters['cpu']))
+        rows.append(compare('timeout', kind, metrics['timeout'],
+                            counters['timeouts'] / attempts if attempts else 0.0))
+
+    return rows
@@ -0,0 +1,216 @@
+"""
+Class for scaling a pool of servers during a run, instead of keeping its size
+fixed. The autoscaler of a pool looks at the pool every interval and decides
+on the number of servers it needs, by one of the policies:
+
+- target:       target tracking, the pool is sized so its cpu usage is close
+                to the target, e.g. {"policy": "target", "target": 0.6};
+- step:         step scaling, servers are added or removed when the cpu usage
+                crosses a threshold, e.g. {"policy": "step", "steps": [
+                {"above": 0.8, "change": 2}, {"below": 0.3, "change": -1}]},
+                of the steps that apply the largest change is taken;
+- schedule:     scheduled scaling, the pool follows the seasonality, with the
+                given number of servers at its peak, e.g. {"policy":
+                "schedule", "servers": 20}, and it looks ahead over the
+                provisioning delay, so the servers are up in time.
+
+The cpu usage is the mean over the interval, sampled every second (sample).
+The size stays between a minimum (min) and maximum (max). New servers take a
+while to be provisioned (delay), removed servers no longer get messages right
+away, but finish the ones they have, and only a few servers are removed at a
+time (scale_in), since a pool that is too small gets slower and fuller fast.
+After every change the pool isn't scaled again for a while (cooldown), apart
+from scheduled scaling.
+
+A pool is scaled by adding and removing servers one by one, @see
+lib.Servers.add, so the load balancer picks from the pool as before. The
+server-seconds the pool used are its cost, @see lib.Servers.cost.
+
+@file   lib/Autoscaler.py
+@scope  public
+"""
+
+# 3rd party dependencies
+import math
+
+# policies to decide on the number of servers
+POLICIES = ('target', 'step', 'schedule')
+
+
+class Autoscaler(object):
+
+    def __init__(self, envoirment, pool, config, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        pool: Servers
+            Pool of servers to scale.
+        config: dict
+            Configuration of the autoscaler, with the keys policy (default
+            target), min (default 1), max (default four times the size of
+            the pool), interval (default 10), sample (default 1), delay
+            (default 60), cooldown (default 60), scale_in (default 1) and the
+            keys of the policy: target (default 0.6), steps or servers.
+
+        Keyworded parameters
+        --------------------
+        seasonality: Seasonality
+            Seasonality of the arrivals, for scheduled scaling.
+            [optional]
+        """
+        # Set simpy Envoirment
+        self._env = envoirment
+        self._pool = pool
+
+        self._policy = config['policy'] if 'policy' in config else 'target'
+        if self._policy not in POLICIES:
+            raise ValueError(f"unknown autoscaling policy {self._policy}, expected one of {POLICIES}")
+
+        self._minimum = max(config['min'] if 'min' in config else 1, 1)
+        self._maximum = config['max'] if 'max' in config else 4 * len(pool.servers())
+        self._interval = config['interval'] if 'interval' in config else 10
+        self._sample = min(config['sample'] if 'sample' in config else 1, self._interval)
+        self._delay = config['delay'] if 'delay' in config else 60
+        self._cooldown = config['cooldown'] if 'cooldown' in config else 60
+        self._scale_in = config['scale_in'] if 'scale_in' in config else 1
+
+        self._target = config['target'] if 'target' in config else 0.6
+        self._steps = config['steps'] if 'steps' in config else []
+        self._servers = config['servers'] if 'servers' in config else None
+
+        self._seasonality = kwargs['seasonality'] if 'seasonality' in kwargs else None
+        if self._policy == 'schedule' and (self._servers is None or self._seasonality is None):
+            raise ValueError("scheduled scaling needs the number of servers at the peak and a seasonality")
+
+        # servers that are being provisioned, and the moment of the last change
+        self._pending = 0
+        self._changed = None
+
+        # cpu usage sampled since the last decision
+        self._samples = []
+
+        # Initialize autoscaler process
+        self.autoscaler_process = envoirment.process(self.autoscaler())
+
+    def cpu(self):
+        """
+        Method to expose the cpu usage of the pool, the mean of its servers
+        over the samples since the last decision, or right now without them.
+
+        Returns
+        -------
+        float
+        """
+        if self._samples:
+            return sum(self._samples) / len(self._samples)
+
+        return self._usage()
+
+    def _usage(self):
+        """
+        Method to expose the cpu usage of the pool right now.
+
+        Returns
+        -------
+        float
+        """
+        servers = self._pool.servers()
+        return sum(server.cpu() for server in servers) / len(servers)
+
+    def desired(self):
+        """
+        Method to decide on the number of servers the pool needs, by the
+        policy of the autoscaler.
+
+        Returns
+        -------
+        integer
+        """
+        size = len(self._pool.servers()) + self._pending
+
+        if self._policy == 'schedule':
+            # the servers have to be up by the time they are needed
+            desired = math.ceil(self._seasonality.scale(self._env.now + self._delay) * self._servers)
+
+        elif self._policy == 'step':
+            cpu = self.cpu()
+            changes = [step['change'] for step in self._steps
+                       if ('above' in step and cpu > step['above']) or ('below' in step and cpu < step['below'])]
+            desired = size + (max(changes, key=abs) if changes else 0)
+
+        else:
+            # the servers that are up carry the load, the pending ones will
+            desired = math.ceil(len(self._pool.servers()) * self.cpu() / self._target)
+
+        # the pool shrinks slowly
+        desired = max(desired, size - self._scale_in)
+
+        return min(max(desired, self._minimum), self._maximum)
+
+    def autoscaler(self):
+        """
+        Generator method that scales the pool every interval.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        while True:
+
+            # sample the cpu usage until the interval passed
+            self._samples = []
+            for _ in range(max(round(self._interval / self._sample), 1)):
+                yield self._env.timeout(self._sample)
+                self._samples.append(self._usage())
+
+            # the servers that were removed are no longer counted once idle
+            self._pool.cost()
+
+            # a scheduled pool follows the seasonality, the others wait for
+            # the effect of their last change
+            if self._policy != 'schedule' and self._changed is not None and \
+                    self._env.now < self._changed + self._cooldown:
+                continue
+
+            change = self.desired() - (len(self._pool.servers()) + self._pending)
+            if not change:
+                continue
+
+            self._changed = self._env.now
+
+            # new servers take a while to be provisioned
+            for _ in range(change):
+                self._pending += 1
+                timer = self._env.timeout(self._delay)
+                timer.callbacks.append(lambda _: self._provisioned())
+
+            # removed servers only finish what they have
+            for _ in range(-change):
+                server = self._pool.remove()
+                if server is not None:
+                    self._log(server, 'Stop')
+
+    def _provisioned(self):
+        """
+        Method to add a server to the pool, once it is provisioned.
+        """
+        self._pending -= 1
+        self._log(self._pool.add(), 'Start')
+
+    def _log(self, server, state):
+        """
+        Method to log a change of the pool.
+
+        Parameters
+        ----------
+        server: Server
+            Server that was added or removed.
+        state: string
+            Start for a server that was added, Stop for one that was removed.
+        """
+        self._env.log(message=f'{self._env.now};{server.name()};Scale;{state}', type="error")
+        self._env.notify('scale', server=server, kind=self._pool.kind(), state=state.lower(),
+                         size=len(self._pool.servers()))
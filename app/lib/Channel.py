@@ -0,0 +1,152 @@
+"""
+Class for passing messages from a running simulation to other threads, e.g.
+the webclient. The channel is bounded, so a simulation never blocks on, or
+buffers for, a slow reader: when a reader falls behind, the oldest messages
+are dropped.
+
+@file   lib/Channel.py
+@scope  public
+"""
+
+# dependencies
+import time
+import threading
+from collections import deque
+
+
+class Channel(object):
+
+    def __init__(self, maxlen=100):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        maxlen: integer
+            Maximum number of messages kept in the channel.
+            Default: 100.
+        """
+        # bounded collection of (sequence number, message) tuples
+        self._messages = deque(maxlen=maxlen)
+
+        # sequence number of the last published message
+        self._sequence = 0
+
+        # closed state of this channel
+        self._closed = False
+
+        # condition to wake up readers when something happens
+        self._condition = threading.Condition()
+
+    def publish(self, message):
+        """
+        Method to publish a message on the channel.
+
+        Parameters
+        ----------
+        message: mixed
+            Message to publish.
+
+        Returns
+        -------
+        self
+        """
+        with self._condition:
+
+            # store the message, this drops the oldest message when full
+            self._sequence += 1
+            self._messages.append((self._sequence, message))
+
+            # wake up all waiting readers
+            self._condition.notify_all()
+
+        # allow chaining
+        return self
+
+    def close(self):
+        """
+        Method to close the channel, telling readers no more messages follow.
+
+        Returns
+        -------
+        self
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        # allow chaining
+        return self
+
+    def closed(self):
+        """
+        Getter to expose whether the channel is closed.
+
+        Returns
+        -------
+        bool
+        """
+        return self._closed
+
+    def read(self, after=0, timeout=None):
+        """
+        Method to read all messages published after a given sequence number.
+        This blocks until there is at least one such message, the channel is
+        closed or the timeout expires.
+
+        Parameters
+        ----------
+        after: integer
+            Sequence number of the last message that was read.
+        timeout: float
+            Maximum number of seconds to wait (default: wait indefinitely).
+
+        Returns
+        -------
+        tuple
+            Sequence number of the last message and a list of messages.
+        """
+        with self._condition:
+
+            # wait for new messages, unless there's no more coming
+            self._condition.wait_for(lambda: self._sequence > after or self._closed, timeout)
+
+            # collect the messages the reader has not seen yet
+            messages = [message for (sequence, message) in self._messages if sequence > after]
+
+            # expose the current position together with the messages
+            return max(after, self._sequence), messages
+
+    def subscribe(self, interval=0.5):
+        """
+        Generator method to follow the channel. All messages that were
+        published since the previous batch are coalesced into a single batch,
+        and at most one batch is produced per interval.
+
+        Parameters
+        ----------
+        interval: float
+            Minimum number of seconds between two batches.
+
+        Yields
+        ------
+        list
+        """
+        # sequence number of the last message we've read
+        after = 0
+
+        while True:
+
+            # wait for new messages
+            after, messages = self.read(after)
+
+            # expose the batch of messages
+            if messages:
+                yield messages
+
+            # we're done when there's no more coming
+            if self._closed and after >= self._sequence:
+                return
+
+            # let messages pile up, so they can be coalesced into one batch
+            time.sleep(interval)
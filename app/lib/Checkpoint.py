@@ -0,0 +1,363 @@
+"""
+Class for periodically checkpointing a running simulation, so a long run that
+dies can continue from its last checkpoint instead of starting from zero.
+
+A checkpoint holds the complete state of a simulation as plain data: the
+server pools and the requests on their servers (in order, granted and queued),
+the transactions in flight (@see lib.Transaction), the moment of the next
+arrival of every generator, the state of the error generator, the states of
+the random number generators, the online statistics and the size of the
+logfiles. Checkpoints are written as gzipped pickles.
+
+A checkpoint is only taken once all events of the current moment have been
+processed, so every process is waiting for something in the future, which is
+exactly what the state describes.
+
+@file   lib/Checkpoint.py
+@scope  public
+"""
+
+# dependencies
+from lib.Transaction import Transaction
+from lib.Plan import graph
+
+# 3rd party dependencies
+import os
+import gzip
+import pickle
+import random
+import numpy as np
+
+# features of a configuration with state that a checkpoint doesn't hold: the
+# plans of the transactions of process graphs, the schedules of scenarios,
+# pools that change in size and the mode of the fluid model, @see
+# checkpointable
+UNSUPPORTED = [
+    ("process graphs",      lambda config: any(graph(kinds) for kinds in config['process'])),
+    ("failure scenarios",   lambda config: bool(config.get('scenarios'))),
+    ("autoscaling",         lambda config: any('autoscaling' in server for server in config['servers'])),
+    ("the hybrid mode",     lambda config: 'hybrid' in config),
+]
+
+# version of the format of a checkpoint
+VERSION = 2
+
+
+def load(path):
+    """
+    Function to load a checkpoint.
+
+    Parameters
+    ----------
+    path: string
+        Path to the checkpoint.
+
+    Returns
+    -------
+    dict
+    """
+    with gzip.open(path, 'rb') as f:
+        snapshot = pickle.load(f)
+
+    if snapshot['version'] != VERSION:
+        raise ValueError(f"checkpoint has version {snapshot['version']}, expected {VERSION}")
+
+    return snapshot
+
+
+def compatible(snapshot, config):
+    """
+    Function to check if a configuration can start from a checkpoint, i.e. it
+    has the same servers and processes. Everything else, like the timeout or
+    the errors, may differ, e.g. between the runs of a sweep.
+
+    Parameters
+    ----------
+    snapshot: dict
+        @see Checkpoint.snapshot.
+    config: dict
+        Configuration for the simulation, @see lib.Simulation.simulate.
+
+    Raises
+    ------
+    ValueError
+        When the servers or processes differ.
+    """
+    # servers of the checkpoint and of the configuration, by kind
+    restored = {pool['kind']: (len(pool['uuids']), pool['capacity']) for pool in snapshot['pools']}
+    configured = {server['kind']: (server['size'], server['capacity']) for server in config['servers']}
+
+    if restored != configured:
+        raise ValueError(f"checkpoint has servers {restored}, configuration has {configured}")
+
+    # messages in flight are processed differently by servers that share their cores
+    restored = {pool['kind'] for pool in snapshot['pools'] if pool.get('sharing')}
+    configured = {server['kind'] for server in config['servers'] if 'sharing' in server}
+
+    if restored != configured:
+        raise ValueError(f"checkpoint has servers that share their cores {sorted(restored)}, "
+                         f"configuration has {sorted(configured)}")
+
+    # the transactions in flight belong to the processes
+    if snapshot['meta']['config']['process'] != config['process']:
+        raise ValueError(f"checkpoint has processes {snapshot['meta']['config']['process']}, "
+                         f"configuration has {config['process']}")
+
+    # and to their generators, a mix has a single one
+    if ('mix' in snapshot['meta']['config']) != ('mix' in config):
+        raise ValueError("checkpoint and configuration differ in drawing the processes from a mix")
+
+
+def checkpointable(config):
+    """
+    Function to check if a simulation with a configuration can be checkpointed,
+    i.e. it has no features with state that a checkpoint doesn't hold, @see
+    UNSUPPORTED.
+
+    Parameters
+    ----------
+    config: dict
+        Configuration for the simulation, @see lib.Simulation.simulate.
+
+    Raises
+    ------
+    ValueError
+        When the configuration uses a feature that can't be checkpointed.
+    """
+    for (feature, used) in UNSUPPORTED:
+        if used(config):
+            raise ValueError(f"checkpoints are not supported for {feature}")
+
+
+def restore(snapshot, servers, generators, random_state=True, streams=None):
+    """
+    Function to restore the transactions in flight and the requests on all
+    servers from a checkpoint. The environment, server pools and generators
+    should be constructed from the same checkpoint already.
+
+    Parameters
+    ----------
+    snapshot: dict
+        @see Checkpoint.snapshot.
+    servers: MultiServers
+        Server pools, constructed with the identifiers of the checkpoint.
+    generators: list
+        Message generators, constructed with their state of the checkpoint.
+        The error generator blocks its server when it's constructed, so it
+        has nothing to restore here.
+    random_state: bool
+        Restore the states of the random number generators, a warm start
+        with its own seed doesn't.
+        Default: True.
+    streams: Streams
+        Random number streams of the simulation, @see lib.Streams.
+        [optional]
+    """
+    # servers by name
+    named = {server.name(): server for pool in servers.pools() for server in pool.servers()}
+
+    # continue all transactions that were in flight
+    transactions = {}
+    for (index, (generator, state)) in enumerate(zip(generators, snapshot['generators'])):
+        for transaction_state in state['transactions']:
+            transaction = Transaction.restore(transaction_state, named)
+            transactions[(index, transaction.id)] = (transaction, generator.start(transaction))
+
+    # make the requests again, per server in the order they were made, so
+    # the same requests are granted and queued in the same order
+    for (name, requests) in snapshot['requests'].items():
+        server = named[name]
+
+        # the last known state of the server, as it's used in the logs
+        server.state(update=False).update(requests['state'])
+
+        # the breaker in front of the server continues where it was
+        if server.breaker is not None and name in snapshot.get('breakers', {}):
+            server.breaker.restore(snapshot['breakers'][name])
+
+        for reference in requests['users'] + requests['queue']:
+            request = server.request(priority=reference['priority'],
+                                     preempt=reference['preempt'] if 'preempt' in reference else True)
+
+            # the request belongs to the process of its transaction, which
+            # would be interrupted when the request is preempted
+            (transaction, process) = transactions[(reference['generator'], reference['id'])]
+            transaction.open[reference['row']]['request'] = request
+            request.proc = process
+
+            # the original moment of the request decides its order from now on
+            request.time = reference['time']
+            request.key = (request.priority, request.time, not request.preempt)
+
+    # the random number generators continue where they were
+    if random_state:
+        np.random.set_state(snapshot['random']['numpy'])
+        random.setstate(snapshot['random']['random'])
+        if streams is not None and 'streams' in snapshot['random']:
+            streams.restore(snapshot['random']['streams'])
+
+        # the service times that were drawn ahead, by kind
+        for pool in servers.pools():
+            if pool.service() is not None and pool.kind() in snapshot.get('service', {}):
+                pool.service().restore(snapshot['service'][pool.kind()])
+
+
+class Checkpoint(object):
+
+    def __init__(self, envoirment, path, interval, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        path: string
+            Path to write the checkpoints to, every checkpoint replaces the
+            previous one.
+        interval: float|None
+            Simulated time between two checkpoints. Without interval no
+            checkpoints are written periodically, only when write is called.
+
+        Keyworded parameters
+        --------------------
+        servers: MultiServers
+            Server pools of the simulation.
+        generators: list
+            Message generators of the simulation.
+        errors: ErrorGenerator
+            Error generator of the simulation.
+            [optional]
+        statistics: Statistics
+            Online statistics of the simulation.
+            [optional]
+        loggers: dict
+            Loggers by type ('info' or 'error').
+        streams: Streams
+            Random number streams of the simulation, @see lib.Streams.
+            [optional]
+        meta: dict
+            Anything else that is needed to continue the simulation, e.g. its
+            configuration and name.
+        """
+        # Set simpy Envoirment
+        self._env = envoirment
+
+        self._path = path
+        self._interval = interval
+
+        # everything that makes up the state of the simulation
+        self._servers = kwargs['servers']
+        self._generators = kwargs['generators']
+        self._errors = kwargs['errors'] if 'errors' in kwargs else None
+        self._statistics = kwargs['statistics'] if 'statistics' in kwargs else None
+        self._loggers = kwargs['loggers'] if 'loggers' in kwargs else {}
+        self._streams = kwargs['streams'] if 'streams' in kwargs else None
+        self._meta = kwargs['meta'] if 'meta' in kwargs else {}
+
+        # number of checkpoints written
+        self.written = 0
+
+        # Initialize checkpoint process
+        if interval:
+            self.checkpoint_process = envoirment.process(self.checkpoint())
+
+    def checkpoint(self):
+        """
+        Generator method to write a checkpoint every interval.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        while True:
+
+            # wait for the interval to pass
+            yield self._env.timeout(self._interval)
+
+            # let all other events of this moment happen first
+            while self._env.peek() <= self._env.now:
+                yield self._env.timeout(0)
+
+            self.write()
+
+    def snapshot(self):
+        """
+        Method to expose the state of the simulation as plain data.
+
+        Returns
+        -------
+        dict
+        """
+        # the progress of the messages on the servers has to be up to date
+        for pool in self._servers.pools():
+            for server in pool.servers():
+                server.settle()
+
+        # references to all requests by their id, so they can be found when
+        # iterating over the users and queues of the servers
+        references = {}
+
+        for (index, generator) in enumerate(self._generators):
+            for transaction in generator.transactions():
+                for (row, open) in enumerate(transaction.open):
+                    if open['request'] is not None:
+                        references[id(open['request'])] = {
+                            "owner": 'transaction', "generator": index, "id": transaction.id, "row": row}
+
+        def reference(request):
+            return dict(references[id(request)], priority=request.priority, time=request.time,
+                        preempt=request.preempt)
+
+        # the requests on every server, in order
+        requests = {}
+        for pool in self._servers.pools():
+            for server in pool.servers():
+                requests[server.name()] = {
+                    "state": dict(server.state(update=False)),
+                    "users": [reference(request) for request in server.users if id(request) in references],
+                    "queue": [reference(request) for request in server.queue if id(request) in references],
+                }
+
+        return {
+            "version":      VERSION,
+            "time":         self._env.now,
+            "meta":         self._meta,
+            "pools":        [{"kind": pool.kind(), "capacity": pool.servers()[0].capacity if pool.servers() else 0,
+                              "uuids": [server.name().split('#', 1)[1] for server in pool.servers()],
+                              "sharing": pool.sharing()}
+                             for pool in self._servers.pools()],
+            "requests":     requests,
+            "generators":   [generator.state(references) for generator in self._generators],
+            "errors":       self._errors.state() if self._errors is not None else None,
+            "breakers":     {server.name(): server.breaker.state() for pool in self._servers.pools()
+                             for server in pool.servers() if server.breaker is not None},
+            "random":       dict({"numpy": np.random.get_state(), "random": random.getstate()},
+                                 **({"streams": self._streams.state()} if self._streams is not None else {})),
+            "cost":         {pool.kind(): pool.cost() for pool in self._servers.pools()},
+            "service":      {pool.kind(): pool.service().state()
+                             for pool in self._servers.pools() if pool.service() is not None},
+            "statistics":   self._statistics,
+            "events":       self._env.events(),
+            "counts":       {type: self._env.counts(type=type) for type in ('info', 'error')},
+            "logs":         {type: logger.offset() for (type, logger) in self._loggers.items()},
+        }
+
+    def write(self):
+        """
+        Method to write a checkpoint. The checkpoint is written to a temporary
+        file first, so a run that dies while writing keeps its last checkpoint.
+
+        Returns
+        -------
+        self
+        """
+        temporary = f"{self._path}.tmp"
+
+        with gzip.open(temporary, 'wb') as f:
+            pickle.dump(self.snapshot(), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temporary, self._path)
+        self.written += 1
+
+        # allow chaining
+        return self
@@ -0,0 +1,201 @@
+"""
+Class for a circuit breaker in front of a server. Clients record the outcome
+of every message they sent to the server, and once too many messages failed
+within a window of time, the breaker opens, so the load balancer no longer
+sends messages to the server (@see lib.Servers.server). After a cooldown, the
+breaker lets a single message through (half-open): when it succeeds the
+breaker closes again, otherwise it stays open for another cooldown. Only the
+outcome of that message (the probe, @see CircuitBreaker.attempt) decides, the
+outcomes of messages that were sent before, or that a client sent to a server
+it already held, are ignored while the breaker is half-open.
+
+@file   lib/CircuitBreaker.py
+@scope  public
+"""
+
+# 3rd party dependencies
+from collections import deque
+
+# states of a breaker
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker(object):
+
+    def __init__(self, envoirment, name, threshold=0.5, window=10, minimum=20, cooldown=5):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        name: string
+            Name of the server the breaker is in front of.
+        threshold: float
+            Fraction of failed messages at which the breaker opens.
+            Default: 0.5.
+        window: float
+            Simulated time over which the fraction of failed messages is
+            computed.
+            Default: 10.
+        minimum: integer
+            Minimum number of messages within the window before the breaker
+            can open.
+            Default: 20.
+        cooldown: float
+            Simulated time the breaker stays open before it lets a message
+            through again.
+            Default: 5.
+        """
+        # Set simpy Envoirment
+        self._env = envoirment
+
+        self._name = name
+        self._threshold = threshold
+        self._window = window
+        self._minimum = minimum
+        self._cooldown = cooldown
+
+        # current state, and the moment the breaker opened
+        self._state = CLOSED
+        self._opened = None
+
+        # outcomes within the window, as (moment, success) tuples, and the
+        # number of failures among them
+        self._outcomes = deque()
+        self._failures = 0
+
+        # a half-open breaker lets a single message through at a time, this
+        # is the moment it was sent, a message without outcome (e.g. of a
+        # transaction that failed elsewhere) no longer counts after a cooldown,
+        # and the token of the message, which has to come with its outcome
+        self._probing = None
+        self._probe = 0
+
+    def available(self):
+        """
+        Method to check if a message can be sent to the server.
+
+        Returns
+        -------
+        bool
+        """
+        # an open breaker is half-open once the cooldown is over
+        if self._state == OPEN and self._env.now >= self._opened + self._cooldown:
+            self._change(HALF_OPEN)
+
+        return self._state == CLOSED or (self._state == HALF_OPEN and (
+            self._probing is None or self._env.now >= self._probing + self._cooldown))
+
+    def attempt(self):
+        """
+        Method to tell the breaker a message is sent to the server.
+
+        Returns
+        -------
+        integer|None
+            Token of the message when it is the probe of a half-open breaker,
+            to pass to CircuitBreaker.record with its outcome.
+        """
+        if self._state != HALF_OPEN:
+            return None
+
+        self._probing = self._env.now
+        self._probe += 1
+
+        return self._probe
+
+    def record(self, success, probe=None):
+        """
+        Method to record the outcome of a message.
+
+        Parameters
+        ----------
+        success: bool
+            Whether the message was processed, rather than timed out,
+            rejected or preempted.
+        probe: integer
+            Token of the message, @see CircuitBreaker.attempt.
+            [optional]
+
+        Returns
+        -------
+        self
+        """
+        # only the message that was let through decides on a half-open breaker
+        if self._state == HALF_OPEN:
+            if probe is not None and probe == self._probe:
+                self._probing = None
+                self._change(CLOSED if success else OPEN)
+
+        elif self._state == CLOSED:
+            self._outcomes.append((self._env.now, success))
+            self._failures += not success
+
+            # forget the outcomes outside the window
+            while self._outcomes[0][0] < self._env.now - self._window:
+                (_, succeeded) = self._outcomes.popleft()
+                self._failures -= not succeeded
+
+            if len(self._outcomes) >= self._minimum and self._failures / len(self._outcomes) >= self._threshold:
+                self._change(OPEN)
+
+        # allow chaining
+        return self
+
+    def _change(self, state):
+        """
+        Method to change the state of the breaker, and log the change.
+
+        Parameters
+        ----------
+        state: string
+        """
+        self._state = state
+
+        if state == OPEN:
+            self._opened = self._env.now
+
+        # a closed breaker starts with a clean window
+        if state != HALF_OPEN:
+            self._outcomes.clear()
+            self._failures = 0
+
+        self._env.log(message=f'{self._env.now};{self._name};Breaker;{state.capitalize()}', type="error")
+        self._env.notify('breaker', name=self._name, state=state)
+
+    def state(self):
+        """
+        Method to expose the state of the breaker, e.g. for a checkpoint.
+
+        Returns
+        -------
+        dict
+        """
+        return {"state": self._state, "opened": self._opened, "outcomes": list(self._outcomes),
+                "probing": self._probing, "probe": self._probe}
+
+    def restore(self, state):
+        """
+        Method to continue from the state of a breaker.
+
+        Parameters
+        ----------
+        state: dict
+            @see CircuitBreaker.state.
+
+        Returns
+        -------
+        self
+        """
+        self._state = state['state']
+        self._opened = state['opened']
+        self._outcomes = deque(state['outcomes'])
+        self._failures = sum(1 for (_, success) in self._outcomes if not success)
+        self._probing = state['probing']
+        self._probe = state['probe'] if 'probe' in state else 0
+
+        # allow chaining
+        return self
@@ -11,6 +11,8 @@ us to add some additional logging functionality.
 
 # dependencies
 import simpy
+import simpy.rt
+from time import monotonic
 
 
 class Environment(simpy.Environment):
@@ -26,6 +28,34 @@ class Environment(simpy.Environment):
         # collection of loggers
         self._loggers = {"info": [], "error": []}
 
+        # number of logged messages per type and level
+        self._counts = {"info": {}, "error": {}}
+
+        # collection of observers that are notified of simulation events
+        self._observers = []
+
+        # number of events that were scheduled so far
+        self._scheduled = 0
+
+    def schedule(self, event, priority=1, delay=0):
+        """
+        Method to schedule an event, @see simpy.Environment.schedule.
+
+        Parameters
+        ----------
+        event: simpy.Event
+            Event to schedule.
+        priority: integer
+            Priority of the event, urgent events go first.
+        delay: float
+            Simulated time until the event happens.
+        """
+        # keep track of the number of events
+        self._scheduled += 1
+
+        # and let simpy schedule it
+        super().schedule(event, priority, delay)
+
     def log(self, message, level=20, type="info"):
         """
         Method to log a message to the environment.
@@ -47,6 +77,10 @@ class Environment(simpy.Environment):
         # log the message on all loggers of the given type
         [Logger.log(message, level) for Logger in self._loggers[type]]
 
+        # keep track of the number of messages that were logged
+        counts = self._counts[type]
+        counts[level] = counts.get(level, 0) + 1
+
         # allow chaining
         return self
 
@@ -73,3 +107,169 @@ class Environment(simpy.Environment):
 
         # allow chaining
         return self
+
+    def observer(self, Observer):
+        """
+        Method to install an observer on this environment. Observers are
+        notified of events that happen in the simulation, e.g. completed
+        transactions, so they can keep track of online metrics.
+
+        Parameters
+        ----------
+        Observer: object
+            Object exposing a notify(event, data) method.
+
+        Returns
+        -------
+        self
+        """
+
+        # install the observer
+        self._observers.append(Observer)
+
+        # allow chaining
+        return self
+
+    def notify(self, event, **data):
+        """
+        Method to notify all installed observers of an event.
+
+        Parameters
+        ----------
+        event: string
+            Name of the event, e.g. 'hop', 'timeout' or 'transaction'.
+
+        Keyworded parameters
+        --------------------
+        Data describing the event, this differs per event.
+
+        Returns
+        -------
+        self
+        """
+
+        # pass the event to all observers
+        for Observer in self._observers:
+            Observer.notify(event, data)
+
+        # allow chaining
+        return self
+
+    def events(self):
+        """
+        Method to expose the number of events that were scheduled so far.
+
+        Returns
+        -------
+        int
+        """
+        return self._scheduled
+
+    def counts(self, type="info"):
+        """
+        Method to expose the number of messages that were logged per level.
+
+        Parameters
+        ----------
+        type: string
+            Type of log messages, see Environment.log.
+
+        Returns
+        -------
+        dict
+        """
+        return dict(self._counts[type])
+
+    def restore_counts(self, counts, type="info"):
+        """
+        Method to continue counting from a number of logged messages, e.g.
+        when a simulation is restored from a checkpoint.
+
+        Parameters
+        ----------
+        counts: dict
+            Number of messages per level, see Environment.counts.
+        type: string
+            Type of log messages, see Environment.log.
+
+        Returns
+        -------
+        self
+        """
+        self._counts[type] = dict(counts)
+
+        # allow chaining
+        return self
+
+
+class RealtimeEnvironment(Environment, simpy.rt.RealtimeEnvironment):
+    """
+    Environment that runs the simulation at a scaled wall clock rate, e.g. to
+    replay generated traffic against a live system. While running, the drift
+    between the wall clock and the scaled simulation clock is measured.
+
+    @extends Environment, simpy.rt.RealtimeEnvironment
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        @see simpy.rt.RealtimeEnvironment
+
+        Keyworded parameters
+        --------------------
+        factor: float
+            Wall clock seconds per unit of simulated time.
+            Default: 1.
+        strict: bool
+            Raise an error when the simulation can't keep up.
+            Default: False, the drift is measured instead.
+        """
+        # we measure the drift ourselves, instead of failing on it
+        kwargs['strict'] = kwargs['strict'] if 'strict' in kwargs else False
+
+        # call the parent classes
+        super().__init__(*args, **kwargs)
+
+        # running totals of the drift, in wall clock seconds
+        self._drift = {"steps": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+
+    def step(self):
+        """
+        Method override to process the next event once its moment on the
+        scaled wall clock has come, measuring how late it was processed.
+        """
+        # moment on the wall clock at which the next event should happen
+        target = self.real_start + (self.peek() - self.env_start) * self.factor
+
+        # wait for and process the event
+        super().step()
+
+        # keep track of how late the event was processed
+        drift = monotonic() - target
+        self._drift.update(steps=self._drift['steps'] + 1,
+                           total=self._drift['total'] + drift,
+                           max=max(self._drift['max'], drift),
+                           last=drift)
+
+    def drift(self):
+        """
+        Method to expose the measured drift between the wall clock and the
+        scaled simulation clock, in wall clock seconds. Positive values mean
+        the simulation lagged behind.
+
+        Returns
+        -------
+        dict
+        """
+        steps = self._drift['steps']
+
+        return {
+            "steps":    steps,
+            "mean":     self._drift['total'] / steps if steps else 0.0,
+            "max":      self._drift['max'],
+            "last":     self._drift['last'],
+        }
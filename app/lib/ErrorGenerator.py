@@ -1,4 +1,4 @@
-from numpy.random import uniform
+import numpy as np
 
 
 class ErrorGenerator(object):
@@ -10,6 +10,19 @@ class ErrorGenerator(object):
         ----------
         envoirment: instance of Envoirment class
         servers: instance of MultiServers pool
+
+        Keyworded parameters
+        --------------------
+        restore: dict
+            State of the generator to continue from, @see ErrorGenerator.state.
+            [optional]
+        stream: numpy.random.RandomState
+            Random number generator for the errors, @see lib.Streams.
+            Default: numpy.random.
+        reject: bool
+            A blocked server rejects its requests instead of queueing them
+            until the error is resolved, @see lib.Server.block.
+            Default: False.
         """
 
         # Set serverpools
@@ -21,29 +34,94 @@ class ErrorGenerator(object):
         self.errorwait = errorwait
         self.error_duration = error_duration
 
+        # what the generator waits for, as a dict with the phase ('wait' or
+        # 'block'), until when, and the blocked server
+        self._waiting = kwargs['restore'] if 'restore' in kwargs and kwargs['restore'] is not None else None
+
+        # random number generator for the errors, the pools pick with the
+        # random module unless a stream is given
+        self._stream = kwargs['stream'] if 'stream' in kwargs else None
+
+        self._reject = kwargs['reject'] if 'reject' in kwargs else False
+
+        # a restored server is blocked right away, before the requests on it
+        # are restored, @see lib.Checkpoint.restore
+        if self._waiting is not None and self._waiting['phase'] == 'block':
+            self._pools.find(self._waiting['server']).block(reject=self._reject)
+
         # Initialize error generator
         self.error_generator = envoirment.process(self.error_generator())
 
+    def state(self):
+        """
+        Method to expose the state of this generator as plain data.
+
+        Returns
+        -------
+        dict|None
+        """
+        if self._waiting is None:
+            return None
+
+        # the blocked server is stored by name
+        state = dict(self._waiting)
+        if 'server' in state:
+            state['server'] = state['server'].name()
+
+        return state
+
+    def _uniform(self, bounds):
+        """
+        Method to draw a random value between two bounds.
+
+        Parameters
+        ----------
+        bounds: list
+            Lower and upper bound.
+
+        Returns
+        -------
+        float
+        """
+        return (self._stream if self._stream is not None else np.random).uniform(*bounds)
+
     def error_generator(self):
+        # a restored generator continues where it was
+        restored, self._waiting = self._waiting, None
+
         while True:
-            # Wait a random amount of time to introduce the error
-            yield self._env.timeout(uniform(*self.errorwait))
+            if restored is None or restored['phase'] == 'wait':
 
-            # Get random server
-            server = self._pools.random_pool().get_random()
-            # Write to error log
-            self._env.log(
-                message=f'{self._env.now};{server.state()["name"]};Block;Start', type="error")
-            # Make an equal amount of requests to the capacity of the server
-            # Make a list of requests
-            request_list = [server.request(priority=0) for i in range(server.capacity)]
-            for request in request_list:
-                yield request  # Send priority request to PreemptiveResource
-            # Wait for the error to be resolved
-            yield self._env.timeout(uniform(*self.error_duration))
-            # Release spots in server when the error is resolved
-            for request in request_list:
-                yield server.release(request)
+                # Wait a random amount of time to introduce the error
+                wait = self._uniform(self.errorwait) if restored is None else restored['until'] - self._env.now
+                self._waiting = {"phase": 'wait', "until": self._env.now + wait}
+                yield self._env.timeout(wait)
+                restored = None
+
+                # Get random server
+                server = self._pools.random_pool(stream=self._stream).get_random(stream=self._stream)
+                # Write to error log
+                self._env.log(
+                    message=f'{self._env.now};{server.state()["name"]};Block;Start', type="error")
+                # Tell the observers about the error
+                self._env.notify('block', server=server, state='start')
+                # Block the server, which preempts all messages it's processing
+                server.block(reject=self._reject)
+                # Wait for the error to be resolved
+                duration = self._uniform(self.error_duration)
+
+            else:
+                # the server is blocked already, since the generator was restored
+                server = self._pools.find(restored['server'])
+                duration = restored['until'] - self._env.now
+                restored = None
+
+            self._waiting = {"phase": 'block', "until": self._env.now + duration, "server": server}
+            yield self._env.timeout(duration)
+            # Unblock the server when the error is resolved
+            server.unblock(reject=self._reject)
             # Write to error log
             self._env.log(
                 message=f'{self._env.now};{server.state()["name"]};Block;Stop', type="error")
+            # Tell the observers the error is resolved
+            self._env.notify('block', server=server, state='stop')
@@ -0,0 +1,94 @@
+"""
+Class for stopping a simulation early once it clearly violates its service
+level objective, e.g. while searching for the smallest pools that meet it
+(@see lib.Optimizer). A run that times out twice as often as allowed after
+a while won't meet the objective by running longer, so it doesn't have to.
+
+The objective is judged on the online statistics every interval, once enough
+transactions completed, and it's clearly violated when the latency at the
+percentile or the fraction of the messages that time out exceeds its target
+by a factor.
+
+@file   lib/Guard.py
+@scope  public
+"""
+
+# 3rd party dependencies
+from simpy.core import StopSimulation
+
+
+class Guard(object):
+
+    def __init__(self, envoirment, statistics, slo, factor=2, interval=10, minimum=1000):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        statistics: Statistics
+            Online statistics of the simulation.
+        slo: dict
+            Service level objective, @see lib.Statistics.Statistics.slo.
+        factor: float
+            Factor by which a target has to be exceeded to stop the run.
+            Default: 2.
+        interval: float
+            Simulated time between two judgements.
+            Default: 10.
+        minimum: integer
+            Minimum number of completed transactions before the run is judged.
+            Default: 1000.
+        """
+        # Set simpy Envoirment
+        self._env = envoirment
+
+        self._statistics = statistics
+        self._slo = slo
+        self._factor = factor
+        self._interval = interval
+        self._minimum = minimum
+
+        # Initialize guard process
+        self.guard_process = envoirment.process(self.guard())
+
+    def violated(self):
+        """
+        Method to check if the objective is clearly violated so far.
+
+        Returns
+        -------
+        bool
+        """
+        if self._statistics.transactions < self._minimum:
+            return False
+
+        slo = self._statistics.slo(self._slo)
+
+        return ('latency' in self._slo and slo['latency'] > self._factor * self._slo['latency']) or \
+            ('timeouts' in self._slo and slo['timeouts'] > self._factor * self._slo['timeouts'])
+
+    def guard(self):
+        """
+        Generator method to judge the simulation every interval, and stop it
+        once the objective is clearly violated.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        while True:
+
+            # wait for the interval to pass
+            yield self._env.timeout(self._interval)
+
+            if not self.violated():
+                continue
+
+            self._statistics.stopped = self._env.now
+
+            # the environment stops running once this event is processed
+            stop = self._env.event()
+            stop.callbacks.append(StopSimulation.callback)
+            stop.succeed()
+            return
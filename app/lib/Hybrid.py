@@ -0,0 +1,305 @@
+"""
+Class for running a simulation in hybrid mode. During quiet periods of the
+seasonality curve (e.g. the nights of week.csv) servers are nearly idle, and
+simulating every transaction individually is wasted effort. In those periods
+the message generators are paused and time is advanced in steps with a fluid
+(mean-field) approximation of the pools, @see lib.Analytic. Every step logs a
+single aggregated line per server with the expected cpu usage, memory usage
+and latency. The weights of a mix are evaluated at every step, since they can
+follow a seasonality of their own, and the transactions of a step are drawn
+from the stream of the simulation, so seeded runs are reproducible.
+
+As soon as the load crosses the threshold, or an error is injected, the
+simulation switches back to discrete events. Since the switch only happens
+while the pools are lightly loaded, the state that is lost (the queues that
+the fluid model does not keep) is small, which bounds the error.
+
+@file   lib/Hybrid.py
+@scope  public
+"""
+
+# 3rd party dependencies
+import numpy as np
+
+
+class Hybrid(object):
+
+    def __init__(self, envoirment, servers, generators, seasonality, analytic, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        servers: instance of MultiServers pool
+        generators: list
+            Message generators to pause during the fluid periods.
+        seasonality: Seasonality
+            Seasonality of the simulation, used to find the quiet periods.
+        analytic: Analytic
+            Analytic approximation of the same configuration.
+
+        Keyworded parameters
+        --------------------
+        threshold: float
+            Highest seasonality scaler that is advanced with the fluid model.
+            Default: 0.1.
+        utilization: float
+            Highest expected utilization of any pool that is advanced with the
+            fluid model.
+            Default: 0.5.
+        step: float
+            Simulated time between two checks of the load, and the length of a
+            fluid step.
+            Default: 60.
+        mix: list
+            Types of processes that share a single stream of arrivals by weight,
+            @see lib.MessageGenerator.mix, with the seasonality of their weight.
+            Default: None, every process has its own arrivals.
+        stream: numpy.random.RandomState
+            Random number stream to draw the transactions of a step from.
+            Default: the global numpy random number generator.
+        """
+        # Set simpy Envoirment
+        self._env = envoirment
+
+        # Set serverpools
+        self._pools = servers
+
+        # generators that we pause and resume
+        self._generators = generators
+
+        # the load follows from the seasonality
+        self._seasonality = seasonality
+        self._analytic = analytic
+
+        # thresholds for switching to the fluid model
+        self._threshold = kwargs['threshold'] if 'threshold' in kwargs else 0.1
+        self._utilization = kwargs['utilization'] if 'utilization' in kwargs else 0.5
+        self._step = kwargs['step'] if 'step' in kwargs else 60
+
+        # the weights of a mix of processes
+        self._mix = kwargs['mix'] if 'mix' in kwargs else None
+
+        # random number stream for the fluid steps
+        self._stream = kwargs['stream'] if 'stream' in kwargs and kwargs['stream'] is not None else np.random
+
+        # the seasonality only has a few distinct scalers, so we only solve
+        # the approximation once for every arrival rate and mix
+        self._segments = {}
+
+        # number of errors that are currently injected
+        self._blocked = 0
+
+        # event to wake up a fluid step early, when an error is injected
+        self._wake = None
+
+        # simulated time spent in fluid mode, and the start of the current
+        # fluid period
+        self._fluid = 0.0
+        self._start = None
+
+        # we need to be notified of injected errors
+        envoirment.observer(self)
+
+        # Initialize hybrid process
+        self.hybrid_process = envoirment.process(self.hybrid())
+
+    def notify(self, event, data):
+        """
+        Method that is called by the environment when an event occurs.
+
+        Parameters
+        ----------
+        event: string
+            Name of the event.
+        data: dict
+            Data describing the event.
+        """
+        if event != 'block':
+            return
+
+        # keep track of the number of errors that are injected
+        self._blocked += 1 if data['state'] == 'start' else -1
+
+        # an error needs the discrete simulation, so we stop the fluid step
+        if self._blocked and self._wake is not None and not self._wake.triggered:
+            self._wake.succeed()
+
+    def hybrid(self):
+        """
+        Generator method that switches between the discrete and fluid mode.
+
+        Yields
+        ------
+        simpy.Event
+        """
+        while True:
+
+            # the discrete simulation runs until the system is quiet
+            if not self._quiet():
+                yield self._env.timeout(self._step)
+                continue
+
+            # no new transactions during the fluid period, the transactions
+            # that are in flight complete as usual
+            for generator in self._generators:
+                generator.pause()
+
+            self._start = self._env.now
+            self._wake = self._env.event()
+
+            # advance time with the fluid model, step by step
+            while self._quiet():
+                begin = self._env.now
+                segment = self._segment()
+
+                # wait for the step to pass, or for an error to be injected
+                yield self._env.timeout(self._step) | self._wake
+
+                self._advance(segment, self._env.now - begin)
+
+            # and continue with discrete events
+            self._wake = None
+            self._fluid += self._env.now - self._start
+            self._start = None
+
+            for generator in self._generators:
+                generator.resume()
+
+    def _rate(self):
+        """
+        Method to compute the current arrival rate of transactions per process,
+        @see lib.Analytic.Analytic.segments.
+
+        Returns
+        -------
+        float
+        """
+        volume = self._seasonality.scale() * self._seasonality.max_vol
+        return max(volume - 1, 0.0)
+
+    def _shares(self):
+        """
+        Method to compute the current share of every process in the arrivals,
+        the weights of a mix can vary with their seasonality.
+
+        Returns
+        -------
+        tuple
+            Shares of the processes, or None when every process has its own
+            arrivals.
+        """
+        if self._mix is None:
+            return None
+
+        weights = [kind_type['weight'] * (kind_type['seasonality'].scale() if kind_type['seasonality'] else 1)
+                   for kind_type in self._mix]
+        total = sum(weights)
+
+        return tuple(weight / total if total else 0.0 for weight in weights)
+
+    def _segment(self):
+        """
+        Method to get the approximation of the current arrival rate and mix.
+
+        Returns
+        -------
+        dict
+        """
+        key = (self._rate(), self._shares())
+
+        if key not in self._segments:
+            self._segments[key] = self._analytic.segment(*key)
+
+        return self._segments[key]
+
+    def _quiet(self):
+        """
+        Method to check whether the system can be advanced with the fluid model.
+
+        Returns
+        -------
+        bool
+        """
+        # errors are always simulated with discrete events
+        if self._blocked:
+            return False
+
+        # the load should be low
+        if self._seasonality.scale() > self._threshold:
+            return False
+
+        # and every pool should be lightly loaded, according to the approximation
+        segment = self._segment()
+        return all(metrics['utilization'] <= self._utilization and not metrics['saturated']
+                   for metrics in segment['kinds'].values())
+
+    def _advance(self, segment, elapsed):
+        """
+        Method to account for a fluid step, logging the expected state of
+        every server and telling the observers about the transactions that
+        were done.
+
+        Parameters
+        ----------
+        segment: dict
+            Approximation of the step, @see lib.Analytic.Analytic.segment.
+        elapsed: float
+            Length of the step in simulated time.
+        """
+        if elapsed <= 0:
+            return
+
+        # number of messages per kind that were processed during the step
+        kinds = {}
+
+        # one aggregated line per server, instead of one line per message
+        for pool in self._pools.pools():
+            metrics = segment['kinds'][pool.kind()]
+            messages = metrics['arrivals'] * elapsed
+            kinds[pool.kind()] = {"hops": float(messages * len(pool.servers())), "cpu": float(metrics['cpu'])}
+
+            for server in pool.servers():
+                name = server.state()['name']
+                self._env.log(
+                    f"{self._env.now};{name};FLUID;{metrics['cpu']};{metrics['memory']};{metrics['service']};;;{messages:.1f} messages in fluid mode")
+
+        # the number of transactions and timeouts is drawn, so the fluid
+        # periods keep the variability of the discrete ones
+        transactions, timeouts, latencies = 0, 0, []
+        for process in segment['processes']:
+            count = self._stream.poisson(segment['rate'] * process['share'] * elapsed)
+            transactions += count
+            timeouts += self._stream.binomial(count, process['timeout'])
+
+            # the latency of a transaction is the sum of the (exponential)
+            # queueing and service times of its hops
+            latency = np.zeros(count)
+            for kind in process['hops']:
+                metrics = segment['kinds'][kind]
+                latency += self._stream.exponential(metrics['service'], count)
+                if metrics['wait']:
+                    latency += self._stream.exponential(metrics['wait'], count)
+            latencies.append(latency)
+
+        # tell the observers about the step
+        self._env.notify('fluid', start=self._env.now - elapsed, end=self._env.now,
+                         transactions=transactions, timeouts=timeouts,
+                         latencies=np.concatenate(latencies) if latencies else np.zeros(0),
+                         kinds=kinds)
+
+    def fluid(self):
+        """
+        Method to expose the simulated time spent in fluid mode.
+
+        Returns
+        -------
+        dict
+        """
+        # a fluid period that is still running counts as well
+        fluid = self._fluid
+        if self._start is not None:
+            fluid += self._env.now - self._start
+
+        return {"fluid": fluid, "fraction": fluid / self._env.now if self._env.now else 0.0}
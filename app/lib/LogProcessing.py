@@ -28,10 +28,68 @@ from lib.OutlierDetection import moving_average, detect_outliers
 # Set location of log folder relative to this script
 LOG_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '../logs'))
 
+# metrics of a message in the logfile
+METRICS = ["CPU Usage", "Memory Usage", "Latency"]
+
+
+def read_log(f, **kwargs):
+    """
+    Function to read a logfile. Every line of a sampled logfile (@see
+    lib.Sampling) stands for a number of lines, its Weight, the lines of a
+    logfile that isn't sampled stand for themselves.
+
+    Parameters
+    ----------
+        f: logfile, a name in the logs directory, or a path
+        Any keyworded parameter is passed on to pandas.read_csv.
+
+    Returns
+    -------
+        pandas.DataFrame
+    """
+    df = pd.read_csv(os.path.join(LOG_PATH, f), sep=";", **kwargs)
+
+    if "Weight" not in df:
+        df["Weight"] = 1.0
+
+    return df
+
+
+def weighted_metrics(df, keys):
+    """
+    Function to aggregate the metrics of the messages of a logfile, weighted
+    by the number of lines every line stands for, so the aggregates of a
+    sampled logfile are unbiased.
+
+    Parameters
+    ----------
+        df: logfile, @see read_log
+        keys: list of columns to group by
+
+    Returns
+    -------
+        pandas.DataFrame
+            Number of messages, and the mean of every metric, per group.
+    """
+    columns = {"Messages": df["Weight"]}
+    for metric in METRICS:
+
+        # lines without a metric, e.g. errors, don't count for its mean
+        present = df[metric].notna()
+        columns[metric] = df[metric].astype(float).where(present, 0.0) * df["Weight"]
+        columns[metric + " weight"] = df["Weight"].where(present, 0.0)
+
+    weighted = pd.DataFrame(columns).join(df[keys]).groupby(keys, as_index=False).sum()
+
+    for metric in METRICS:
+        weighted[metric] = weighted[metric] / weighted[metric + " weight"]
+
+    return weighted[keys + ["Messages"] + METRICS]
+
 
 def get_endpoint_json(f):
     # Read in the log data
-    log_df = pd.read_csv(os.path.join(LOG_PATH, f), sep=';')
+    log_df = read_log(f)
 
     # # Use only timestamps where metrics are given
     # log_df.dropna(subset=["CPU Usage", "Memory Usage", "Latency"], how='any')
@@ -44,11 +102,12 @@ def get_endpoint_json(f):
     final_matrix = pd.DataFrame(0, index=cols, columns=rows)
 
     # Filter by Server and From_Server
-    filtered_log_df = log_df[['Server', 'From_Server']]
+    filtered_log_df = log_df[['Server', 'From_Server', 'Weight']]
 
-    # Group by unique combinations and count occurrences
+    # Group by unique combinations and count occurrences, every line counts
+    # for its weight
     endpoint_df = filtered_log_df.groupby(
-        ['Server', 'From_Server']).size().reset_index().rename(columns={0: 'count'})
+        ['Server', 'From_Server'])['Weight'].sum().reset_index().rename(columns={'Weight': 'count'})
 
     x = list(rows)
     y = list(cols)
@@ -106,7 +165,7 @@ def get_endpoint_json(f):
 
 def get_endpoint_matrix(f):
     # Read in the log data
-    log_df = pd.read_csv(os.path.join(LOG_PATH, f), sep=';')
+    log_df = read_log(f)
 
     # Create 'final_matrix' (initially a zeros matrix)
     rows = log_df['From_Server'].dropna().unique()
@@ -114,11 +173,12 @@ def get_endpoint_matrix(f):
     final_matrix = pd.DataFrame(0, index=cols, columns=rows)
 
     # Filter by Server and From_Server
-    filtered_log_df = log_df[['From_Server', 'Server']]
+    filtered_log_df = log_df[['From_Server', 'Server', 'Weight']]
 
-    # Group by unique combinations and count occurrences
+    # Group by unique combinations and count occurrences, every line counts
+    # for its weight
     endpoint_df = filtered_log_df.groupby(
-        ['From_Server', 'Server']).size().reset_index().rename(columns={0: 'count'})
+        ['From_Server', 'Server'])['Weight'].sum().reset_index().rename(columns={'Weight': 'count'})
 
     # Iterate over combinations in grouped_by df and fill in occurrences in final_matrix df
     for index, row in endpoint_df.iterrows():
@@ -147,17 +207,14 @@ def get_log_filtered(f):
         filtered_logfile_name: string
     """
 
-    df = pd.read_csv(os.path.join(LOG_PATH, f), sep=";", error_bad_lines=False)
-
-    # Split dataframe into three dataframes based on Server
-    df = df.drop(['Transaction_ID', 'From_Server', 'Message'], axis=1)
+    df = read_log(f, on_bad_lines='skip')
 
-    df = df.reset_index()
-    df = df.drop(['index'], axis=1)
     # df["Time"] = df["Time"].div(60)
     df["Time_floor"] = np.floor(df["Time"]).astype("int")
-    df = df.groupby(['Server', 'Time_floor', 'Message_type'], as_index=False).mean()
-    df = df.drop(['Time'], axis=1)
+
+    # Mean of the metrics per server per second, weighted for a sampled logfile
+    df = weighted_metrics(df, ['Server', 'Time_floor', 'Message_type'])
+    df = df.drop(['Messages'], axis=1)
 
     # Rename variables to include unit in name
     replace_columns = dict({"CPU Usage": "CPU Usage (%)",
@@ -187,12 +244,37 @@ def get_log_filtered(f):
     #     # df_error = df_error.loc[df_error["variable"] == df_error["variable"][0]]
     #     df_error = df_error.loc[df_error["Server"].notnull()]
     #
-    file_out_filtered = f.split('.')[0] + "_filtered.csv"
+    file_out_filtered = os.path.splitext(os.path.basename(f))[0] + "_filtered.csv"
     df_melt.to_csv(os.path.join(LOG_PATH, 'filtered', file_out_filtered))
 
     return file_out_filtered
 
 
+def get_server_metrics(f):
+    """
+    Function to compute the metrics per server of a given logfile. A sampled
+    logfile (@see lib.Sampling) has the number of lines every line stands
+    for in its Weight column, so the metrics are weighted by it.
+
+    Parameters
+    ----------
+        f: logfile
+
+    Returns
+    -------
+        pandas.DataFrame
+            Number of processed messages, and mean cpu usage, memory usage
+            and latency, per server.
+    """
+
+    df = read_log(f)
+
+    # Use only INFO statements
+    df = df[df["Message_type"] == "INFO"]
+
+    return weighted_metrics(df, ["Server"]).set_index("Server")
+
+
 def show_dash_graphs(dashapp, f, eventId):
     """
     Function to generate Dash visualizations for a given simulation logfile.
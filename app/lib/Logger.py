@@ -50,8 +50,11 @@ class Logger(object):
             # Do not propagate to higer level to keep message out of stout
             self._logger.propagate = False
 
+        # path to the logfile
+        self._path = os.path.join(directory, name+".csv")
+
         # we need a new file handler so the logs are written to the file
-        filehandler = logging.FileHandler(os.path.join(directory, name+".csv"), mode='a')
+        filehandler = logging.FileHandler(self._path, mode='a')
 
         if usequeue:
             print(f"Using queing for log {name}")
@@ -85,3 +88,38 @@ class Logger(object):
 
         # allow chaining
         return self
+
+    def offset(self):
+        """
+        Method to expose the size of the logfile, after everything that was
+        logged so far has been written.
+
+        Returns
+        -------
+        int
+        """
+
+        # make sure everything is written to the file
+        for handler in self._logger.handlers:
+            handler.flush()
+
+        return os.path.getsize(self._path) if os.path.exists(self._path) else 0
+
+    def close(self):
+        """
+        Method to close the logfile. Messages that are logged afterwards
+        are no longer written to the file.
+
+        Returns
+        -------
+        self
+        """
+
+        # detach and close all handlers, so the file is no longer held open
+        # and a new logger with the same name starts without handlers
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+            handler.close()
+
+        # allow chaining
+        return self
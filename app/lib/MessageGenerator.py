@@ -11,8 +11,62 @@ Class for
 from uuid import uuid4
 from simpy import Interrupt
 from simpy.resources.resource import Preempted
-import pandas as pd
 from numpy.random import randint
+import numpy as np
+
+# dependencies
+from lib.Transaction import Transaction
+from lib.Server import Rejected
+from lib.Plan import graph, plan
+
+
+# behaviour of the client when a message fails, @see mix
+CLIENT = {"retries": 0, "backoff": 0.1, "multiplier": 2, "jitter": 0, "deadline": None}
+
+
+def mix(config):
+    """
+    Function to get the types of processes of a configuration, with their
+    weight in a mix, timeout and priority. These are configured with the
+    optional 'mix' key, a list with a dict for every process in 'process'.
+
+    The client can retry a message that failed (timed out, was rejected or
+    preempted), which is configured for all processes with the optional
+    'client' key, and per process in the mix, with the keys:
+
+    - retries:      Number of times a message is retried, default 0.
+    - backoff:      Time to wait before the first retry, default 0.1.
+    - multiplier:   Factor the backoff grows with every retry, default 2.
+    - jitter:       Fraction of the backoff that is random, default 0.
+    - deadline:     Time a transaction may take, after which it's abandoned,
+                    default none.
+
+    Parameters
+    ----------
+    config: dict
+        Configuration for the simulation, @see lib.Simulation.simulate.
+
+    Returns
+    -------
+    list
+        List of dicts with the kinds, weight, timeout, priority, path to the
+        seasonality of the weight (or None) and the behaviour of the client
+        of every process.
+    """
+    entries = config['mix'] if 'mix' in config else [{}] * len(config['process'])
+    client = dict(CLIENT, **(config['client'] if 'client' in config else {}))
+
+    # every process needs its entry in the mix
+    if len(entries) != len(config['process']):
+        raise ValueError(f"mix has {len(entries)} entries, configuration has {len(config['process'])} processes")
+
+    return [dict({key: entry[key] if key in entry else value for (key, value) in client.items()},
+                 kinds=kinds,
+                 weight=entry['weight'] if 'weight' in entry else 1,
+                 timeout=entry['timeout'] if 'timeout' in entry else config['timeout'],
+                 priority=entry['priority'] if 'priority' in entry else 1,
+                 seasonality=entry['seasonality'] if 'seasonality' in entry else None)
+            for (kinds, entry) in zip(config['process'], entries)]
 
 
 class MessageGenerator(object):
@@ -34,6 +88,33 @@ class MessageGenerator(object):
         kinds: list
             List of server kinds as sequence.
             [optional]
+        timeout: float
+            Time a server may take to process a message.
+            Default: 1.
+        latency: float
+            Network latency between two hops of a transaction, a request
+            on another server than the one the transaction is at is
+            released after the latency as well.
+            Default: 0.
+        restore: dict
+            State of the generator to continue from, @see MessageGenerator.state.
+            [optional]
+        stream: numpy.random.RandomState
+            Random number generator to draw the service demands of every
+            transaction from when it arrives, @see lib.Streams. Without
+            stream, the servers draw the demands when processing a message.
+            [optional]
+        mix: list
+            Types of processes to draw the type of every transaction from,
+            as dicts with the kinds, weight, timeout, priority, an optional
+            seasonality that scales the weight over time and the behaviour of
+            the client, @see mix. Replaces kinds and timeout.
+            [optional]
+        client: numpy.random.RandomState
+            Random number generator for the decisions of the client, i.e. the
+            jitter of the backoff of retries and the branches of process
+            graphs, @see lib.Streams.
+            Default: numpy.random.
         """
 
         # required seasonality
@@ -51,8 +132,35 @@ class MessageGenerator(object):
         # optional timeout duration
         self._timeout = kwargs['timeout'] if 'timeout' in kwargs else 1
 
+        # optional network latency between hops
+        self._latency = kwargs['latency'] if 'latency' in kwargs else 0
+
+        # optional stream for the service demands
+        self._stream = kwargs['stream'] if 'stream' in kwargs else None
+
+        # types of processes, a single one unless there's a mix
+        self._types = kwargs['mix'] if 'mix' in kwargs and kwargs['mix'] else [
+            dict(CLIENT, kinds=self._kinds, weight=1, timeout=self._timeout, priority=1, seasonality=None)]
+
+        # optional stream for the decisions of the client
+        self._client = kwargs['client'] if 'client' in kwargs and kwargs['client'] is not None else np.random
+
+        # the plans of the types of processes that are graphs, @see lib.Plan
+        self._plans = [plan(kind_type['kinds']) if graph(kind_type['kinds']) else None for kind_type in self._types]
+
         self.excludeservers = []
 
+        # event that is triggered when a paused generator resumes
+        self._paused = None
+
+        # transactions in flight, by id
+        self._transactions = {}
+
+        # moment of the next transaction, when restored from a checkpoint
+        self._next = None
+        if 'restore' in kwargs and kwargs['restore'] is not None:
+            self._next = kwargs['restore']['next']
+
         # Initialize message generator
         self.messages_process = envoirment.process(self.generate())
 
@@ -67,155 +175,747 @@ class MessageGenerator(object):
         # run indefinitely
         while True:
 
-            # timeout before proceeding to the next transaction
-            yield self._env.timeout(self._seasonality.interval())
+            # wait until we are resumed when paused
+            if self._paused is not None:
+                yield self._paused
+
+            # timeout before proceeding to the next transaction, a restored
+            # generator continues with the arrival it was waiting for
+            interval = self._seasonality.interval() if self._next is None else self._next - self._env.now
+            self._next = self._env.now + interval
+            yield self._env.timeout(interval)
+            self._next = None
+
+            # we could have been paused while waiting
+            if self._paused is not None:
+                continue
 
             # id of the current request
             process_id = uuid4()
 
-            # init a new request
-            clientrequest = self._env.process(self.client_request(process_id))
-            # process = Subprocess(self.environment, self._servers, kinds=self._kinds).process
+            # init a new request, of a type drawn from the mix
+            process = self._draw()
+            transaction = Transaction(process_id, self._types[process]['kinds'], self._env.now)
+            transaction.process = process
+
+            # the service demands of all hops are known when it arrives, so
+            # they don't depend on what happens to other transactions, the
+            # hops of a graph are only known while it runs
+            if self._stream is not None and self._plans[process] is None:
+                transaction.demands = self._stream.standard_exponential(len(transaction.kinds)).tolist()
 
-            # yield clientrequest
+            self.start(transaction)
 
-    def client_request(self, process_id):
+    def _draw(self):
         """
-        Client request consisting of messages to a sequence of servers.
+        Method to draw the type of process of a new transaction, by weight.
+
+        Returns
+        -------
+        integer
+            Index of the type of process.
+        """
+        # no need to draw without a mix
+        if len(self._types) == 1:
+            return 0
+
+        # the weights can vary with their seasonality
+        weights = [kind_type['weight'] * (kind_type['seasonality'].scale() if kind_type['seasonality'] else 1)
+                   for kind_type in self._types]
+
+        # pick the type in which a uniform draw over all weights falls
+        draw = (self._stream if self._stream is not None else np.random).random_sample() * sum(weights)
+        for (index, weight) in enumerate(weights):
+            draw -= weight
+            if draw < 0:
+                return index
+
+        return len(weights) - 1
+
+    def start(self, transaction):
+        """
+        Method to start (or continue) processing a transaction.
 
         Parameters
         ----------
-        process_id: uuid4 of request
+        transaction: Transaction
+
+        Returns
+        -------
+        simpy.Process
         """
+        # a graph walks its plan, which can't be checkpointed
+        if self._plans[transaction.process] is not None:
+            return self._env.process(self.client_plan(transaction))
 
-        # Set sequence of Servers
-        kinds = self._kinds
+        # keep track of the transactions in flight, so they can be checkpointed
+        self._transactions[transaction.id] = transaction
+
+        return self._env.process(self.client_request(transaction))
+
+    def transactions(self):
+        """
+        Method to expose the transactions that are in flight.
+
+        Returns
+        -------
+        list
+        """
+        return list(self._transactions.values())
+
+    def state(self, requests):
+        """
+        Method to expose the state of this generator as plain data.
 
-        # collection of servers processing a request
-        request_df = pd.DataFrame(
-            columns=["kind", "open_servers", "open_requests"])
+        Parameters
+        ----------
+        requests: dict
+            References to requests by their id, @see lib.Checkpoint.
+
+        Returns
+        -------
+        dict
+        """
+        return {"next": self._next,
+                "transactions": [transaction.state(requests) for transaction in self._transactions.values()]}
 
-        route = []
-        # get the client who requested this process
-        route.append({"name": 'client', "kind": "client"})
+    def pause(self):
+        """
+        Method to stop generating new transactions, e.g. while the simulation
+        is advanced with a fluid model. Transactions in flight continue.
 
-        # we need to iterate over all kinds
-        for (idx, kind) in enumerate(kinds):
+        Returns
+        -------
+        self
+        """
+        if self._paused is None:
+            self._paused = self._env.event()
+
+        # allow chaining
+        return self
+
+    def resume(self):
+        """
+        Method to continue generating new transactions after a pause.
+
+        Returns
+        -------
+        self
+        """
+        if self._paused is not None:
+            paused, self._paused = self._paused, None
+            paused.succeed()
 
-            current_message = []
+        # allow chaining
+        return self
+
+    def client_request(self, transaction):
+        """
+        Client request consisting of messages to a sequence of servers.
+
+        Parameters
+        ----------
+        transaction: Transaction
+            State of the transaction, which could be restored halfway.
+        """
+
+        # Set sequence of Servers
+        kinds = transaction.kinds
+
+        # timeout and priority of the type of transaction
+        kind_type = self._types[transaction.process]
+
+        # id of the transaction
+        process_id = transaction.id
+
+        # moment the transaction is abandoned, if any
+        deadline = transaction.start + kind_type['deadline'] if kind_type['deadline'] is not None else None
+
+        # we need to iterate over all kinds, starting where the transaction is
+        while transaction.position < len(kinds):
+            idx = transaction.position
+            kind = kinds[idx]
+
+            # a restored transaction can be halfway a hop
+            waiting, transaction.waiting = transaction.waiting, None
+
+            # a message that is retried waits for its backoff first
+            if waiting and waiting['phase'] == 'backoff':
+                transaction.waiting = waiting
+                try:
+                    yield self._env.timeout(waiting['until'] - self._env.now)
+                except Interrupt:
+                    self._env.log(
+                        f"{self._env.now};;ERROR;;;;{process_id};{transaction.requested_by['name']};Error due to PREEMPTED", level=40)
+                    transaction.outcome = 'preempted'
+                    break
+                transaction.waiting = waiting = None
+
+            # a transaction past its deadline is abandoned
+            if deadline is not None and self._env.now >= deadline:
+                self._env.log(
+                    f"{self._env.now};;ERROR;;;;{process_id};{transaction.requested_by['name']};Error due to DEADLINE at time {deadline}", level=40)
+                self._env.notify('deadline', kind=kind)
+                transaction.outcome = 'deadline'
+                break
+
+            # the message travels over the network to the next server
+            if (waiting is None and idx and self._latency) or (waiting and waiting['phase'] == 'latency'):
+                delay = waiting['until'] - self._env.now if waiting else self._latency
+                transaction.waiting = {"phase": 'latency', "until": self._env.now + delay}
+                yield self._env.timeout(delay)
+                transaction.waiting = waiting = None
 
             # Get server that requests the message
-            requested_by = route[idx]
+            requested_by = transaction.requested_by
+
+            # a restored message already holds the last open request
+            resumed = waiting is not None and waiting['phase'] == 'message'
+            previous = transaction.open[:-1] if resumed else transaction.open
 
             # reference to a return loop
             return_loop = None
 
             # Test if request is back at a previously accessed server
-            if kind in request_df["kind"].values:
+            for (index, row) in enumerate(previous):
+                if row['kind'] == kind:
 
-                # Remember first location of server
-                return_loop = request_df.index[request_df['kind'] == kind].tolist()
+                    # Remember first location of server
+                    return_loop = index
 
-                # Get same server as before:
-                server = request_df.loc[return_loop[0], "open_servers"]
+                    # Get same server as before:
+                    server = row['server']
+                    break
 
             else:
-                # we need to get access to a server pool
-                pool = self._pools.get(kind)
-                server = pool.server(exclude=self.excludeservers)
-
-            # Set kind of server in DataFrame
-            current_message.append(kind)
-
-            # add the open request to the collection of open servers, so
-            # we can release it later on
-            current_message.append(server)
+                if resumed:
+                    server = transaction.open[-1]['server']
+                else:
+                    # we need to get access to a server pool
+                    pool = self._pools.get(kind)
+                    server = pool.server(exclude=self.excludeservers)
 
             # attempt to parse a server request
             try:
 
-                # check if there's a server available
+                # check if there's a server available, the pool may have one
+                # again after a backoff, e.g. when a breaker closes
                 if not server:
-                    raise Exception("SERVER UNAVAILABLE")
-
-                # set used server in route
-                route.append(server.state())
+                    delay = self._backoff(transaction, kind_type, deadline)
+                    if delay is not None:
+                        transaction.waiting = {"phase": 'backoff', "until": self._env.now + delay}
+                        continue
 
-                # ask the server for a new request at
-                request = server.request()
-
-                # Add request to list of open open_requests
-                current_message.append(request)
+                    raise Exception("SERVER UNAVAILABLE")
 
-                request_df.loc[idx] = current_message
+                # the server sends the next message, a restored message
+                # already updated the state of the server before
+                state = server.state(update=not resumed)
+                sender = {"name": state['name'], "kind": state['kind']}
+
+                if resumed:
+                    request = transaction.open[-1]['request']
+                    timeout = waiting['until'] - self._env.now
+                    probe = transaction.message['probe'] if transaction.message and 'probe' in transaction.message \
+                        else None
+
+                else:
+                    # ask the server for a new request at, with the priority
+                    # of the transaction, a busy server only finishes its
+                    # messages of lower priority first
+                    request = server.request(priority=kind_type['priority'], preempt=False)
+
+                    # the breaker of a server we picked learns it's sent a
+                    # message, a server we hold was picked before
+                    probe = server.breaker.attempt() if server.breaker is not None and return_loop is None \
+                        else None
+
+                    # add the open request to the collection of open servers, so
+                    # we can release it later on
+                    transaction.open.append({"kind": kind, "server": server, "request": request})
+                    transaction.message = {"sent": self._env.now, "probe": probe}
+                    timeout = kind_type['timeout']
+
+                    # the client doesn't wait past the deadline
+                    if deadline is not None:
+                        timeout = min(timeout, deadline - self._env.now)
 
                 # Define message to server
                 sent_message = self._env.process(self.server_message(
-                    process_id, requested_by, request, server))
+                    process_id, requested_by, request, server, transaction=transaction,
+                    demand=transaction.demands[idx] if transaction.demands else None,
+                    timeout=kind_type['timeout']))
 
                 # send a message and wait for message or timeout to complete
-                yield sent_message | self._env.timeout(self._timeout)
+                transaction.waiting = {"phase": 'message', "until": self._env.now + timeout}
+                cause = "TIMEOUT"
+                try:
+                    yield sent_message | self._env.timeout(timeout)
+
+                except Interrupt as interrupt:
+                    # only the request of this message can be retried when
+                    # it's preempted, a request that was held before is lost
+                    if not (kind_type['retries'] and isinstance(interrupt.cause, Preempted)
+                            and interrupt.cause.resource is server):
+                        raise
+                    cause = interrupt.cause
+
+                transaction.waiting = None
+                transaction.message = None
+
+                # the message is processed, unless it failed in any way
+                processed = sent_message.triggered and sent_message.value is not False
 
                 # If message not triggered then timeout is past
                 if (not sent_message.triggered):
-                    sent_message.interrupt("TIMEOUT")
+                    sent_message.interrupt(cause)
+
+                    # tell the observers about the timeout
+                    if cause == "TIMEOUT":
+                        self._env.notify('timeout', server=server, kind=kind)
+
+                # the breaker of the server learns from the outcome
+                if server.breaker is not None:
+                    server.breaker.record(processed, probe=probe)
+
+                # a failed message is retried after a backoff
+                delay = self._backoff(transaction, kind_type, deadline) if not processed else None
+                if delay is not None:
+
+                    # the failed request is released, the retry asks for a
+                    # new one
+                    row = transaction.open.pop()
+                    server.release(request=row['request'])
+
+                    self._env.notify('retry', server=server, kind=kind)
+                    transaction.waiting = {"phase": 'backoff', "until": self._env.now + delay}
+                    continue
+
+                # a message that failed for good fails the transaction, even
+                # though it continues with the next hop
+                if not processed:
+                    transaction.outcome = 'rejected' if sent_message.triggered else \
+                        'timeout' if cause == "TIMEOUT" else 'preempted'
 
                 # When request is processed and return loop index exists
                 # Release in between servers
-                if return_loop:
+                if return_loop is not None:
 
                     # release all server requests between occurances of the same kind
-                    for row in request_df.loc[return_loop[0]:idx].itertuples(index=False):
+                    for row in transaction.open[return_loop:]:
 
                         # Get server and corresponding request
-                        server = getattr(row, "open_servers")
-                        request = getattr(row, "open_requests")
+                        server, request = row['server'], row['request']
 
                         # release the server request
                         if server and request:
-                            # Only release if request is still linked to server
-                            if request in server.users:
-                                server.release(request=request)
+                            # Only release if request is still linked to server,
+                            # or still waiting in its queue
+                            if request in server.users or not request.triggered:
+                                self._release(server, request, sender['name'])
 
-                    # remove closed request from DataFrame
-                    request_df = request_df.drop(range(return_loop[0], idx), axis=0)
+                    # remove closed requests, except the current one
+                    transaction.open = transaction.open[:return_loop] + transaction.open[-1:]
+
+                # continue with the next hop
+                transaction.requested_by = sender
+                transaction.position += 1
+                transaction.attempts = 0
 
             # handle exceptions
             except Exception as e:
-                print(e)
-                break
                 # log to the error log
                 self._env.log(
-                    f"{self._env.now};;ERROR;;;;{process_id};{requested_by['name']};Error due to {e}", level=40)
+                    f"{self._env.now};;ERROR;;;;{process_id};{requested_by['name']};Error due to {'PREEMPTED' if isinstance(e, Interrupt) else e}", level=40)
+                transaction.outcome = 'preempted' if isinstance(e, Interrupt) else 'unavailable'
+                break
 
         # release all server requests when entire loop is done
-        for row in request_df.itertuples(index=False):
+        for row in transaction.open:
 
             # Get server and corresponding request
-            server = getattr(row, "open_servers")
-            request = getattr(row, "open_requests")
+            server, request = row['server'], row['request']
 
             # release the server request
             if server and request:
-                server.release(request=request)
+                self._release(server, request, transaction.requested_by['name'])
+
+        # the transaction is no longer in flight
+        self._transactions.pop(process_id, None)
+
+        # tell the observers that the transaction is done
+        self._env.notify('transaction', id=process_id, start=transaction.start, end=self._env.now,
+                         process=transaction.process, outcome=transaction.outcome)
 
-    def server_message(self, process_id, requested_by, request, server):
-        start = self._env.now
+    def client_plan(self, transaction):
+        """
+        Client request that walks the plan of a process graph, @see lib.Plan.
+
+        Parameters
+        ----------
+        transaction: Transaction
+            State of the transaction.
+        """
         try:
-            # yield the request and timeout
-            yield request
-            # Get server state with current load
-            server_state = server.state()
-            yield self._env.timeout(server_state['latency'])
+            result = yield from self._node(transaction, self._plans[transaction.process], transaction.requested_by, [])
+
+            # the plan failed as a whole, e.g. none of the branches of an 'any'
+            # succeeded
+            if isinstance(result, str):
+                transaction.outcome = result
+
+        # a request that was held is lost, e.g. preempted by an error
+        except Interrupt:
+            self._env.log(
+                f"{self._env.now};;ERROR;;;;{transaction.id};client;Error due to PREEMPTED", level=40)
+            transaction.outcome = 'preempted'
+
+        # release all server requests when the plan is done
+        for row in transaction.open:
+            row['server'].release(request=row['request'])
+
+        # tell the observers that the transaction is done
+        self._env.notify('transaction', id=transaction.id, start=transaction.start, end=self._env.now,
+                         process=transaction.process, outcome=transaction.outcome)
+
+    def _node(self, transaction, node, requested_by, held):
+        """
+        Generator method to walk a node of a plan.
+
+        Parameters
+        ----------
+        transaction: Transaction
+        node: tuple
+            @see lib.Plan.plan.
+        requested_by: dict
+            Name and kind of the sender of the first message of the node.
+        held: list
+            Requests held by the current branch, to find return loops.
+
+        Returns
+        -------
+        dict|string
+            Name and kind of the sender of the next message, or how the node
+            failed when the branch can't continue, @see Transaction.outcome.
+        """
+        (type, payload) = node[:2]
+
+        if type == 'hop':
+            return (yield from self._hop(transaction, payload, node[2], requested_by, held))
+
+        if type == 'seq':
+            for child in payload:
+                requested_by = yield from self._node(transaction, child, requested_by, held)
+                if isinstance(requested_by, str):
+                    return requested_by
+            return requested_by
+
+        if type == 'choice':
+            (cumulative, children) = payload
+            index = min(int(np.searchsorted(cumulative, self._client.uniform(), side='right')), len(children) - 1)
+            return (yield from self._node(transaction, children[index], requested_by, held))
+
+        # branches run in parallel, each holds its own requests
+        pending = [self._env.process(self._branch(transaction, child, requested_by)) for child in payload]
+        succeeded, failed = False, None
+        try:
+            while pending:
+                yield self._env.any_of(pending)
+
+                done = [branch for branch in pending if branch.triggered]
+                pending = [branch for branch in pending if not branch.triggered]
+                failed = failed or next((branch.value for branch in done if isinstance(branch.value, str)), None)
+                succeeded = succeeded or any(not isinstance(branch.value, str) for branch in done)
+
+                # the first branch that succeeds is enough for 'any', and the
+                # first that fails is too much for 'all'
+                if (type == 'any' and succeeded) or (type == 'all' and failed):
+                    break
+
+        # the branches are of no use anymore
+        except Interrupt:
+            for branch in pending:
+                branch.interrupt("CANCELLED")
+            raise
+
+        for branch in pending:
+            branch.interrupt("CANCELLED")
+
+        # the node fails the way its first failed branch failed
+        if (type == 'all' and failed) or (type == 'any' and not succeeded):
+            return failed
+
+        # the sender of the branches continues once they're done
+        return requested_by
+
+    def _branch(self, transaction, node, requested_by):
+        """
+        Generator method to run a parallel branch of a plan.
+
+        Parameters
+        ----------
+        @see MessageGenerator._node
+
+        Returns
+        -------
+        dict|string
+        """
+        try:
+            return (yield from self._node(transaction, node, requested_by, []))
+
+        # the branch is cancelled, or one of its requests was lost
+        except Interrupt as interrupt:
+            return 'preempted' if isinstance(interrupt.cause, Preempted) else 'cancelled'
+
+    def _hop(self, transaction, kind, timeout, requested_by, held):
+        """
+        Generator method to send a message to a server of a kind, as part of
+        a plan.
+
+        Parameters
+        ----------
+        transaction: Transaction
+        kind: string
+        timeout: float|None
+            Timeout of the hop, None uses the timeout of the process.
+        requested_by: dict
+            Name and kind of the sender of the message.
+        held: list
+            Requests held by the current branch.
+
+        Returns
+        -------
+        dict|string
+            Name and kind of the server, which sends the next message, or how
+            the message failed: 'unavailable' when there was no server,
+            'timeout' or 'rejected'.
+        """
+        kind_type = self._types[transaction.process]
+        timeout = timeout if timeout is not None else kind_type['timeout']
+
+        # a return to a kind of this branch goes to the same server
+        return_loop = next((index for (index, row) in enumerate(held) if row['kind'] == kind), None)
+        if return_loop is not None:
+            server = held[return_loop]['server']
+        else:
+            server = self._pools.get(kind).server(exclude=self.excludeservers)
+
+        # we can't continue without a server
+        if not server:
+            self._env.log(
+                f"{self._env.now};;ERROR;;;;{transaction.id};{requested_by['name']};Error due to SERVER UNAVAILABLE", level=40)
+            return 'unavailable'
+
+        state = server.state()
+        sender = {"name": state['name'], "kind": state['kind']}
+
+        # ask the server for a new request, and hold it
+        request = server.request(priority=kind_type['priority'], preempt=False)
+
+        # the breaker of a server we picked learns it's sent a message, a
+        # server we hold was picked before
+        probe = server.breaker.attempt() if server.breaker is not None and return_loop is None else None
+        row = {"kind": kind, "server": server, "request": request}
+        held.append(row)
+        transaction.open.append(row)
+
+        # send a message and wait for message or timeout to complete
+        sent_message = self._env.process(self.server_message(
+            transaction.id, requested_by, request, server, timeout=timeout))
+        try:
+            yield sent_message | self._env.timeout(timeout)
+        except Interrupt as interrupt:
+            if not sent_message.triggered:
+                sent_message.interrupt(interrupt.cause)
+            raise
+
+        processed = sent_message.triggered and sent_message.value is not False
+        failure = None if processed else 'rejected' if sent_message.triggered else 'timeout'
+
+        # If message not triggered then timeout is past
+        if not sent_message.triggered:
+            sent_message.interrupt("TIMEOUT")
+            self._env.notify('timeout', server=server, kind=kind)
+
+        # the breaker of the server learns from the outcome
+        if server.breaker is not None:
+            server.breaker.record(processed, probe=probe)
+
+        # release all requests since the first visit of the kind
+        if return_loop is not None:
+            released = held[return_loop:]
+            for other in released:
+                if other['request'] in other['server'].users or not other['request'].triggered:
+                    other['server'].release(request=other['request'])
+
+            del held[return_loop:]
+            transaction.open = [other for other in transaction.open if all(other is not row for row in released)]
+
+        # a failed message fails the branch
+        return failure or sender
+
+    def _release(self, server, request, at):
+        """
+        Method to release a request of a transaction. The server the
+        transaction is at releases it right away, other servers learn about
+        it over the network, @see lib.Sharding.
+
+        Parameters
+        ----------
+        server: Server
+            Server that holds the request.
+        request: simpy.Request
+            Request to release.
+        at: string
+            Name of the server the transaction is at.
+        """
+        if not self._latency or server.name() == at:
+            server.release(request=request)
+            return
+
+        # the release travels over the network
+        event = self._env.timeout(self._latency)
+        event.callbacks.append(lambda _: server.release(request=request))
+
+    def _backoff(self, transaction, kind_type, deadline):
+        """
+        Method to decide if a failed message is retried, and after how long.
+
+        Parameters
+        ----------
+        transaction: Transaction
+        kind_type: dict
+            Type of the process of the transaction, @see mix.
+        deadline: float|None
+            Moment the transaction is abandoned.
+
+        Returns
+        -------
+        float|None
+            Time to wait before the retry, or None when the message is not
+            retried, because it was retried enough or the deadline is near.
+        """
+        if transaction.attempts >= kind_type['retries']:
+            return None
+
+        # the backoff grows exponentially, and part of it is random
+        delay = kind_type['backoff'] * kind_type['multiplier'] ** transaction.attempts
+        if kind_type['jitter']:
+            delay *= 1 - kind_type['jitter'] * self._client.uniform()
+
+        # a retry after the deadline is useless
+        if deadline is not None and self._env.now + delay >= deadline:
+            return None
+
+        transaction.attempts += 1
+        return delay
+
+    def server_message(self, process_id, requested_by, request, server, **kwargs):
+        """
+        Generator method to process a message on a server.
+
+        Parameters
+        ----------
+        process_id: uuid4 of request
+        requested_by: dict
+            Name and kind of the sender of the message.
+        request: simpy.Request
+            Request on the server.
+        server: Server
+            Server that processes the message.
+
+        Keyworded parameters
+        --------------------
+        transaction: Transaction
+            Transaction the message belongs to, to keep track of its state.
+            [optional]
+        demand: float
+            Service demand of the message, @see Server.latency.
+            [optional]
+        timeout: float
+            Time the server may take to process the message.
+            Default: the timeout of the generator.
+        """
+        transaction = kwargs['transaction'] if 'transaction' in kwargs else None
+        demand = kwargs['demand'] if 'demand' in kwargs else None
+        timeout = kwargs['timeout'] if 'timeout' in kwargs else self._timeout
+
+        # a restored message continues where it was
+        message = transaction.message if transaction is not None and transaction.message else {}
+        start = message['sent'] if 'sent' in message else self._env.now
+
+        # moment the server granted the request, until then the message waits
+        # in its queue
+        granted = message['granted'] if 'granted' in message else start
+        queued = 'granted' not in message
+
+        # the processing of the message on the server, once it started
+        serving = None
+        try:
+            if 'end' in message:
+                # the server already started processing the message
+                server_state = server.state(update=False)
+                yield self._env.timeout(message['end'] - self._env.now)
+                latency = message['latency'] if 'latency' in message else server_state['latency']
+
+            elif 'work' in message:
+                # a server that shares its cores was processing the message
+                server_state = server.state(update=False)
+                serving = server.serve(message['work'], message=message)
+                latency = yield serving
+
+            else:
+                # yield the request and timeout
+                yield request
+                granted = self._env.now
+                queued = False
+
+                # Get server state with current load
+                server_state = server.state(demand=demand, message=True)
+
+                # the server keeps track of the progress of the message, so
+                # it can be continued from a checkpoint, with the token of
+                # a probe of a half-open breaker and the latency it takes
+                message = {**message, "sent": start, "granted": granted, "latency": server_state['latency']}
+                if transaction is not None:
+                    transaction.message = message
+
+                serving = server.serve(server_state['latency'], message=message)
+                latency = yield serving
 
             # we need to construct a logmessage
             # and push onto the environment
             message = f"Requesting {server_state['name']} by {requested_by['name']}"
             self._env.log(
-                f"{self._env.now};{server_state['name']};INFO;{server_state['cpu']};{server_state['memory']};{server_state['latency']};{process_id};{requested_by['name']};{message}")
+                f"{self._env.now};{server_state['name']};INFO;{server_state['cpu']};{server_state['memory']};{latency};{process_id};{requested_by['name']};{message}")
+
+            # tell the observers about the processed message
+            self._env.notify('hop', id=process_id, server=server, kind=server_state['kind'],
+                             requested_by=requested_by['kind'], latency=latency,
+                             wait=granted - start, cpu=server_state['cpu'])
+
+        # a full server sheds the request
+        except Rejected as rejected:
+            server_state = server.state(update=False)
+            self._env.log(
+                f"{self._env.now};{server_state['name']};REJECTED;{server_state['cpu']};{server_state['memory']};{server_state['latency']};{process_id};{requested_by['name']};Rejected due to {rejected}", level=40)
+
+            # tell the observers about the rejection, and how long the message
+            # waited until it was shed
+            self._env.notify('rejected', server=server, kind=server_state['kind'])
+            self._env.notify('failed', id=process_id, server=server, kind=server_state['kind'],
+                             requested_by=requested_by['kind'], wait=self._env.now - start, latency=0.0,
+                             outcome='rejected')
+
+            # the client knows the message failed
+            return False
 
         # handle interruptions
         except Interrupt as interrupt:
+            # the server no longer processes the message
+            if serving is not None:
+                server.cancel(serving)
+
             server_state = server.state()
 
             # Check if error is due to interuption using error_generator
@@ -223,9 +923,19 @@ class MessageGenerator(object):
 
                 # Manually print timeout message
                 self._env.log(
-                    f"{self._env.now};{server_state['name']};ERROR;{server_state['cpu']};{server_state['memory']};{server_state['latency']};{process_id};{requested_by['name']};Error due to TIMEOUT at time {start + self._timeout}", level=40)
+                    f"{self._env.now};{server_state['name']};ERROR;{server_state['cpu']};{server_state['memory']};{server_state['latency']};{process_id};{requested_by['name']};Error due to TIMEOUT at time {start + timeout}", level=40)
             else:
 
                 # Use interrupt clause to write error message
                 self._env.log(
                     f"{self._env.now};{server_state['name']};ERROR;{server_state['cpu']};{server_state['memory']};{server_state['latency']};{process_id};{requested_by['name']};Error due to {interrupt.cause}", level=40)
+
+            # tell the observers how long the failed message waited, until it
+            # was granted or, when still queued, until it failed, and how long
+            # it was processed
+            self._env.notify('failed', id=process_id, server=server, kind=server_state['kind'],
+                             requested_by=requested_by['kind'],
+                             wait=(self._env.now if queued else granted) - start,
+                             latency=0.0 if queued else self._env.now - granted,
+                             outcome='preempted' if isinstance(interrupt.cause, Preempted)
+                             else str(interrupt.cause).lower())
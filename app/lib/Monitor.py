@@ -0,0 +1,136 @@
+"""
+Class for monitoring a running simulation. The monitor aggregates the events
+of a simulation per interval (of simulated time) and publishes the aggregated
+metrics on a channel, so they can be followed while the simulation runs.
+
+@file   lib/Monitor.py
+@scope  public
+"""
+
+
+class Monitor(object):
+
+    def __init__(self, envoirment, servers, channel, interval=1):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        servers: instance of MultiServers pool
+        channel: Channel
+            Channel to publish the metrics on.
+        interval: float
+            Simulated time between two publications.
+            Default: 1.
+        """
+        # Set simpy Envoirment
+        self._env = envoirment
+
+        # Set serverpools
+        self._pools = servers
+
+        # channel to publish on
+        self._channel = channel
+
+        # time between two publications
+        self._interval = interval
+
+        # counters of the current interval
+        self._reset()
+
+        # we need to be notified of all events in the simulation
+        envoirment.observer(self)
+
+        # Initialize monitor
+        self.monitor_process = envoirment.process(self.monitor())
+
+    def notify(self, event, data):
+        """
+        Method that is called by the environment when an event occurs.
+
+        Parameters
+        ----------
+        event: string
+            Name of the event.
+        data: dict
+            Data describing the event.
+        """
+        if event == 'transaction':
+            self._transactions += 1
+
+        elif event == 'hop':
+
+            # count the messages between two kinds of servers
+            link = (data['requested_by'], data['kind'])
+            self._links[link] = self._links.get(link, 0) + 1
+
+        elif event == 'timeout':
+            self._timeouts += 1
+
+        elif event == 'rejected':
+            self._rejected += 1
+
+        # a step of the fluid model accounts for many transactions at once
+        elif event == 'fluid':
+            self._transactions += data['transactions']
+            self._timeouts += data['timeouts']
+
+    def monitor(self):
+        """
+        Generator method to publish the metrics every interval.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        while True:
+
+            # wait for the interval to pass
+            yield self._env.timeout(self._interval)
+
+            # publish the metrics of the past interval
+            self._channel.publish(self.snapshot())
+
+            # and start counting again
+            self._reset()
+
+    def snapshot(self):
+        """
+        Method to expose the metrics of the current interval.
+
+        Returns
+        -------
+        dict
+        """
+        # metrics per kind of server
+        cpu, queue = {}, {}
+
+        for pool in self._pools.pools():
+
+            # the servers in this pool
+            servers = pool.servers()
+
+            # mean cpu usage and total queue length over the pool
+            cpu[pool.kind()] = sum(server.cpu() for server in servers) / len(servers) if servers else 0
+            queue[pool.kind()] = sum(len(server.queue) for server in servers)
+
+        return {
+            "time":         self._env.now,
+            "throughput":   self._transactions / self._interval,
+            "timeouts":     self._timeouts,
+            "rejected":     self._rejected,
+            "cpu":          cpu,
+            "queue":        queue,
+            "links":        [{"source": source, "target": target, "value": value}
+                             for ((source, target), value) in self._links.items()],
+        }
+
+    def _reset(self):
+        """
+        Method to reset the counters of the current interval.
+        """
+        self._transactions = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._links = {}
@@ -59,12 +59,54 @@ class MultiServers(object):
             print(f"Kind: {kind} not found in pools {self._pools}")
         return self._pools[kind] if kind in self._pools else None
 
-    def random_pool(self):
+    def pools(self):
+        """
+        Method to get all server pools.
+
+        Returns
+        -------
+        list
+        """
+        return list(self._pools.values())
+
+    def find(self, name):
+        """
+        Method to find a server by its name.
+
+        Parameters
+        ----------
+        name: string
+            Name of the server (e.g. balance#<uuid>).
+
+        Returns
+        -------
+        Server|None
+        """
+        # the kind is part of the name
+        pool = self._pools.get(name.split('#', 1)[0])
+
+        if pool is None:
+            return None
+
+        return next((server for server in pool.servers() if server.name() == name), None)
+
+    def random_pool(self, stream=None):
         """
         Method to get random server pool to break a server.
 
+        Parameters
+        ----------
+        stream: numpy.random.RandomState
+            Random number generator to pick the pool with, @see lib.Streams.
+            Default: the random module.
+
         Returns
         -------
         Server pool
         """
-        return choice(list(self._pools.values()))
+        pools = list(self._pools.values())
+
+        if stream is not None:
+            return pools[stream.randint(0, len(pools))]
+
+        return choice(pools)
@@ -0,0 +1,219 @@
+"""
+Class for finding the smallest server pools that meet a service level
+objective, instead of trying sizes by hand. The size of every pool is searched
+by bisection between one server and its configured size, with the other pools
+at the smallest size known to meet the objective so far. The pools are
+searched at the same time, so every round is a batch of runs on the parallel
+runner (@see lib.Runner), and runs that clearly violate the objective are
+stopped early (@see lib.Guard).
+
+Pools are not independent, e.g. a slow pool holds the requests on the pools
+before it, so the smallest sizes are verified together once the bisection is
+done, and pools are grown one server at a time, starting with the pool with
+the most timeouts, until the objective is met.
+
+The result is the cheapest configuration, together with its performance
+envelope: the spread of its latency, timeouts and cost over the seeds.
+
+@file   lib/Optimizer.py
+@scope  public
+"""
+
+# dependencies
+from lib.Runner import Runner
+
+# 3rd party dependencies
+import copy
+
+
+class Optimizer(object):
+
+    def __init__(self, config, slo, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        config: dict
+            Configuration for the simulation, @see lib.Simulation.simulate.
+            Its pools should be large enough to meet the objective.
+        slo: dict
+            Service level objective, @see lib.Statistics.Statistics.slo.
+
+        Keyworded parameters
+        --------------------
+        kinds: list
+            Kinds of servers to size.
+            Default: all kinds.
+        seeds: list
+            Seeds to run every configuration with, it only meets the
+            objective when it does for all of them.
+            Default: the seed of the configuration, or 1.
+        runner: Runner
+            Runner for the simulations.
+            Default: a runner with a process per cpu.
+        rounds: integer
+            Maximum number of rounds of growing the pools to meet the
+            objective together.
+            Default: 10.
+        Any other keyworded parameter is passed on to lib.Runner.run.
+        """
+        self._config = config
+        self._slo = slo
+
+        self._kinds = kwargs.pop('kinds') if 'kinds' in kwargs else [server['kind'] for server in config['servers']]
+        self._seeds = kwargs.pop('seeds') if 'seeds' in kwargs else [config['seed'] if 'seed' in config else 1]
+        self._runner = kwargs.pop('runner') if 'runner' in kwargs else Runner()
+        self._rounds = kwargs.pop('rounds') if 'rounds' in kwargs else 10
+        self._kwargs = kwargs
+
+        # number of simulations that were run
+        self.evaluations = 0
+
+    def configure(self, sizes, seed=None):
+        """
+        Method to create the configuration with the given pool sizes.
+
+        Parameters
+        ----------
+        sizes: dict
+            Number of servers by kind.
+        seed: integer
+            Seed of the run.
+            [optional]
+
+        Returns
+        -------
+        dict
+        """
+        config = copy.deepcopy(self._config)
+
+        for server in config['servers']:
+            if server['kind'] in sizes:
+                server['size'] = sizes[server['kind']]
+
+        if seed is not None:
+            config['seed'] = seed
+
+        return config
+
+    def evaluate(self, candidates, early_stop=True):
+        """
+        Method to run configurations with all seeds, in parallel.
+
+        Parameters
+        ----------
+        candidates: list
+            Pool sizes of every configuration, @see Optimizer.configure.
+        early_stop: bool
+            Stop runs that clearly violate the objective.
+            Default: True.
+
+        Returns
+        -------
+        list
+            For every configuration, the measurements of its runs, @see
+            lib.Runner.run, with the judgement of the objective under 'slo'.
+        """
+        configs = [self.configure(sizes, seed) for sizes in candidates for seed in self._seeds]
+        results = self._runner.map(configs, slo=self._slo, early_stop=self._slo if early_stop else None,
+                                   **self._kwargs)
+        self.evaluations += len(configs)
+
+        # a run that was stopped early violates the objective, whatever its
+        # statistics say
+        for result in results:
+            result['slo']['met'] = result['slo']['met'] and result['statistics']['stopped'] is None
+
+        return [results[index:index + len(self._seeds)] for index in range(0, len(results), len(self._seeds))]
+
+    def optimize(self):
+        """
+        Method to search the smallest pools that meet the objective.
+
+        Returns
+        -------
+        dict
+            The cheapest configuration under 'config', its pool sizes under
+            'sizes', its performance envelope under 'envelope', and the
+            number of simulations that were run under 'evaluations'.
+
+        Raises
+        ------
+        ValueError
+            When the configured pools don't meet the objective.
+        """
+        configured = {server['kind']: server['size'] for server in self._config['servers']}
+
+        # the configured pools are the upper bound, they have to meet the objective
+        upper = self.evaluate([configured], early_stop=False)[0]
+        if not all(result['slo']['met'] for result in upper):
+            raise ValueError("the configured pools don't meet the objective, make them larger")
+
+        # sizes known to violate and to meet the objective, by kind
+        low = {kind: 0 for kind in self._kinds}
+        high = {kind: configured[kind] for kind in self._kinds}
+
+        # bisect all kinds at once, every kind with the others at their
+        # smallest size known to meet the objective
+        while any(high[kind] - low[kind] > 1 for kind in self._kinds):
+            probes = {kind: (low[kind] + high[kind]) // 2 for kind in self._kinds if high[kind] - low[kind] > 1}
+            candidates = [{**configured, **high, kind: size} for (kind, size) in probes.items()]
+
+            for ((kind, size), results) in zip(probes.items(), self.evaluate(candidates)):
+                if all(result['slo']['met'] for result in results):
+                    high[kind] = size
+                else:
+                    low[kind] = size
+
+        # the smallest sizes together, grown until they meet the objective
+        sizes = {**configured, **high}
+        for round in range(self._rounds + 1):
+            results = self.evaluate([sizes], early_stop=False)[0]
+            if all(result['slo']['met'] for result in results):
+                break
+
+            # the pool with the most timeouts grows, but never beyond its
+            # configured size, which is where we fall back to
+            growable = [kind for kind in self._kinds if sizes[kind] < configured[kind]]
+            if not growable or round == self._rounds:
+                (sizes, results) = (configured, upper)
+                break
+
+            kind = max(growable, key=lambda kind: sum(result['statistics']['kinds'].get(kind, {}).get('timeouts', 0)
+                                                      for result in results))
+            sizes[kind] += 1
+
+        return {
+            "config":       self.configure(sizes),
+            "sizes":        sizes,
+            "envelope":     self._envelope(results),
+            "evaluations":  self.evaluations,
+        }
+
+    def _envelope(self, results):
+        """
+        Method to summarize the spread of the runs of a configuration.
+
+        Parameters
+        ----------
+        results: list
+            Measurements of the runs, @see Optimizer.evaluate.
+
+        Returns
+        -------
+        dict
+            Minimum and maximum over the runs, of the latency percentiles, the
+            fraction of the messages that timed out, and the server-seconds.
+        """
+        def spread(values):
+            return {"min": min(values), "max": max(values)}
+
+        statistics = [result['statistics'] for result in results]
+
+        return {
+            "latency":  {key: spread([summary['latency'][key] for summary in statistics])
+                         for key in ('mean', 'p50', 'p90', 'p99')},
+            "timeouts": spread([result['slo']['timeouts'] for result in results]),
+            "cost":     spread([sum(summary['cost'].values()) for summary in statistics]),
+        }
@@ -0,0 +1,132 @@
+"""
+Functions for compiling a process graph into an execution plan. A process is
+normally a sequence of kinds of servers, which is visited hop by hop. A process
+graph can also call several servers in parallel and take conditional branches.
+A graph is built from these nodes:
+
+- "balance":                        a hop to a server of a kind;
+- {"hop": "balance", "timeout": 2}: a hop with its own timeout;
+- ["balance", ...]:                 a sequence of nodes;
+- {"all": [...]}:                   branches in parallel, waiting for all;
+- {"any": [...]}:                   branches in parallel, waiting for the first
+                                    that succeeds, the others are cancelled;
+- {"choice": [{"weight": 3, "then": ...}, ...]}:
+                                    one of the branches, drawn by weight.
+
+A hop fails when its message times out, is rejected or finds no server, which
+fails its sequence, and the transaction fails the way its first failed node did.
+
+For example, a transaction that checks the balance, then calls the payment and
+credit servers in parallel, and continues with either of two servers:
+
+    ["balance", {"all": ["payment", "credit"]},
+     {"choice": [{"weight": 9, "then": "authentication"}, {"weight": 1, "then": []}]}]
+
+A graph is compiled once into nested tuples, so running a transaction does
+nothing but walk the plan, @see lib.MessageGenerator.client_plan.
+
+@file   lib/Plan.py
+@scope  public
+"""
+
+# 3rd party dependencies
+import numpy as np
+
+
+def graph(spec):
+    """
+    Function to check if a process is a graph, rather than a sequence of kinds.
+
+    Parameters
+    ----------
+    spec: list|dict|string
+
+    Returns
+    -------
+    bool
+    """
+    return not (isinstance(spec, list) and all(isinstance(node, str) for node in spec))
+
+
+def plan(spec, timeout=None):
+    """
+    Function to compile a process graph into a plan.
+
+    Parameters
+    ----------
+    spec: list|dict|string
+        The process graph.
+    timeout: float
+        Timeout of the hops without a timeout of their own, None uses the
+        timeout of the process when the plan runs.
+        [optional]
+
+    Returns
+    -------
+    tuple
+        A node of the plan: ('hop', kind, timeout), ('seq', nodes),
+        ('all', nodes), ('any', nodes) or ('choice', (cumulative weights,
+        nodes)).
+    """
+    if isinstance(spec, str):
+        return ('hop', spec, timeout)
+
+    if isinstance(spec, list):
+        return ('seq', tuple(plan(node, timeout) for node in spec))
+
+    if not isinstance(spec, dict):
+        raise ValueError(f"invalid node in process graph: {spec!r}")
+
+    if 'hop' in spec:
+        return ('hop', spec['hop'], spec['timeout'] if 'timeout' in spec else timeout)
+
+    for type in ('all', 'any'):
+        if type in spec:
+            if not spec[type]:
+                raise ValueError(f"'{type}' node without branches in process graph")
+            return (type, tuple(plan(node, timeout) for node in spec[type]))
+
+    if 'choice' in spec:
+        if not spec['choice']:
+            raise ValueError("'choice' node without branches in process graph")
+
+        # the weights are normalized and accumulated, so drawing a branch is
+        # a single search
+        weights = np.array([branch['weight'] if 'weight' in branch else 1 for branch in spec['choice']], dtype=float)
+        return ('choice', (np.cumsum(weights) / weights.sum(),
+                           tuple(plan(branch['then'], timeout) for branch in spec['choice'])))
+
+    raise ValueError(f"invalid node in process graph: {spec!r}")
+
+
+def kinds(spec):
+    """
+    Function to flatten a process graph into the sequence of kinds it visits,
+    e.g. for models that only know sequences (@see lib.Analytic). Parallel
+    branches are visited one after the other, and of a choice only the most
+    likely branch, so this is an approximation.
+
+    Parameters
+    ----------
+    spec: list|dict|string
+
+    Returns
+    -------
+    list
+    """
+    if isinstance(spec, str):
+        return [spec]
+
+    if isinstance(spec, list):
+        return [kind for node in spec for kind in kinds(node)]
+
+    if 'hop' in spec:
+        return [spec['hop']]
+
+    for type in ('all', 'any'):
+        if type in spec:
+            return [kind for node in spec[type] for kind in kinds(node)]
+
+    # the most likely branch of a choice
+    branch = max(spec['choice'], key=lambda branch: branch['weight'] if 'weight' in branch else 1)
+    return kinds(branch['then'])
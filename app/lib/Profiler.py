@@ -0,0 +1,297 @@
+"""
+Class for profiling where the wall time of a simulation goes. The profiler
+hooks into the step method of an environment, counting and timing the events
+per type and per process generator (e.g. client_request, server_message or
+error_generator). Hot sections, such as logging, server selection and random
+number generation, can be instrumented as well.
+
+The profiler is opt-in: an environment without a profiler runs unchanged,
+so there is no cost when profiling is disabled.
+
+@file   lib/Profiler.py
+@scope  public
+"""
+
+# dependencies
+from time import perf_counter
+from functools import wraps
+from simpy.events import Process
+import numpy as np
+
+# local dependencies
+import lib.Server
+import lib.MessageGenerator
+
+
+class Profiler(object):
+
+    def __init__(self, envoirment):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+            Environment to profile.
+        """
+        # Set simpy Envoirment
+        self._env = envoirment
+
+        # count and wall time per (generator, event type)
+        self._events = {}
+
+        # count and wall time per (generator, event type, section)
+        self._sections = {}
+
+        # key of the event that is currently being processed
+        self._current = None
+
+        # collection of (owner, name, original) tuples that we patched
+        self._patched = []
+
+        # we need to hook into the step method of this environment only,
+        # simpy.Environment.run calls self.step, so the instance attribute is used
+        self._step = envoirment.step
+        envoirment.step = self.step
+
+        # logging is done through the environment
+        self.patch(envoirment, 'log', 'logging')
+
+    def instrument(self, servers=None, seasonality=None):
+        """
+        Method to instrument the hot sections of a simulation.
+
+        Parameters
+        ----------
+        servers: MultiServers
+            Server pools of which the server selection should be timed.
+        seasonality: Seasonality
+            Source of intervals between transactions.
+
+        Returns
+        -------
+        self
+        """
+        # time the selection of servers in every pool
+        if servers is not None:
+            for pool in servers.pools():
+                self.patch(pool, 'server', 'server selection')
+
+        # the interval between transactions is a random draw
+        if seasonality is not None:
+            self.patch(seasonality, 'interval', 'rng')
+
+        # random number generators that are used within the modules, the
+        # pools and the error generator draw from numpy.random itself
+        self.patch(lib.Server, 'exponential', 'rng')
+        self.patch(np.random, 'randint', 'rng')
+        self.patch(np.random, 'shuffle', 'rng')
+        self.patch(np.random, 'uniform', 'rng')
+        self.patch(lib.MessageGenerator, 'uuid4', 'rng')
+
+        # allow chaining
+        return self
+
+    def patch(self, owner, name, section):
+        """
+        Method to time all calls to an attribute of an object or module
+        as a section of the event that is being processed.
+
+        Parameters
+        ----------
+        owner: object
+            Object or module that owns the callable.
+        name: string
+            Name of the callable.
+        section: string
+            Name of the section the time is accounted to.
+
+        Returns
+        -------
+        self
+        """
+        # the callable we need to wrap
+        original = getattr(owner, name)
+
+        # reference to the collection of timed sections
+        sections = self._sections
+
+        @wraps(original)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                key = (self._current, section)
+                entry = sections.get(key)
+                if entry is None:
+                    entry = sections[key] = [0, 0.0]
+                entry[0] += 1
+                entry[1] += perf_counter() - start
+
+        # install the wrapper, and remember how to undo it
+        setattr(owner, name, wrapper)
+        self._patched.append((owner, name, original))
+
+        # allow chaining
+        return self
+
+    def uninstall(self):
+        """
+        Method to undo all patches, so the profiler no longer affects the
+        environment or the instrumented modules.
+
+        Returns
+        -------
+        self
+        """
+        # restore the patched callables in reverse order
+        while self._patched:
+            owner, name, original = self._patched.pop()
+            setattr(owner, name, original)
+
+        # restore the step method
+        self._env.step = self._step
+
+        # allow chaining
+        return self
+
+    def step(self):
+        """
+        Method that replaces Environment.step, to count and time the event
+        that is processed.
+        """
+        # the environment's queue is a heap of (time, priority, id, event) tuples,
+        # the next event is the one on top of it
+        queue = self._env._queue
+        event = queue[0][3] if queue else None
+
+        # account the time to the generator that is resumed by the event
+        key = self._current = (self._generator(event), type(event).__name__)
+
+        start = perf_counter()
+        try:
+            self._step()
+        finally:
+            entry = self._events.get(key)
+            if entry is None:
+                entry = self._events[key] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += perf_counter() - start
+            self._current = None
+
+    def table(self):
+        """
+        Method to expose the profile as a table, sorted by wall time.
+
+        Returns
+        -------
+        list
+            List of dicts with the generator, event, section, count and wall time.
+        """
+        rows = [{"generator": generator, "event": event, "section": '',
+                 "count": count, "wall": wall}
+                for ((generator, event), (count, wall)) in self._events.items()]
+
+        rows += [{"generator": key[0] if key else '', "event": key[1] if key else '',
+                  "section": section, "count": count, "wall": wall}
+                 for ((key, section), (count, wall)) in self._sections.items()]
+
+        return sorted(rows, key=lambda row: row['wall'], reverse=True)
+
+    def report(self):
+        """
+        Method to expose a human readable report of the profile.
+
+        Returns
+        -------
+        string
+        """
+        rows = self.table()
+
+        # total wall time spent processing events
+        total = sum(wall for (count, wall) in self._events.values()) or 1
+
+        lines = ["{0:<20} {1:<16} {2:<18} {3:>10} {4:>10} {5:>7} {6:>9}".format(
+            'generator', 'event', 'section', 'count', 'wall (s)', '%', 'us/call')]
+
+        for row in rows:
+            lines.append("{0:<20} {1:<16} {2:<18} {3:>10} {4:>10.3f} {5:>7.1f} {6:>9.2f}".format(
+                row['generator'], row['event'], row['section'], row['count'], row['wall'],
+                100 * row['wall'] / total, 1e6 * row['wall'] / row['count']))
+
+        return "\n".join(lines)
+
+    def collapsed(self):
+        """
+        Method to expose the profile as collapsed stacks, which can be read by
+        flame graph tools. The value of every stack is its wall time in
+        microseconds, excluding the time of its sections.
+
+        Returns
+        -------
+        list
+            List of strings.
+        """
+        # wall time of the sections per event
+        nested = {}
+        for ((key, section), (count, wall)) in self._sections.items():
+            nested[key] = nested.get(key, 0.0) + wall
+
+        lines = []
+
+        # the time spent in the events themselves
+        for ((generator, event), (count, wall)) in self._events.items():
+            own = max(wall - nested.get((generator, event), 0.0), 0.0)
+            lines.append(f"{generator};{event} {int(own * 1e6)}")
+
+        # the time spent in the sections
+        for ((key, section), (count, wall)) in self._sections.items():
+            stack = f"{key[0]};{key[1]}" if key else 'setup'
+            lines.append(f"{stack};{section} {int(wall * 1e6)}")
+
+        return lines
+
+    def write(self, path):
+        """
+        Method to write the collapsed stacks to a file.
+
+        Parameters
+        ----------
+        path: string
+            Path to the output file.
+
+        Returns
+        -------
+        self
+        """
+        with open(path, 'w') as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+
+        # allow chaining
+        return self
+
+    def _generator(self, event):
+        """
+        Method to find the name of the process generator that is resumed by
+        an event.
+
+        Parameters
+        ----------
+        event: simpy.Event
+
+        Returns
+        -------
+        string
+        """
+        if event is None:
+            return 'none'
+
+        # the callbacks of the event resume the processes waiting for it
+        for callback in event.callbacks or ():
+            process = getattr(callback, '__self__', None)
+            if isinstance(process, Process):
+                return process.name
+
+        # conditions and other events are handled by simpy itself
+        return 'simpy'
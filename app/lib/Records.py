@@ -0,0 +1,256 @@
+"""
+Class for writing a summary record of every transaction, next to the logfiles.
+The logs have a line per message, so the end-to-end latency of a transaction
+can only be known by grouping all lines on their transaction id afterwards. A
+record has everything about a transaction at once: when it started and ended,
+its latency, how it went (its outcome, @see lib.Transaction), how long its
+messages waited in a queue versus were processed, and its slowest hop.
+
+The records are columnar, every field is an array in a compressed numpy file
+(.npz), with a second set of arrays for the hops of the transactions. Reading
+them back for e.g. the latency percentiles of a run is a matter of
+milliseconds, @see load:
+
+    (transactions, hops) = load("Logs/records-log_0001_....npz")
+    transactions[transactions['outcome'] == 'ok']['latency'].quantile(0.99)
+
+Every message is a hop of its transaction, also the ones that failed, with how
+they failed as their outcome (e.g. 'timeout', or 'cancelled' for a branch that
+was no longer needed). The wait, service and slowest hop of a transaction are
+those of its critical path: the chain of hops it actually waited for. For a
+sequence that's every hop, for parallel branches only the branch that ended
+last (all) or the one that succeeded first (any), @see critical.
+
+The columns are written to the file in chunks of transactions while the
+simulation runs, so a long run doesn't keep all of its records in memory.
+
+@file   lib/Records.py
+@scope  public
+"""
+
+# 3rd party dependencies
+import zipfile
+import numpy as np
+import pandas as pd
+
+# fields of a transaction and of a hop, with their types
+TRANSACTION = {
+    'id':               str,
+    'process':          int,
+    'start':            float,
+    'end':              float,
+    'latency':          float,
+    'outcome':          str,
+    'hops':             int,
+    'wait':             float,
+    'service':          float,
+    'slowest':          str,
+    'slowest_kind':     str,
+    'slowest_latency':  float,
+}
+HOP = {
+    'transaction':      int,
+    'kind':             str,
+    'server':           str,
+    'start':            float,
+    'end':              float,
+    'wait':             float,
+    'service':          float,
+    'outcome':          str,
+    'critical':         bool,
+}
+
+# number of transactions that are written at once
+CHUNK = 65536
+
+# hops that end this close to one another are consecutive
+EPSILON = 1e-9
+
+
+def critical(hops):
+    """
+    Function to find the critical path of a transaction: starting from the hop
+    that ended last, every time the hop that ended last before it started.
+    When two hops end at the same moment, e.g. the branch that succeeded and
+    the branches that were cancelled because of it, the processed one is on
+    the path.
+
+    Parameters
+    ----------
+    hops: list
+        Hops of the transaction as dicts, with at least start, end and
+        outcome.
+
+    Returns
+    -------
+    list
+        The hops on the critical path, in the order they ran.
+    """
+    path = []
+    moment = float('inf')
+
+    for hop in sorted(hops, key=lambda hop: (hop['end'], hop['outcome'] == 'ok', hop['end'] - hop['start']),
+                      reverse=True):
+        if hop['end'] <= moment + EPSILON:
+            path.append(hop)
+            moment = hop['start']
+
+    return path[::-1]
+
+
+class Records(object):
+
+    def __init__(self, envoirment, path, chunk=CHUNK):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        path: string
+            Path to write the records to, while the simulation runs and once
+            it is done.
+        chunk: integer
+            Number of transactions that are written at once.
+            Default: 65536.
+        """
+        self._env = envoirment
+        self._path = path
+        self._chunk = chunk
+
+        # hops of the transactions in flight, by id
+        self._pending = {}
+
+        # the fields of the transactions and hops that are done, but not
+        # written yet
+        self._transactions = {field: [] for field in TRANSACTION}
+        self._hops = {field: [] for field in HOP}
+
+        # number of transactions recorded, and chunks written
+        self._rows = 0
+        self._chunks = 0
+
+        # the chunks are members of a single numpy archive
+        self._file = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+
+        # we need to be notified of all hops and transactions
+        envoirment.observer(self)
+
+    def notify(self, event, data):
+        """
+        Method that is called by the environment when an event occurs.
+
+        Parameters
+        ----------
+        event: string
+            Name of the event.
+        data: dict
+            Data describing the event.
+        """
+        if event == 'hop' or event == 'failed':
+            self._pending.setdefault(data['id'], []).append({
+                "kind":     data['kind'],
+                "server":   data['server'].name(),
+                "start":    self._env.now - data['wait'] - data['latency'],
+                "end":      self._env.now,
+                "wait":     data['wait'],
+                "service":  data['latency'],
+                "outcome":  data['outcome'] if event == 'failed' else 'ok',
+            })
+
+        elif event == 'transaction':
+            hops = self._pending.pop(data['id'], [])
+
+            # the transaction only waited for the hops on its critical path
+            path = critical(hops)
+            for hop in hops:
+                hop['critical'] = any(hop is other for other in path)
+
+                # the hops refer to the transaction by its row
+                for field in HOP:
+                    self._hops[field].append(self._rows if field == 'transaction' else hop[field])
+
+            # the slowest hop is where the transaction spent most of its time
+            slowest = max(path, key=lambda hop: hop['wait'] + hop['service']) if path else \
+                {"server": '', "kind": '', "wait": 0.0, "service": 0.0}
+
+            record = (str(data['id']), data['process'] if 'process' in data else 0, data['start'], data['end'],
+                      data['end'] - data['start'], data['outcome'] if 'outcome' in data else 'ok', len(hops),
+                      sum(hop['wait'] for hop in path), sum(hop['service'] for hop in path),
+                      slowest['server'], slowest['kind'], slowest['wait'] + slowest['service'])
+            for (field, value) in zip(TRANSACTION, record):
+                self._transactions[field].append(value)
+
+            self._rows += 1
+
+            # write the records once we have a chunk of them
+            if len(self._transactions['id']) >= self._chunk:
+                self._flush()
+
+    def _flush(self):
+        """
+        Method to write the records that are not written yet as the next
+        chunk of the file.
+        """
+        arrays = {field: np.array(values, dtype=TRANSACTION[field]) for (field, values) in self._transactions.items()}
+        arrays.update({f"hop_{field}": np.array(values, dtype=HOP[field]) for (field, values) in self._hops.items()})
+
+        for (name, array) in arrays.items():
+            with self._file.open(f"{name}.{self._chunks:06d}.npy", 'w', force_zip64=True) as f:
+                np.lib.format.write_array(f, array, allow_pickle=False)
+
+        self._transactions = {field: [] for field in TRANSACTION}
+        self._hops = {field: [] for field in HOP}
+        self._chunks += 1
+
+    def __len__(self):
+        """
+        Method to expose the number of transactions that were recorded.
+
+        Returns
+        -------
+        integer
+        """
+        return self._rows
+
+    def write(self):
+        """
+        Method to write the last records to their file, and close it.
+
+        Returns
+        -------
+        string
+            Path of the file.
+        """
+        if self._transactions['id'] or not self._chunks:
+            self._flush()
+
+        self._file.close()
+        return self._path
+
+
+def load(path):
+    """
+    Function to read the records of a simulation.
+
+    Parameters
+    ----------
+    path: string
+        Path to the records, @see Records.write.
+
+    Returns
+    -------
+    tuple
+        The transactions and their hops, as pandas.DataFrames, the transaction
+        of a hop is its row in the transactions.
+    """
+    with np.load(path) as arrays:
+
+        # the chunks of a column, in the order they were written
+        def column(name):
+            return np.concatenate([arrays[key] for key in sorted(arrays.files) if key.rsplit('.', 1)[0] == name])
+
+        transactions = pd.DataFrame({field: column(field) for field in TRANSACTION})
+        hops = pd.DataFrame({field: column(f"hop_{field}") for field in HOP})
+
+    return (transactions, hops)
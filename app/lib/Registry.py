@@ -0,0 +1,356 @@
+"""
+Class for keeping track of simulations by id, together with their corresponding
+logfiles. All runs are stored in a sqlite database, so routes and scripts can look
+up a simulation without scanning the logs directory.
+
+@file   lib/Registry.py
+@scope  public
+"""
+
+# dependencies
+import os
+import re
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+# location of the registry database relative to this file
+REGISTRY_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '../simulations.db'))
+
+# pattern of logfile names written by a simulation,
+# e.g. log_0001_2020-01-28_15-30_One-server-per-type-low-usage.csv
+LOGFILE_PATTERN = re.compile(r'^(?P<prefix>[^_]+)_(?P<id>\d+)_(?P<date>\d{4}-\d{2}-\d{2})_(?P<time>\d{2}-\d{2})(_(?P<description>.*))?\.csv$')
+
+# schema of the registry, the created column is indexed so simulations can be
+# looked up by date without a full table scan
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS simulations (
+    id          INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL,
+    description TEXT,
+    created     TEXT NOT NULL,
+    config      TEXT,
+    seed        INTEGER,
+    runtime     REAL,
+    walltime    REAL,
+    log_file    TEXT,
+    error_file  TEXT,
+    stats       TEXT
+);
+CREATE INDEX IF NOT EXISTS simulations_created ON simulations (created);
+"""
+
+
+class Registry(object):
+
+    def __init__(self, path=REGISTRY_PATH):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        path: string
+            Path to the sqlite database file. The file is created when it
+            does not exist yet.
+        """
+        # flask serves requests from multiple threads, so we share a
+        # single connection and guard it with a lock
+        self._lock = threading.Lock()
+
+        # open the database and make sure the schema exists
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+
+    def reserve(self, **kwargs):
+        """
+        Method to reserve the id of a new simulation, by registering it before
+        it runs, so simulations that start at the same time never get the same
+        id. Once the simulation is done, it's registered under the reserved
+        id, @see Registry.register, a simulation that fails gives its id up,
+        @see Registry.discard.
+
+        Keyworded parameters
+        --------------------
+        description: string
+            Description of the simulation.
+        created: datetime
+            Moment the simulation was started. Default: now.
+
+        Returns
+        -------
+        int
+        """
+        created = kwargs['created'] if 'created' in kwargs else datetime.now()
+
+        # sqlite hands out the next id of the primary key in the same statement
+        with self._lock, self._db:
+            cursor = self._db.execute('INSERT INTO simulations (name, description, created) VALUES (?,?,?)',
+                                      ('', kwargs.get('description'), created.isoformat(sep=' ', timespec='seconds')))
+
+        return cursor.lastrowid
+
+    def discard(self, id):
+        """
+        Method to give up a reserved id, e.g. of a simulation that failed. A
+        simulation that was registered already is kept.
+
+        Parameters
+        ----------
+        id: int
+            Id of the simulation.
+
+        Returns
+        -------
+        self
+        """
+        # only a reservation has no name yet
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM simulations WHERE id = ? AND name = ''", (int(id), ))
+
+        # allow chaining
+        return self
+
+    def count(self):
+        """
+        Method to get the number of registered simulations.
+
+        Returns
+        -------
+        int
+        """
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM simulations').fetchone()[0]
+
+    def register(self, id, name, **kwargs):
+        """
+        Method to register a simulation. Registering an id that already
+        exists overwrites the previous record.
+
+        Parameters
+        ----------
+        id: int
+            Id of the simulation.
+        name: string
+            Name of the simulation, used as base of its logfile names.
+
+        Keyworded parameters
+        --------------------
+        description: string
+            Description of the simulation.
+        created: datetime
+            Moment the simulation was started. Default: now.
+        config: dict
+            Configuration the simulation was run with.
+        seed: int
+            Seed of the random number generators.
+        runtime: float
+            Simulated runtime.
+        walltime: float
+            Wall clock time the simulation took, in seconds.
+        log_file: string
+            Path to the logfile.
+        error_file: string
+            Path to the error logfile.
+        stats: dict
+            Summary statistics of the simulation.
+
+        Returns
+        -------
+        self
+        """
+        # moment of creation, stored as iso string so it sorts by date
+        created = kwargs['created'] if 'created' in kwargs else datetime.now()
+
+        # we need a record to store
+        record = (
+            id,
+            name,
+            kwargs.get('description'),
+            created.isoformat(sep=' ', timespec='seconds'),
+            json.dumps(kwargs['config']) if 'config' in kwargs else None,
+            kwargs.get('seed'),
+            kwargs.get('runtime'),
+            kwargs.get('walltime'),
+            kwargs.get('log_file'),
+            kwargs.get('error_file'),
+            json.dumps(kwargs['stats']) if 'stats' in kwargs else None,
+        )
+
+        # store the record
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO simulations VALUES (?,?,?,?,?,?,?,?,?,?,?)', record)
+
+        # allow chaining
+        return self
+
+    def get(self, id):
+        """
+        Method to look up a simulation by its id.
+
+        Parameters
+        ----------
+        id: int
+            Id of the simulation.
+
+        Returns
+        -------
+        dict|None
+        """
+        with self._lock:
+            row = self._db.execute('SELECT * FROM simulations WHERE id = ?', (int(id), )).fetchone()
+
+        # expose the record if it exists
+        return self._record(row) if row else None
+
+    def find(self, name):
+        """
+        Method to look up the most recent simulation with a name, e.g. the
+        name of its logfile without extension.
+
+        Parameters
+        ----------
+        name: string
+            Name of the simulation.
+
+        Returns
+        -------
+        dict|None
+        """
+        with self._lock:
+            row = self._db.execute('SELECT * FROM simulations WHERE name = ? ORDER BY created DESC, id DESC LIMIT 1',
+                                   (name, )).fetchone()
+
+        # expose the record if it exists
+        return self._record(row) if row else None
+
+    def latest(self):
+        """
+        Method to get the most recently created simulation.
+
+        Returns
+        -------
+        dict|None
+        """
+        # a listing of one is all we need
+        records = self.list(limit=1)
+
+        # expose the first record if there is one
+        return records[0] if records else None
+
+    def list(self, limit=50, offset=0, date=None):
+        """
+        Method to list simulations, newest first. Only a single page is read
+        from the database, so this stays cheap with thousands of runs.
+
+        Parameters
+        ----------
+        limit: int
+            Maximum number of simulations to list.
+        offset: int
+            Number of simulations to skip.
+        date: string
+            Optional date (YYYY-MM-DD) to list the simulations of.
+
+        Returns
+        -------
+        list
+        """
+        # filter on the indexed creation date if a date is given
+        if date is not None:
+            query = 'SELECT * FROM simulations WHERE created >= ? AND created < ? ORDER BY created DESC, id DESC LIMIT ? OFFSET ?'
+            params = (date, date + '~', limit, offset)
+        else:
+            query = 'SELECT * FROM simulations ORDER BY created DESC, id DESC LIMIT ? OFFSET ?'
+            params = (limit, offset)
+
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+
+        # expose the records as dicts
+        return [self._record(row) for row in rows]
+
+    def scan(self, directory, prefix='log'):
+        """
+        Method to register logfiles that were written without the registry,
+        e.g. before it existed. Logfiles that are already registered are
+        skipped, a logfile with the id of another simulation, e.g. from
+        another directory, is registered under a new id.
+
+        Parameters
+        ----------
+        directory: string
+            Directory containing logfiles.
+        prefix: string
+            Prefix of the logfiles to register.
+
+        Returns
+        -------
+        int
+            Number of newly registered simulations.
+        """
+        # number of simulations that we registered
+        registered = 0
+
+        # the directory may not exist (yet)
+        if not os.path.isdir(directory):
+            return registered
+
+        # the logfiles that are registered already
+        with self._lock:
+            known = {row[0] for row in self._db.execute('SELECT log_file FROM simulations WHERE log_file IS NOT NULL')}
+
+        for filename in sorted(os.listdir(directory)):
+
+            # we are only interested in logfiles with the given prefix
+            match = LOGFILE_PATTERN.match(filename)
+            if match is None or match.group('prefix') != prefix:
+                continue
+
+            # skip logfiles that are already known
+            log_file = os.path.join(directory, filename)
+            if log_file in known:
+                continue
+
+            # the name of the error logfile is derived from the logfile
+            name = filename[:-len('.csv')]
+            error_file = os.path.join(directory, f"error-{filename}")
+            created = datetime.strptime(match.group('date') + match.group('time'), '%Y-%m-%d%H-%M')
+            description = (match.group('description') or '').replace('-', ' ')
+
+            # keep the id of the logfile, unless another simulation has it
+            id = int(match.group('id'))
+            if self.get(id) is not None:
+                id = self.reserve(description=description, created=created)
+
+            # register the simulation with all we know from the filename
+            self.register(id, name,
+                          description=description,
+                          created=created,
+                          log_file=log_file,
+                          error_file=error_file if os.path.exists(error_file) else None)
+
+            registered += 1
+
+        return registered
+
+    def _record(self, row):
+        """
+        Method to convert a database row to a dict.
+
+        Parameters
+        ----------
+        row: sqlite3.Row
+
+        Returns
+        -------
+        dict
+        """
+        record = dict(row)
+
+        # decode the json columns
+        for key in ('config', 'stats'):
+            record[key] = json.loads(record[key]) if record[key] else None
+
+        return record
@@ -0,0 +1,138 @@
+"""
+Class for running simulations in parallel. Every simulation runs in a fresh
+worker process, so runs don't share state and their peak memory usage can be
+measured independently. The logs of a run are written to a temporary directory
+and removed afterwards, only the measurements of the run are kept.
+
+@file   lib/Runner.py
+@scope  public
+"""
+
+# dependencies
+from lib.Simulation import simulate
+from lib.Statistics import Statistics
+
+# 3rd party dependencies
+import os
+import resource
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from multiprocessing import Pool
+
+# location of the default seasonality file relative to this file
+SEASONALITY_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '../seasonality/week.csv'))
+
+
+def run(config, **kwargs):
+    """
+    Function to run a single simulation and measure it.
+
+    Parameters
+    ----------
+    config: dict
+        Configuration for the simulation, @see lib.Simulation.simulate.
+
+    Keyworded parameters
+    --------------------
+    seasonality: string
+        Path to the seasonality file.
+        Default: seasonality/week.csv.
+    slo: dict
+        Service level objective to judge the run by, @see
+        lib.Statistics.Statistics.slo.
+        [optional]
+    Any other keyworded parameter is passed on to lib.Simulation.simulate.
+
+    Returns
+    -------
+    dict
+    """
+    # the seasonality to use for the run
+    seasonality = kwargs.pop('seasonality') if 'seasonality' in kwargs else SEASONALITY_PATH
+
+    # the objective to judge the run by, if any
+    slo = kwargs.pop('slo') if 'slo' in kwargs else None
+
+    # we need to keep statistics to know how much work was done
+    statistics = Statistics()
+
+    with TemporaryDirectory() as log_dir:
+
+        # run the simulation and time it
+        start = perf_counter()
+        simulate(1, config, seasonality, log_dir, 'run',
+                 config['description'] if 'description' in config else 'run',
+                 statistics=statistics, **kwargs)
+        walltime = perf_counter() - start
+
+        # size of all logs that were written
+        log_bytes = sum(entry.stat().st_size for entry in os.scandir(log_dir))
+
+    # peak resident memory of this process, linux reports it in kilobytes
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    # we don't want to divide by zero for runs without transactions
+    transactions = statistics.transactions
+
+    measurements = {
+        "walltime":                     walltime,
+        "events":                       statistics.events,
+        "events_per_sec":               statistics.events / walltime,
+        "transactions":                 transactions,
+        "transactions_per_sec":         transactions / walltime,
+        "peak_rss_mb":                  peak_rss,
+        "log_bytes":                    log_bytes,
+        "log_bytes_per_transaction":    log_bytes / transactions if transactions else 0.0,
+        "statistics":                   statistics.summary(),
+    }
+
+    if slo is not None:
+        measurements['slo'] = statistics.slo(slo)
+
+    return measurements
+
+
+def _run(arguments):
+    """
+    Helper function to unpack the arguments of a run in a worker process.
+    """
+    config, kwargs = arguments
+    return run(config, **kwargs)
+
+
+class Runner(object):
+
+    def __init__(self, processes=None):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        processes: integer
+            Number of simulations to run in parallel.
+            Default: the number of cpus.
+        """
+        self._processes = processes or os.cpu_count()
+
+    def map(self, configs, **kwargs):
+        """
+        Method to run a collection of simulations in parallel.
+
+        Parameters
+        ----------
+        configs: list
+            Configurations of the simulations to run.
+
+        Keyworded parameters
+        --------------------
+        @see run
+
+        Returns
+        -------
+        list
+            Measurements of the runs, in the order of the configurations.
+        """
+        # every worker runs a single simulation, so no state is shared
+        # between runs and their peak memory usage is their own
+        with Pool(self._processes, maxtasksperchild=1) as pool:
+            return pool.map(_run, [(config, kwargs) for config in configs], chunksize=1)
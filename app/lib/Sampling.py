@@ -0,0 +1,199 @@
+"""
+Class for writing a sample of the info log, instead of every line. Most runs
+only need the logs for a look at some transactions and for the metrics per
+server, while the log of a heavy run is mostly INFO lines. A sampled log keeps
+every ERROR line (and every other line above INFO) and every line that isn't
+part of a transaction, e.g. of the fluid model. Of the INFO lines of the
+transactions it keeps:
+
+- head:         all lines of a fraction (rate) of the transactions, decided
+                when the first line of a transaction comes by, so a
+                transaction is either complete or not in the log at all, e.g.
+                {"mode": "head", "rate": 0.01};
+- reservoir:    at most a number of lines (size) per server per second of
+                simulated time, drawn uniformly from the lines of that second,
+                e.g. {"mode": "reservoir", "size": 5}.
+
+Every line gets a weight, the number of lines it stands for, in an extra
+Weight column, so the metrics per server can still be estimated without bias,
+@see lib.LogProcessing.weighted_metrics. The online statistics (@see
+lib.Statistics) and the number of logged messages (@see
+lib.Environment.counts) are kept for all lines, so they are exact.
+
+The decisions are drawn from a random number generator of their own, seeded
+with the seed of the simulation, so the same seed gives the same sample. With
+head sampling the logger has to be an observer of the environment, so it can
+forget the decision for a transaction once it's done, @see notify.
+
+With reservoir sampling the lines of a second are written once the second is
+over, the reservoirs are written early when a checkpoint is made.
+
+@file   lib/Sampling.py
+@scope  public
+"""
+
+# 3rd party dependencies
+import random
+
+# ways of sampling the info lines
+MODES = ('head', 'reservoir')
+
+
+class SampledLogger(object):
+
+    def __init__(self, logger, config, seed=None):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        logger: Logger
+            Logger that writes the sampled lines.
+        config: dict
+            Configuration of the sampling, with the keys mode (default head),
+            and rate (default 0.01) or size (default 5).
+        seed: integer
+            Seed of the decisions and the reservoirs, which have their own
+            random number generator, so sampling doesn't change the
+            simulation.
+            [optional]
+        """
+        self._logger = logger
+
+        self._mode = config['mode'] if 'mode' in config else 'head'
+        if self._mode not in MODES:
+            raise ValueError(f"unknown sampling mode {self._mode}, expected one of {MODES}")
+
+        self._rate = config['rate'] if 'rate' in config else 0.01
+        self._size = config['size'] if 'size' in config else 5
+        if not 0 < self._rate <= 1 or self._size < 1:
+            raise ValueError("sampling needs a rate between 0 and 1, and a size of at least 1")
+
+        # whether the transactions in flight are sampled, by id
+        self._sampled = {}
+
+        # the second of the reservoirs, the number of lines seen and the lines
+        # kept per server, and the lines that are always kept, in the order
+        # they came
+        self._random = random.Random(seed)
+        self._second = None
+        self._reservoirs = {}
+        self._kept = []
+        self._sequence = 0
+
+    def log(self, message, level=20):
+        """
+        Method to log a message, if it's part of the sample.
+
+        Parameters
+        ----------
+        message: string
+            Message to log.
+        level: integer
+            Level of logging (default: 20).
+
+        Returns
+        -------
+        self
+        """
+        fields = message.split(';', 7)
+
+        # lines above INFO, and lines that aren't part of a transaction, e.g.
+        # of the fluid model (@see lib.Hybrid), are always kept
+        kept = level > 20 or len(fields) < 7 or not fields[6]
+
+        if self._mode == 'head':
+            if kept:
+                self._logger.log(f"{message};1", level)
+
+            # the transaction is sampled as a whole
+            else:
+                if fields[6] not in self._sampled:
+                    self._sampled[fields[6]] = self._random.random() < self._rate
+                if self._sampled[fields[6]]:
+                    self._logger.log(f"{message};{1 / self._rate}", level)
+
+            # allow chaining
+            return self
+
+        # the reservoirs of a second are written once the second is over
+        second = int(float(fields[0]))
+        if second != self._second:
+            self._flush()
+            self._second = second
+
+        self._sequence += 1
+        if kept:
+            self._kept.append((self._sequence, message, level))
+
+            # allow chaining
+            return self
+
+        # every line of the server so far has the same chance to be kept
+        reservoir = self._reservoirs.setdefault(fields[1], [0, []])
+        reservoir[0] += 1
+        if len(reservoir[1]) < self._size:
+            reservoir[1].append((self._sequence, message, level))
+        else:
+            index = self._random.randrange(reservoir[0])
+            if index < self._size:
+                reservoir[1][index] = (self._sequence, message, level)
+
+        # allow chaining
+        return self
+
+    def notify(self, event, data):
+        """
+        Method that is called by the environment when an event occurs.
+
+        Parameters
+        ----------
+        event: string
+            Name of the event.
+        data: dict
+            Data describing the event.
+        """
+        # a transaction that is done has no more lines
+        if event == 'transaction':
+            self._sampled.pop(str(data['id']), None)
+
+    def _flush(self):
+        """
+        Method to write the lines kept of the current second, in the order
+        they were logged.
+        """
+        lines = [(sequence, f"{message};1", level) for (sequence, message, level) in self._kept]
+        for (seen, kept) in self._reservoirs.values():
+            lines.extend((sequence, f"{message};{seen / len(kept)}", level) for (sequence, message, level) in kept)
+
+        for (_, message, level) in sorted(lines):
+            self._logger.log(message, level)
+
+        self._reservoirs = {}
+        self._kept = []
+
+    def offset(self):
+        """
+        Method to expose the size of the logfile, after everything that was
+        kept so far has been written, @see Logger.offset.
+
+        Returns
+        -------
+        int
+        """
+        self._flush()
+        return self._logger.offset()
+
+    def close(self):
+        """
+        Method to write what's left and close the logfile, @see Logger.close.
+
+        Returns
+        -------
+        self
+        """
+        self._flush()
+        self._logger.close()
+
+        # allow chaining
+        return self
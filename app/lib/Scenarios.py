@@ -0,0 +1,497 @@
+"""
+Classes for failure and maintenance scenarios. Where the error generator blocks
+a single random server at a time, a scenario describes how servers fail and
+are maintained over the whole run, e.g. every server of a pool fails now and
+then and is repaired, or all servers of a zone go down at once. Scenarios are
+configured as a list, e.g.
+
+    "scenarios": [
+        {"type": "failures", "pools": ["database"],
+         "mttf": {"model": "exponential", "mean": 3600},
+         "mttr": {"model": "lognormal", "mean": 300, "sigma": 0.5}},
+        {"type": "maintenance", "pools": ["balance"], "fraction": 0.5,
+         "windows": [{"start": 7200, "end": 9000}], "every": 86400}
+    ]
+
+with one of the types:
+
+- failures:     every server of the pools fails independently, after a time
+                to failure (mttf), and is repaired after a time to repair
+                (mttr);
+- outage:       correlated failures, after a time to failure (mttf) a whole
+                pool (scope 'pool') or a zone in all pools (scope 'zone',
+                with the number of zones) goes down for a time to repair
+                (mttr), the servers of a pool are spread over the zones;
+- rolling:      rolling restarts from a start moment, and every period
+                (every) if given, a batch of servers of a pool at a time is
+                down for a duration, with a gap between the batches;
+- slowdown:     a number of random servers of the pools (servers) slow down
+                gradually through Server.faulty_patch, up to a factor over a
+                ramp of a number of steps, stay slow for a while (hold) and
+                recover at once, from a start moment or after every time to
+                failure (mttf);
+- maintenance:  scheduled windows (start and end) in which a fraction of the
+                servers of every pool is down, repeated every period (every)
+                if given.
+
+Without pools, a scenario applies to all pools. Times are either a number or a
+distribution, configured as a service time model (@see lib.ServiceTime), a
+number is fixed, apart from mttf and mttr, which are exponential with the
+number as mean. A server that is down is blocked (@see lib.Server.block), and
+with the drain option the load balancer no longer sends it messages, which is
+the default for restarts and maintenance. With the reject option, a server
+that is down rejects its requests, instead of queueing them until it's up.
+
+Every scenario is a single process, no matter how many servers it affects.
+The servers are those of the pools at the moment a scenario picks them, so
+with autoscaling (@see lib.Autoscaler) servers that are added fail as well,
+and servers that are removed no longer do, a server that is removed while it
+is down still comes up again, to finish the messages it has.
+
+@file   lib/Scenarios.py
+@scope  public
+"""
+
+# dependencies
+from lib.ServiceTime import create as service_time, Exponential
+
+# 3rd party dependencies
+import heapq
+import math
+from itertools import count
+import numpy as np
+
+
+def create(envoirment, servers, config, **kwargs):
+    """
+    Function to create a scenario from its configuration.
+
+    Parameters
+    ----------
+    envoirment: instance of Envoirment class
+    servers: MultiServers
+    config: dict
+        Configuration of the scenario, with its type under 'type'.
+
+    Keyworded parameters
+    --------------------
+    @see Scenario.__init__
+
+    Returns
+    -------
+    Scenario
+    """
+    if config['type'] not in TYPES:
+        raise ValueError(f"unknown scenario {config['type']}, expected one of {sorted(TYPES)}")
+
+    return TYPES[config['type']](envoirment, servers, config, **kwargs)
+
+
+class Scenario(object):
+    """
+    Scenario is the base class of all scenarios, a scenario only has to
+    describe when which servers go down in its run method.
+    """
+
+    # type of the scenario in the error log
+    label = 'Scenario'
+
+    # whether a server that is down is drained from the load balancer by default
+    drain = False
+
+    def __init__(self, envoirment, servers, config, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        servers: MultiServers
+            Server pools of the simulation.
+        config: dict
+            Configuration of the scenario.
+
+        Keyworded parameters
+        --------------------
+        stream: numpy.random.RandomState
+            Random number generator of the scenario, @see lib.Streams.
+            Default: numpy.random.
+        """
+        # Set simpy Envoirment
+        self._env = envoirment
+
+        self._config = config
+        self._stream = kwargs['stream'] if 'stream' in kwargs and kwargs['stream'] is not None else np.random
+
+        # the pools the scenario applies to, their servers are read when the
+        # scenario needs them, as autoscaling changes them during the run
+        self._servers = servers
+        self._kinds = config['pools'] if 'pools' in config else [pool.kind() for pool in servers.pools()]
+
+        # the servers of every pool in the order they were first seen, the
+        # load balancer shuffles the servers of a pool
+        self._order = {kind: [] for kind in self._kinds}
+        self.pools()
+
+        self._drain = config['drain'] if 'drain' in config else self.drain
+        self._reject = config['reject'] if 'reject' in config else False
+
+        # Initialize scenario process
+        self.scenario_process = envoirment.process(self.run())
+
+    def _time(self, key, default=None, mean=False):
+        """
+        Method to create a function that draws a time of the configuration.
+
+        Parameters
+        ----------
+        key: string
+            Key of the time in the configuration.
+        default: float
+            Time when the configuration doesn't have it.
+            [optional]
+        mean: bool
+            A number is the mean of an exponential distribution, rather than
+            a fixed time.
+            Default: False.
+
+        Returns
+        -------
+        callable
+        """
+        spec = self._config[key] if key in self._config else default
+
+        if spec is None:
+            raise ValueError(f"scenario {self._config['type']} needs {key}")
+
+        if isinstance(spec, dict):
+            return service_time(spec, stream=self._stream).sample
+
+        if mean:
+            return Exponential(spec, stream=self._stream).sample
+
+        return lambda: spec
+
+    def pools(self):
+        """
+        Method to expose the servers of the pools the scenario applies to, at
+        this moment, in the order they were first seen.
+
+        Returns
+        -------
+        dict
+            The servers by the kind of their pool.
+        """
+        for (kind, order) in self._order.items():
+            current = self._servers.get(kind).servers()
+            order[:] = [server for server in order if server in current] + \
+                       [server for server in current if server not in order]
+
+        return {kind: list(order) for (kind, order) in self._order.items()}
+
+    def servers(self):
+        """
+        Method to expose all servers the scenario applies to, at this moment.
+
+        Returns
+        -------
+        list
+        """
+        return [server for pool in self.pools().values() for server in pool]
+
+    def down(self, servers):
+        """
+        Method to take servers down.
+
+        Parameters
+        ----------
+        servers: list
+
+        Returns
+        -------
+        self
+        """
+        for server in servers:
+            server.block(drain=self._drain, reject=self._reject)
+
+            # Write to error log
+            self._env.log(message=f'{self._env.now};{server.name()};{self.label};Start', type="error")
+            # Tell the observers about the error
+            self._env.notify('block', server=server, state='start')
+
+        # allow chaining
+        return self
+
+    def up(self, servers):
+        """
+        Method to bring servers up again.
+
+        Parameters
+        ----------
+        servers: list
+
+        Returns
+        -------
+        self
+        """
+        for server in servers:
+            server.unblock(drain=self._drain, reject=self._reject)
+
+            # Write to error log
+            self._env.log(message=f'{self._env.now};{server.name()};{self.label};Stop', type="error")
+            # Tell the observers the error is resolved
+            self._env.notify('block', server=server, state='stop')
+
+        # allow chaining
+        return self
+
+    def run(self):
+        """
+        Generator method of the scenario process.
+
+        Yields
+        ------
+        simpy.Event
+        """
+        raise NotImplementedError
+
+
+class Failures(Scenario):
+    """
+    Failures of every server on its own, @see lib.Scenarios.
+    """
+
+    label = 'Failure'
+
+    def __init__(self, envoirment, servers, config, **kwargs):
+        # servers that were added to the pools since the process last looked,
+        # the process is woken up to schedule their failure
+        self._added = []
+        self._wakeup = envoirment.event()
+
+        super().__init__(envoirment, servers, config, **kwargs)
+
+        # we need to be notified of the servers an autoscaler adds
+        envoirment.observer(self)
+
+    def notify(self, event, data):
+        """
+        Method that is called by the environment when an event occurs.
+
+        Parameters
+        ----------
+        event: string
+            Name of the event.
+        data: dict
+            Data describing the event.
+        """
+        if event != 'scale' or data['state'] != 'start' or data['kind'] not in self._kinds:
+            return
+
+        self._added.append((data['kind'], data['server']))
+        if not self._wakeup.triggered:
+            self._wakeup.succeed()
+
+    def run(self):
+        mttf = self._time('mttf', mean=True)
+        mttr = self._time('mttr', mean=True)
+
+        # the next moment every server fails or is repaired, with a sequence
+        # to break ties, a single process waits for the first of them
+        sequence = count()
+        moments = [(self._env.now + mttf(), next(sequence), kind, server, True)
+                   for (kind, pool) in self.pools().items() for server in pool]
+        heapq.heapify(moments)
+
+        while True:
+            # servers that were added fail like the others
+            for (kind, server) in self._added:
+                heapq.heappush(moments, (self._env.now + mttf(), next(sequence), kind, server, True))
+            self._added = []
+
+            # wait for the first moment, or for servers to be added
+            events = [self._wakeup] + ([self._env.timeout(moments[0][0] - self._env.now)] if moments else [])
+            yield self._env.any_of(events)
+            if self._wakeup.triggered:
+                self._wakeup = self._env.event()
+                continue
+
+            (_, _, kind, server, failing) = heapq.heappop(moments)
+            current = self._servers.get(kind).servers()
+
+            # a server that was removed no longer fails
+            if failing and server in current:
+                self.down([server])
+                heapq.heappush(moments, (self._env.now + mttr(), next(sequence), kind, server, False))
+
+            # but it is repaired, to finish what it has
+            elif not failing:
+                self.up([server])
+                if server in current:
+                    heapq.heappush(moments, (self._env.now + mttf(), next(sequence), kind, server, True))
+
+
+class Outage(Scenario):
+    """
+    Correlated failures of a pool or zone, @see lib.Scenarios.
+    """
+
+    label = 'Outage'
+
+    def run(self):
+        mttf = self._time('mttf', mean=True)
+        mttr = self._time('mttr', mean=True)
+
+        scope = self._config['scope'] if 'scope' in self._config else 'pool'
+        if scope not in ('pool', 'zone'):
+            raise ValueError(f"unknown scope {scope} of outage, expected 'pool' or 'zone'")
+
+        zones = self._config['zones'] if 'zones' in self._config else 2
+
+        while True:
+            yield self._env.timeout(mttf())
+
+            # the groups of servers that fail together, the servers of a pool
+            # are spread over the zones
+            if scope == 'pool':
+                groups = list(self.pools().values())
+            else:
+                groups = [[server for pool in self.pools().values() for server in pool[zone::zones]]
+                          for zone in range(zones)]
+
+            group = groups[self._stream.randint(0, len(groups))]
+            self.down(group)
+            yield self._env.timeout(mttr())
+            self.up(group)
+
+
+class Rolling(Scenario):
+    """
+    Rolling restarts, @see lib.Scenarios.
+    """
+
+    label = 'Restart'
+    drain = True
+
+    def run(self):
+        duration = self._time('duration', default=60)
+        gap = self._time('gap', default=0)
+        batch = self._config['batch'] if 'batch' in self._config else 1
+
+        every = self._config['every'] if 'every' in self._config else None
+
+        start = self._config['start'] if 'start' in self._config else 0
+        while True:
+            yield self._env.timeout(max(start - self._env.now, 0))
+
+            # restart a batch of servers of a pool at a time, of the servers
+            # the pool had when the restarts started and still has
+            for (kind, pool) in self.pools().items():
+                for index in range(0, len(pool), batch):
+                    current = self._servers.get(kind).servers()
+                    servers = [server for server in pool[index:index + batch] if server in current]
+                    self.down(servers)
+                    yield self._env.timeout(duration())
+                    self.up(servers)
+                    yield self._env.timeout(gap())
+
+            # restarts that take longer than the period start again right away
+            if not every:
+                return
+            start += every
+
+
+class Slowdown(Scenario):
+    """
+    Gradual slowdowns, @see lib.Scenarios.
+    """
+
+    label = 'Slowdown'
+
+    def run(self):
+        hold = self._time('hold', default=60)
+        mttf = self._time('mttf', mean=True) if 'mttf' in self._config else None
+
+        factor = self._config['factor'] if 'factor' in self._config else 10
+        ramp = self._config['ramp'] if 'ramp' in self._config else 60
+        steps = self._config['steps'] if 'steps' in self._config else 10
+        number = self._config['servers'] if 'servers' in self._config else 1
+
+        # a slowdown starts at a moment, or after every time to failure
+        start = self._config['start'] if 'start' in self._config else 0
+        if mttf is None and start > self._env.now:
+            yield self._env.timeout(start - self._env.now)
+
+        while True:
+            if mttf is not None:
+                yield self._env.timeout(mttf())
+
+            # random servers slow down together
+            candidates = self.servers()
+            servers = [candidates[index] for index in
+                       self._stream.choice(len(candidates), min(number, len(candidates)), replace=False)]
+
+            for server in servers:
+                self._env.log(message=f'{self._env.now};{server.name()};{self.label};Start', type="error")
+                self._env.notify('slowdown', server=server, state='start')
+
+            # the latency grows step by step, up to the factor
+            for step in range(1, steps + 1):
+                for server in servers:
+                    server.faulty_patch(1 + (factor - 1) * step / steps)
+                yield self._env.timeout(ramp / steps)
+
+            # the servers stay slow, until they recover at once
+            yield self._env.timeout(hold())
+            for server in servers:
+                server.faulty_patch(False)
+                self._env.log(message=f'{self._env.now};{server.name()};{self.label};Stop', type="error")
+                self._env.notify('slowdown', server=server, state='stop')
+
+            if mttf is None:
+                return
+
+
+class Maintenance(Scenario):
+    """
+    Scheduled maintenance windows, @see lib.Scenarios.
+    """
+
+    label = 'Maintenance'
+    drain = True
+
+    def run(self):
+        fraction = self._config['fraction'] if 'fraction' in self._config else 1
+        every = self._config['every'] if 'every' in self._config else None
+
+        # the windows in order, a window that is repeated comes back a period later
+        windows = [(window['start'], window['end']) for window in self._config['windows']]
+        heapq.heapify(windows)
+
+        while windows:
+            (start, end) = heapq.heappop(windows)
+
+            # a window that overlaps the previous one only lasts for what's left
+            if end > self._env.now:
+                yield self._env.timeout(max(start - self._env.now, 0))
+
+                # the same servers of every pool are maintained in every
+                # window, as long as the pool doesn't change
+                servers = [server for pool in self.pools().values()
+                           for server in pool[:math.ceil(fraction * len(pool))]]
+                self.down(servers)
+                yield self._env.timeout(end - self._env.now)
+                self.up(servers)
+
+            if every:
+                heapq.heappush(windows, (start + every, end + every))
+
+
+# scenarios by their type in the configuration
+TYPES = {
+    'failures':     Failures,
+    'outage':       Outage,
+    'rolling':      Rolling,
+    'slowdown':     Slowdown,
+    'maintenance':  Maintenance,
+}
@@ -43,15 +43,17 @@ class TransactionInterval(Seasonality):
     interval between two transactions.
     """
 
-    def __init__(self, seasonality_file, enviroment=None, max_volume=None):
+    def __init__(self, seasonality_file, enviroment=None, max_volume=None, stream=None):
         Seasonality.__init__(self, seasonality_file, enviroment)
         self.max_vol = max_volume
+        # Random number generator to draw the volumes from, see lib.Streams
+        self.stream = stream if stream is not None else np.random
 
     def interval(self, timestamp=None):
         if self.max_vol is None:
             raise BaseException("No Maximum volume given")
         # Generate a random expected volume given a seasonality and maximum volume
-        random_volume = np.random.gamma(self.scale(timestamp) * self.max_vol, 1)
+        random_volume = self.stream.gamma(self.scale(timestamp) * self.max_vol, 1)
         # Create a time interval by dividing a time unit (second) by the volume
         time_interval = 1/random_volume
         return time_interval
@@ -7,9 +7,30 @@ more than a resource with some additional patches.
 """
 
 # dependencies
-from simpy import PreemptiveResource
+from lib.CircuitBreaker import CircuitBreaker
+from simpy import PreemptiveResource, Process
+from simpy.resources.resource import Preempted
 from numpy.random import exponential, uniform
 
+# policies to shed load when the queue of a server is full
+POLICIES = ('drop-newest', 'drop-oldest', 'priority')
+
+
+class Rejected(Exception):
+    """
+    Rejected is the reason a request fails when it's shed from a full queue,
+    or made on a server that is blocked and rejects its requests.
+    """
+
+    def __init__(self, policy, message=None):
+        # simpy throws a copy made from the arguments into the process, so
+        # the policy has to be one of them
+        super().__init__(policy, message if message is not None else f"FULL QUEUE ({policy})")
+        self.policy = policy
+
+    def __str__(self):
+        return self.args[1]
+
 
 class Server(PreemptiveResource):
 
@@ -32,6 +53,24 @@ class Server(PreemptiveResource):
         memmax: integer:
             Set scalar how many times the max capacity fits in memory
             Default = 10
+        service: ServiceTime
+            Model of the service time of the messages, @see lib.ServiceTime.
+            Default: exponential with the cpu usage as mean.
+        shedding: string
+            Policy to shed a request when the queue is full, one of
+            drop-newest (reject the new request), drop-oldest (the request
+            that waits longest) or priority (the request with the lowest
+            priority, the newest of those). Without policy, the queue is
+            unbounded.
+            [optional]
+        queue: integer
+            Maximum length of the queue.
+            Default: what fits in memory next to the users, i.e. the capacity
+            times memmax minus one.
+        breaker: dict
+            Put a circuit breaker in front of the server, with these keyworded
+            arguments, @see lib.CircuitBreaker.
+            [optional]
         """
         # call the parent constructor
         super().__init__(*args)
@@ -53,6 +92,27 @@ class Server(PreemptiveResource):
             # Default is 1 times the capacity
             self.latencyscaler = 1
 
+        # model of the service time, if any
+        self._service = kwargs['service'] if 'service' in kwargs else None
+
+        # admission control, if any
+        self._shedding = kwargs['shedding'] if 'shedding' in kwargs else None
+        if self._shedding is not None and self._shedding not in POLICIES:
+            raise ValueError(f"unknown shedding policy {self._shedding}, expected one of {POLICIES}")
+
+        self._limit = kwargs['queue'] if 'queue' in kwargs and kwargs['queue'] is not None \
+            else self.capacity * (self.memmax - 1)
+
+        # circuit breaker in front of the server, if any
+        self.breaker = CircuitBreaker(self._env, "%s#%s" % (kwargs['kind'], kwargs['uuid']), **kwargs['breaker']) \
+            if 'breaker' in kwargs and kwargs['breaker'] is not None else None
+
+        # number of times the server is blocked, e.g. by failures that overlap,
+        # and how many of those drain it from the load balancer
+        self._blocked = 0
+        self._drained = 0
+        self._rejecting = 0
+
         # setup the initial state of this server
         self._state = {
             'name':  "%s#%s" % (kwargs['kind'], kwargs['uuid']),
@@ -74,6 +134,16 @@ class Server(PreemptiveResource):
         """
         return self._env
 
+    def name(self):
+        """
+        Getter to expose the name of this server.
+
+        Returns
+        -------
+        string
+        """
+        return self._state['name']
+
     def get_capacity(self):
         """
         Getter to expose the server capacity.
@@ -93,36 +163,268 @@ class Server(PreemptiveResource):
         ----------
         priority: int
             See simpy.PreemptiveResource.request.
+        preempt: bool
+            See simpy.PreemptiveResource.request.
         """
 
         # parse parameters for the super class method
         priority = kwargs['priority'] if 'priority' in kwargs else 1
+        preempt = kwargs['preempt'] if 'preempt' in kwargs else True
 
         # call the parent class for the original method
-        return super().request(priority=priority)
+        request = super().request(priority=priority, preempt=preempt)
+
+        # a blocked server may reject the request right away
+        if self._rejecting and not request.triggered:
+            self._reject(request)
+
+        # shed a request when the queue is full
+        if self._shedding is not None and len(self.queue) > self._limit:
+            self._shed(request)
+
+        return request
+
+    def _waited(self, request):
+        """
+        Method to check if a process waits for a request.
+
+        Parameters
+        ----------
+        request: simpy.resources.resource.PriorityRequest
+
+        Returns
+        -------
+        bool
+        """
+        return any(isinstance(getattr(callback, '__self__', None), Process) for callback in request.callbacks)
 
-    def state(self):
+    def _shed(self, request):
+        """
+        Method to shed a request from the full queue, by the policy of this
+        server. The request fails, so its process knows it's rejected.
+
+        Parameters
+        ----------
+        request: simpy.resources.resource.PriorityRequest
+            The new request.
+        """
+        # requests that no process waits for anymore, e.g. after a timeout,
+        # are abandoned, so they leave the queue first
+        abandoned = [other for other in self.queue
+                     if other is not request and not other.preempt and not self._waited(other)]
+        for other in abandoned[:len(self.queue) - self._limit]:
+            other.cancel()
+
+        if len(self.queue) <= self._limit:
+            return
+
+        # only requests of transactions are shed, not the ones that preempt
+        candidates = [other for other in self.queue if not other.preempt]
+        if not candidates:
+            return
+
+        if self._shedding == 'drop-oldest':
+            victim = min(candidates, key=lambda other: other.time)
+        elif self._shedding == 'priority':
+            victim = max(candidates, key=lambda other: (other.priority, other.time))
+        else:
+            victim = request if request in candidates else candidates[-1]
+
+        # leave the queue, and let the process of the request know
+        victim.cancel()
+        victim.fail(Rejected(self._shedding))
+        victim.defused = True
+
+    def _reject(self, request):
+        """
+        Method to reject a request because the server is blocked. The request
+        fails, so its process knows it's rejected.
+
+        Parameters
+        ----------
+        request: simpy.resources.resource.PriorityRequest
+        """
+        request.cancel()
+        request.fail(Rejected('blocked', "SERVER BLOCKED"))
+        request.defused = True
+
+    def _do_put(self, event):
+        """
+        Method override to grant a request. A blocked server grants nothing,
+        the request waits in the queue until the server is unblocked.
+        @see simpy.resources.resource.PreemptiveResource._do_put
+
+        Parameters
+        ----------
+        event: simpy.resources.resource.PriorityRequest
+        """
+        if self._blocked:
+            return None
+
+        return super()._do_put(event)
+
+    def block(self, drain=False, reject=False):
+        """
+        Method to block the server, e.g. while it's down. The messages the
+        server is processing are preempted in a single pass, the least
+        important first, and new requests wait in the queue until the server
+        is unblocked. A server that is blocked twice, e.g. by failures that
+        overlap, has to be unblocked twice.
+
+        Parameters
+        ----------
+        drain: bool
+            The load balancer no longer sends messages to the server while
+            it's blocked, @see lib.Servers.server.
+            Default: False.
+        reject: bool
+            Requests are rejected while the server is blocked, instead of
+            waiting in the queue, @see Rejected. This includes the requests
+            that are queued already.
+            Default: False.
+
+        Returns
+        -------
+        self
+        """
+        self._blocked += 1
+        self._drained += bool(drain)
+        self._rejecting += bool(reject)
+
+        # the queue is rejected once, when the server starts to reject
+        if reject and self._rejecting == 1:
+            for request in list(self.put_queue):
+                self._reject(request)
+
+        # a server that was blocked already has no users to preempt
+        if self._blocked > 1:
+            return self
+
+        for request in sorted(self.users, key=lambda request: request.key, reverse=True):
+
+            # the process that held the request may be gone already
+            self.users.remove(request)
+            if request.proc is not None and request.proc.is_alive:
+                request.proc.interrupt(Preempted(by=None, usage_since=request.usage_since, resource=self))
+
+        # allow chaining
+        return self
+
+    def unblock(self, drain=False, reject=False):
+        """
+        Method to unblock the server, @see Server.block. Once it's no longer
+        blocked at all, the requests in the queue are granted.
+
+        Parameters
+        ----------
+        drain: bool
+            The server was blocked with drain, @see Server.block.
+            Default: False.
+        reject: bool
+            The server was blocked with reject, @see Server.block.
+            Default: False.
+
+        Returns
+        -------
+        self
+        """
+        self._blocked = max(self._blocked - 1, 0)
+        self._drained = max(self._drained - bool(drain), 0)
+        self._rejecting = max(self._rejecting - bool(reject), 0)
+
+        # every trigger grants the first request in the queue, if there's room
+        if not self._blocked:
+            for _ in range(min(self.capacity - len(self.users), len(self.put_queue))):
+                self._trigger_put(None)
+
+        # allow chaining
+        return self
+
+    def blocked(self):
+        """
+        Getter to expose if the server is blocked.
+
+        Returns
+        -------
+        bool
+        """
+        return self._blocked > 0
+
+    def drained(self):
+        """
+        Getter to expose if the load balancer should skip the server.
+
+        Returns
+        -------
+        bool
+        """
+        return self._drained > 0
+
+    def release(self, request, *args, **kwargs):
+        """
+        Method override to release a request. A request that was not granted
+        yet is removed from the queue, so it is not granted (and held forever)
+        after its transaction is done.
+        @see https://simpy.readthedocs.io/en/latest/api_reference/simpy.resources.html#simpy.resources.resource.Resource.release
+
+        Parameters
+        ----------
+        request: simpy.resources.resource.Request
+            Request to release.
+        """
+
+        # a request that is still queued only has to leave the queue
+        if not request.triggered and request in self.put_queue:
+            request.cancel()
+
+        # call the parent class for the original method
+        return super().release(request, *args, **kwargs)
+
+    def state(self, update=True, demand=None, message=False):
         """
         Method to expose the current state of a server.
 
+        Parameters
+        ----------
+        update: bool
+            Update the state with the current load. Without updating, the
+            state as of the last update is exposed, and no random latency is
+            drawn.
+        demand: float
+            Service demand of the message, @see Server.latency.
+        message: bool
+            The state is updated to process a message. With a service time
+            model, the latency is only drawn for a message, otherwise the
+            latency of the last message is exposed.
+
         Returns
         -------
         dict
         """
 
-        self._state.update(queue=len(self.queue),
-                           users=self.count,
-                           cpu=self.cpu(),
-                           memory=self.memory(),
-                           latency=self.latency()
-                           )
+        if update:
+            self._state.update(queue=len(self.queue),
+                               users=self.count,
+                               cpu=self.cpu(),
+                               memory=self.memory())
+
+            # the latency is drawn for every update, unless it's modelled
+            if self._service is None or message:
+                self._state.update(latency=self.latency(demand))
 
         return self._state
 
-    def latency(self):
+    def latency(self, demand=None):
         """
         Method to expose the server latency.
 
+        Parameters
+        ----------
+        demand: float
+            Service demand of the message, drawn from a standard exponential
+            distribution up front, e.g. to use common random numbers. Without
+            demand, a random demand is drawn.
+
         Returns
         -------
         float
@@ -136,10 +438,61 @@ class Server(PreemptiveResource):
         # with the cpu usage
         # return exponential(self.cpu())
 
+        # a service time model is independent of the number of users, apart
+        # from its load curve
+        if self._service is not None:
+            return self._service.sample(self.cpu(), demand) * self.latencyscaler
+
+        if demand is not None:
+            return demand * self.cpu() * self.latencyscaler
+
         latency = exponential(self.cpu()) * self.latencyscaler
 
         return latency
 
+    def serve(self, latency, message=None):
+        """
+        Method to process a message, which takes the given latency.
+
+        Parameters
+        ----------
+        latency: float
+            Time it takes to process the message.
+        message: dict
+            Progress of the message, the moment it is done is written to it,
+            so it can be continued from a checkpoint.
+            [optional]
+
+        Returns
+        -------
+        simpy.Timeout
+            Event that succeeds with the time the message took, once it's done.
+        """
+        if message is not None:
+            message['end'] = self._env.now + latency
+
+        return self._env.timeout(latency, value=latency)
+
+    def cancel(self, event):
+        """
+        Method to stop processing a message, e.g. after a timeout. A message
+        doesn't use anything but its request, so there's nothing to stop.
+
+        Parameters
+        ----------
+        event: simpy.Event
+            @see Server.serve.
+        """
+        pass
+
+    def settle(self):
+        """
+        Method to bring the progress of all messages up to date, e.g. before
+        a checkpoint. The progress of a message never changes, so there's
+        nothing to do.
+        """
+        pass
+
     def memory(self):
         """
         Method to expose the server's memory usage.
@@ -153,7 +506,9 @@ class Server(PreemptiveResource):
 
         # expose the calculated memory usage based on the queue, users, and
         # scaled capacity
-        return (self.count + len(self.queue)) / (self.capacity * self.memmax)
+        # a blocked server is as full as its capacity
+        users = self.capacity if self._blocked else self.count
+        return (users + len(self.queue)) / (self.capacity * self.memmax)
 
     def cpu(self):
         """
@@ -169,10 +524,18 @@ class Server(PreemptiveResource):
         # # get the current state
         # state = self.state()
 
+        # a blocked server is fully used
+        if self._blocked:
+            return 1.0
+
         # expose the cpu load
         return self.count / self.capacity
 
     def faulty_patch(self, state):
+        # a number scales the latency by that factor, e.g. for a gradual slowdown
+        if not isinstance(state, bool):
+            self.latencyscaler = state
+            return
         # error function to increase the latency scaler tenfold when true
         if state:
             self.latencyscaler = 10
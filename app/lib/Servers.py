@@ -9,8 +9,9 @@ a given number of servers and get access to an available one.
 
 # dependencies
 from lib.Server import Server
+from lib.SharingServer import SharingServer
 from uuid import uuid4
-from numpy.random import randint, shuffle
+import numpy as np
 
 
 class Servers(object):
@@ -35,17 +36,68 @@ class Servers(object):
         kind: string
             Kind of servers in this pool.
             Default: 'regular'.
+        uuids: list
+            Identifiers of the servers, e.g. to restore a checkpoint.
+            Default: new identifiers.
+        stream: numpy.random.RandomState
+            Random number generator for picking servers, @see lib.Streams.
+            Default: numpy.random.
+        service: ServiceTime
+            Model of the service time, shared by all servers of the pool,
+            @see lib.ServiceTime.
+            [optional]
+        sharing: dict
+            Servers share their cores between the messages, with the keyworded
+            arguments of the servers (cores, io and stream), @see
+            lib.SharingServer.
+            [optional]
+        shedding: string
+            Policy to shed requests when the queue of a server is full, @see
+            lib.Server.Server.
+            [optional]
+        queue: integer
+            Maximum length of the queue of a server, @see lib.Server.Server.
+            [optional]
+        breaker: dict
+            Put a circuit breaker in front of every server, @see
+            lib.CircuitBreaker.
+            [optional]
+        cost: float
+            Server-seconds the pool used so far, e.g. to restore a checkpoint.
+            Default: 0.
         """
         # set the default arguments
         size = kwargs['size'] if 'size' in kwargs else 10
         capacity = kwargs['capacity'] if 'capacity' in kwargs else 10
         kind = kwargs['kind'] if 'kind' in kwargs else 'regular'
 
-        # construct a new pool
-        self._pool = [Server(env, capacity, uuid=uuid4(), kind=kind) for _ in range(size)]
+        uuids = kwargs['uuids'] if 'uuids' in kwargs else [uuid4() for _ in range(size)]
 
-        # assign some parameters as properties
+        # construct a new pool
+        self._service = kwargs['service'] if 'service' in kwargs else None
+        self._sharing = kwargs['sharing'] if 'sharing' in kwargs else None
+
+        # admission control of the servers
+        admission = {"shedding": kwargs['shedding'] if 'shedding' in kwargs else None,
+                     "queue": kwargs['queue'] if 'queue' in kwargs else None,
+                     "breaker": kwargs['breaker'] if 'breaker' in kwargs else None}
+
+        # assign some parameters as properties, new servers are constructed
+        # with the same ones
+        self._env = env
+        self._capacity = capacity
         self._kind = kind
+        self._admission = admission
+
+        self._pool = [self._create(uuid) for uuid in uuids]
+
+        # servers that were removed from the pool, but still process the
+        # messages they had
+        self._retiring = []
+
+        # server-seconds used so far, and the moment they were last counted
+        self._cost = kwargs['cost'] if 'cost' in kwargs else 0.0
+        self._counted = env.now
 
         # disabled state of this pool
         self._disabled = False
@@ -57,6 +109,105 @@ class Servers(object):
         self._stuck = False
         self.stuckserver = None
 
+        # random number generator for picking servers
+        self._stream = kwargs['stream'] if 'stream' in kwargs and kwargs['stream'] is not None else np.random
+
+    def _create(self, uuid):
+        """
+        Method to construct a server of this pool.
+
+        Parameters
+        ----------
+        uuid: string
+            Identifier of the server.
+
+        Returns
+        -------
+        Server
+        """
+        if self._sharing is not None:
+            return SharingServer(self._env, self._capacity, uuid=uuid, kind=self._kind, service=self._service,
+                                 **self._admission, **self._sharing)
+
+        return Server(self._env, self._capacity, uuid=uuid, kind=self._kind, service=self._service,
+                      **self._admission)
+
+    def add(self, uuid=None):
+        """
+        Method to add a new server to the pool, e.g. by an autoscaler.
+
+        Parameters
+        ----------
+        uuid: string
+            Identifier of the server.
+            Default: a new identifier.
+
+        Returns
+        -------
+        Server
+        """
+        self._count()
+
+        server = self._create(uuid if uuid is not None else uuid4())
+        self._pool.append(server)
+
+        return server
+
+    def remove(self, server=None):
+        """
+        Method to remove a server from the pool, e.g. by an autoscaler. The
+        load balancer no longer sends it messages, but it processes the
+        messages it had, and counts as used until it's idle.
+
+        Parameters
+        ----------
+        server: Server
+            Server to remove.
+            Default: the server with the least messages.
+
+        Returns
+        -------
+        Server|None
+            The server that was removed, None when it was the last one.
+        """
+        if len(self._pool) <= 1:
+            return None
+
+        self._count()
+
+        if server is None:
+            server = min(self._pool, key=lambda server: server.count + len(server.queue))
+
+        self._pool.remove(server)
+        self._retiring.append(server)
+
+        # a load balancer that is stuck on the server moves on
+        if self.stuckserver is server:
+            self.stuckserver = self._pool[self._stream.randint(0, len(self._pool))]
+
+        return server
+
+    def _count(self):
+        """
+        Method to count the server-seconds used until now, and to forget the
+        removed servers that are idle.
+        """
+        self._cost += (len(self._pool) + len(self._retiring)) * (self._env.now - self._counted)
+        self._counted = self._env.now
+
+        self._retiring = [server for server in self._retiring if server.count or server.queue]
+
+    def cost(self):
+        """
+        Method to expose the server-seconds the pool used so far.
+
+        Returns
+        -------
+        float
+        """
+        self._count()
+        return self._cost
+
     def kind(self):
         """
         Getter to expose the kind of this server pool.
@@ -67,6 +218,36 @@ class Servers(object):
         """
         return self._kind
 
+    def service(self):
+        """
+        Getter to expose the model of the service time of this pool.
+
+        Returns
+        -------
+        ServiceTime|None
+        """
+        return self._service
+
+    def sharing(self):
+        """
+        Getter to expose if the servers of this pool share their cores.
+
+        Returns
+        -------
+        bool
+        """
+        return self._sharing is not None
+
+    def servers(self):
+        """
+        Getter to expose the servers in this pool.
+
+        Returns
+        -------
+        list
+        """
+        return self._pool
+
     def disabled(self, state):
         """
         Method to disable this pool of servers. This will make sure that no
@@ -128,14 +309,31 @@ class Servers(object):
         self._stuck = bool(state)
 
         # If set to stuck, pick random server in pool to keep sending messages to
-        self.stuckserver = self._pool[randint(0, len(self._pool))]
+        self.stuckserver = self._pool[self._stream.randint(0, len(self._pool))]
 
         # allow chaining
         return self
 
+    def _available(self, server):
+        """
+        Method to check if the breaker of a server lets a message through, and
+        the server isn't drained, e.g. for maintenance.
+
+        Parameters
+        ----------
+        server: Server
+
+        Returns
+        -------
+        bool
+        """
+        return not server.drained() and (server.breaker is None or server.breaker.available())
+
     def server(self, **kwargs):
         """
-        Method to get access to an available server from the pool.
+        Method to get access to an available server from the pool. The client
+        tells the breaker of the server it sends a message to, @see
+        lib.CircuitBreaker.attempt.
 
         Keyworded parameters
         --------------------
@@ -157,14 +355,19 @@ class Servers(object):
         # we need to check if we need to pick a server randomly, or by lowest
         if self._random:
 
+            # servers behind an open breaker are skipped
+            available = [server for server in pool if self._available(server)]
+            if len(available) < len(pool):
+                return available[self._stream.randint(0, len(available))] if available else None
+
             # pick a random server
-            return pool[randint(0, len(pool))]
+            return pool[self._stream.randint(0, len(pool))]
 
         # we need to check if the loadbalancing is stuck on one server
         if self._stuck:
 
             # pick a random server
-            return self.stuckserver
+            return self.stuckserver if self._available(self.stuckserver) else None
 
         # we need a reference to the server with the lowest number of
         # processes in queue, which is the server that is going to
@@ -179,14 +382,14 @@ class Servers(object):
         # the state of each server and find the one with the least
         # amount of traffic
         # Shuffle to get spread in a low volume system
-        shuffle(pool)
+        self._stream.shuffle(pool)
         for server in pool:
 
             # state of the current server
             current = server.state()
 
             # pass servers that we need to exclude
-            if server in exclude:
+            if server in exclude or not self._available(server):
                 continue
 
             # assign a new server as the lowest
@@ -205,6 +408,12 @@ class Servers(object):
         """
         Method to get access to an random server from the pool for use in error generation
 
+        Keyworded parameters
+        --------------------
+        stream: numpy.random.RandomState
+            Random number generator to pick the server with.
+            Default: the one of this pool.
+
         Returns
         -------
         Server
@@ -213,4 +422,5 @@ class Servers(object):
         pool = self._pool
 
         # pick a random server
-        return pool[randint(0, len(pool))]
+        stream = kwargs['stream'] if 'stream' in kwargs and kwargs['stream'] is not None else self._stream
+        return pool[stream.randint(0, len(pool))]
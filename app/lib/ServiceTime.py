@@ -0,0 +1,364 @@
+"""
+Classes for modelling the service time of the messages on a server, instead of
+drawing it from an exponential distribution with the cpu usage as mean. The
+service time of a message is drawn once, when the server starts processing it,
+so reading the state of a server (e.g. by the load balancer) draws nothing.
+
+A model is configured per kind of server, e.g.
+
+    "service": {"model": "lognormal", "mean": 0.05, "sigma": 0.8,
+                "load": [[0, 1], [0.8, 1.5], [1, 4]]}
+
+with one of the models:
+
+- exponential:  mean;
+- lognormal:    mean and sigma (of the underlying normal distribution);
+- gamma:        mean and shape;
+- empirical:    path to a csv file, separated by ';', with a 'latency' column
+                of observed service times, e.g. from production logs, and
+                optionally a 'count' column when the file is a histogram.
+
+The optional load curve is a list of (utilization, factor) points, the service
+time is multiplied with the factor at the utilization of the server (linearly
+interpolated), so the service time can degrade under load.
+
+Service times are drawn from a buffer that is filled in bulk, which is a lot
+cheaper than drawing them one by one.
+
+@file   lib/ServiceTime.py
+@scope  public
+"""
+
+# 3rd party dependencies
+import math
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+
+def create(config, **kwargs):
+    """
+    Function to create a service time model from its configuration.
+
+    Parameters
+    ----------
+    config: dict
+        Configuration of the model, with the name of the model under 'model'
+        and its parameters.
+
+    Keyworded parameters
+    --------------------
+    @see ServiceTime.__init__
+
+    Returns
+    -------
+    ServiceTime
+    """
+    if config['model'] not in MODELS:
+        raise ValueError(f"unknown service time model {config['model']}, expected one of {sorted(MODELS)}")
+
+    # the parameters of the model are the rest of the configuration
+    parameters = {key: value for (key, value) in config.items() if key != 'model'}
+
+    return MODELS[config['model']](**parameters, **kwargs)
+
+
+class ServiceTime(object):
+    """
+    ServiceTime is the base class of all service time models, a model only has
+    to know how to draw service times in bulk, and their quantiles.
+    """
+
+    def __init__(self, load=None, size=1024, stream=None):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        load: list
+            List of (utilization, factor) points to scale the service time
+            with, by the utilization of the server.
+            [optional]
+        size: integer
+            Number of service times that are drawn at once.
+            Default: 1024.
+        stream: numpy.random.RandomState
+            Random number generator to draw from, @see lib.Streams.
+            Default: numpy.random.
+        """
+        # the load curve, sorted by utilization
+        points = sorted(load) if load else [(0, 1)]
+        self._utilizations = np.array([utilization for (utilization, _) in points], dtype=float)
+        self._factors = np.array([factor for (_, factor) in points], dtype=float)
+
+        self._size = size
+        self._stream = stream if stream is not None else np.random
+
+        # service times that were drawn ahead, and the position within them
+        self._buffer = np.empty(0)
+        self._position = 0
+
+    def _draw(self, size):
+        """
+        Method to draw service times in bulk.
+
+        Parameters
+        ----------
+        size: integer
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        raise NotImplementedError
+
+    def quantile(self, probability):
+        """
+        Method to expose the service time below which the given fraction of
+        the service times falls.
+
+        Parameters
+        ----------
+        probability: float
+
+        Returns
+        -------
+        float
+        """
+        raise NotImplementedError
+
+    def mean(self):
+        """
+        Method to expose the mean service time, without load.
+
+        Returns
+        -------
+        float
+        """
+        raise NotImplementedError
+
+    def factor(self, utilization):
+        """
+        Method to expose the factor of the load curve at a utilization.
+
+        Parameters
+        ----------
+        utilization: float
+
+        Returns
+        -------
+        float
+        """
+        return float(np.interp(utilization, self._utilizations, self._factors))
+
+    def sample(self, utilization=0, demand=None):
+        """
+        Method to draw the service time of a message.
+
+        Parameters
+        ----------
+        utilization: float
+            Utilization of the server, including the message itself.
+            Default: 0.
+        demand: float
+            Service demand of the message, drawn from a standard exponential
+            distribution up front, e.g. to use common random numbers. The
+            service time is the quantile of the same probability, so it is
+            drawn without the buffer.
+            [optional]
+
+        Returns
+        -------
+        float
+        """
+        if demand is not None:
+            service = float(self.quantile(min(-math.expm1(-demand), 1 - 1e-12)))
+
+        else:
+            # fill the buffer again once it's used up
+            if self._position >= len(self._buffer):
+                self._buffer = self._draw(self._size)
+                self._position = 0
+
+            service = float(self._buffer[self._position])
+            self._position += 1
+
+        return service * self.factor(utilization)
+
+    def state(self):
+        """
+        Method to expose the service times that were drawn ahead, e.g. for a
+        checkpoint.
+
+        Returns
+        -------
+        dict
+        """
+        return {"buffer": self._buffer[self._position:].copy()}
+
+    def restore(self, state):
+        """
+        Method to continue with the service times that were drawn ahead.
+
+        Parameters
+        ----------
+        state: dict
+            @see ServiceTime.state.
+
+        Returns
+        -------
+        self
+        """
+        self._buffer = np.asarray(state['buffer'], dtype=float)
+        self._position = 0
+
+        # allow chaining
+        return self
+
+
+class Exponential(ServiceTime):
+
+    def __init__(self, mean, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        mean: float
+            Mean service time.
+
+        Keyworded parameters
+        --------------------
+        @see ServiceTime.__init__
+        """
+        super().__init__(**kwargs)
+        self._mean = mean
+
+    def _draw(self, size):
+        return self._stream.exponential(self._mean, size)
+
+    def quantile(self, probability):
+        return -self._mean * math.log1p(-probability)
+
+    def mean(self):
+        return self._mean
+
+
+class Lognormal(ServiceTime):
+
+    def __init__(self, mean, sigma, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        mean: float
+            Mean service time.
+        sigma: float
+            Standard deviation of the underlying normal distribution, the
+            larger, the heavier the tail.
+
+        Keyworded parameters
+        --------------------
+        @see ServiceTime.__init__
+        """
+        super().__init__(**kwargs)
+        self._mean = mean
+        self._sigma = sigma
+
+        # mean of the underlying normal distribution, for the given mean
+        self._mu = math.log(mean) - sigma ** 2 / 2
+
+    def _draw(self, size):
+        return self._stream.lognormal(self._mu, self._sigma, size)
+
+    def quantile(self, probability):
+        return math.exp(self._mu + self._sigma * NormalDist().inv_cdf(probability))
+
+    def mean(self):
+        return self._mean
+
+
+class Gamma(ServiceTime):
+
+    def __init__(self, mean, shape, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        mean: float
+            Mean service time.
+        shape: float
+            Shape of the distribution, 1 is exponential, larger is less
+            variable.
+
+        Keyworded parameters
+        --------------------
+        @see ServiceTime.__init__
+        """
+        super().__init__(**kwargs)
+        self._mean = mean
+        self._shape = shape
+
+    def _draw(self, size):
+        return self._stream.gamma(self._shape, self._mean / self._shape, size)
+
+    def quantile(self, probability):
+        # the quantile of a gamma distribution has no closed form, so we use
+        # the Wilson-Hilferty approximation, which is accurate for shapes
+        # that are not too small
+        spread = 1 / (9 * self._shape)
+        cube = 1 - spread + NormalDist().inv_cdf(probability) * math.sqrt(spread)
+        return self._mean * max(cube, 0.0) ** 3
+
+    def mean(self):
+        return self._mean
+
+
+class Empirical(ServiceTime):
+
+    def __init__(self, path, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        path: string
+            Path to the csv file with the observed service times.
+
+        Keyworded parameters
+        --------------------
+        @see ServiceTime.__init__
+        """
+        super().__init__(**kwargs)
+        self.path = path
+
+        # observed service times, and how often they were observed
+        df = pd.read_csv(path, sep=';')
+        df = df.sort_values('latency')
+        self._values = df['latency'].to_numpy(dtype=float)
+        counts = df['count'].to_numpy(dtype=float) if 'count' in df else np.ones(len(df))
+
+        # cumulative distribution of the observations
+        self._cumulative = np.cumsum(counts) / counts.sum()
+        self._mean = float(np.average(self._values, weights=counts))
+
+    def _draw(self, size):
+        return self.quantile(self._stream.uniform(size=size))
+
+    def quantile(self, probability):
+        index = np.minimum(np.searchsorted(self._cumulative, probability, side='right'), len(self._values) - 1)
+        return self._values[index]
+
+    def mean(self):
+        return self._mean
+
+
+# models by their name in the configuration
+MODELS = {
+    'exponential':  Exponential,
+    'lognormal':    Lognormal,
+    'gamma':        Gamma,
+    'empirical':    Empirical,
+}
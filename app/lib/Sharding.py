@@ -0,0 +1,616 @@
+"""
+Experimental: run a single simulation sharded over multiple processes. Every
+shard owns the server pools of a group of kinds, runs its own environment, and
+processes the hops of all transactions on those kinds. When a transaction moves
+to a kind of another shard it is handed off over a pipe, together with the
+requests it still holds on other shards. Requests are released by sending a
+message to the shard that owns them.
+
+The shards are synchronized conservatively: messages between shards take the
+network latency of the configuration ('network_latency'), so a shard can
+safely run a window of that length ahead without receiving anything from the
+past. This lookahead must be larger than zero.
+
+The shards synchronize once per window, so when the latency is small compared
+to the time between events, most of the wall time goes to synchronizing. A
+longer window (window) runs several windows of the latency per round trip,
+at the cost of exactness: a message that arrives within the window it was
+sent in is delivered at the end of that window, i.e. messages between shards
+take between the latency and the window plus the latency, which shows in
+the latency of the transactions that cross shards.
+
+The shards draw the arrivals, the service demands and the routing from the
+same dedicated streams as a single process run with common random numbers
+(crn), @see lib.Streams, and a request on another server is released a
+network latency later in both. A sharded run with the same seed and network
+latency, with the window equal to that latency, therefore processes the same
+transactions with the same timeouts as the single process run with crn, as
+long as the processes that start on different shards don't share the stream
+of arrivals, i.e. with a single process.
+
+A mix of processes, the behaviour of the client (retries, backoff and
+deadlines), circuit breakers, traces, error injection, failure scenarios,
+autoscaling, log sampling and the hybrid mode are not supported, they raise
+an error.
+
+@file   lib/Sharding.py
+@scope  public
+"""
+
+# dependencies
+from lib.Environment import Environment
+from lib.Servers import Servers
+from lib.MultiServers import MultiServers
+from lib.Logger import Logger
+from lib.MessageGenerator import MessageGenerator, mix
+from lib.ServiceTime import create as service_time
+from lib.Plan import graph
+from lib.Seasonality import TransactionInterval as Seasonality
+from lib.Statistics import Statistics
+from lib.Streams import Streams
+
+# 3rd party dependencies
+import os
+import heapq
+import random
+import traceback
+from uuid import uuid4
+from itertools import count
+from datetime import datetime
+from multiprocessing import Process, Pipe
+import numpy as np
+
+
+def partition(kinds, shards):
+    """
+    Function to divide the kinds of servers over a number of shards.
+
+    Parameters
+    ----------
+    kinds: list
+        Kinds of servers.
+    shards: integer
+        Number of shards.
+
+    Returns
+    -------
+    list
+        List of lists of kinds, one per shard.
+    """
+    # we can't have more shards than kinds
+    shards = max(1, min(shards, len(kinds)))
+
+    # divide the kinds round robin
+    return [kinds[index::shards] for index in range(shards)]
+
+
+class Shard(object):
+
+    # the messages of a shard are processed and logged in the same way as in
+    # a single process simulation
+    server_message = MessageGenerator.server_message
+
+    def __init__(self, index, kinds, config, seasonality, log_dir, name):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        index: integer
+            Index of this shard.
+        kinds: list
+            List of lists of kinds, one per shard, @see partition.
+        config: dict
+            Configuration for the simulation, @see lib.Simulation.simulate.
+        seasonality: string
+            Path to the seasonality file.
+        log_dir: string
+            Path pointing to where the logs should be written.
+        name: string
+            Name of the logfile of the simulation.
+        """
+        self._index = index
+
+        # shard that owns every kind
+        self._shards = {kind: shard for (shard, group) in enumerate(kinds) for kind in group}
+
+        # seed the random number generators, every shard its own stream
+        if 'seed' in config and config['seed'] is not None:
+            np.random.seed(config['seed'] + index)
+            random.seed(config['seed'] + index)
+
+        # everything that is drawn comes from the common random numbers
+        streams = Streams(config['seed'] if 'seed' in config else None)
+
+        # we need a new environment which we can run
+        self._env = Environment()
+
+        # we need the server pools of our own kinds
+        self._pools = MultiServers()
+        for server in config['servers']:
+            if self._shards.get(server['kind']) == index:
+                self._pools.append(
+                    Servers(self._env, size=server['size'], capacity=server['capacity'], kind=server['kind'],
+                            stream=streams.stream(f"routing.{server['kind']}"),
+                            service=service_time(server['service']) if 'service' in server else None,
+                            sharing=dict(server['sharing'], stream=streams.stream(f"io.{server['kind']}"))
+                            if 'sharing' in server else None,
+                            shedding=server['shedding'] if 'shedding' in server else None,
+                            queue=server['queue'] if 'queue' in server else None))
+
+        # servers by name, so requests on them can be found again
+        self._servers = {server.state()['name']: server
+                         for pool in self._pools.pools() for server in pool.servers()}
+
+        # we log to a part of the logfile, which is merged when we're done
+        self._logger = Logger(f"{name}-shard{index}", directory=log_dir, show_stdout=False)
+        self._env.logger(self._logger)
+
+        # we keep online statistics of our part of the simulation
+        self.statistics = Statistics()
+        self._env.observer(self.statistics)
+
+        # duration of a hand-off between hops
+        self._latency = config['network_latency']
+
+        # open requests on our servers, by token
+        self._requests = {}
+        self._tokens = count()
+
+        # messages for other shards, as (time, shard, message) tuples
+        self._outbox = []
+
+        # the processes that start with one of our kinds are generated here
+        seasonality = Seasonality(seasonality, enviroment=self._env, max_volume=config['max_volume'],
+                                  stream=streams.stream('arrivals'))
+        for (process, kind_type) in enumerate(mix(config)):
+            if self._shards[kind_type['kinds'][0]] == index:
+                self._env.process(self.generate(seasonality, process, kind_type, streams.stream(f"service.{process}")))
+
+    def generate(self, seasonality, process, kind_type, stream):
+        """
+        Generator method to create transactions, @see MessageGenerator.generate.
+
+        Parameters
+        ----------
+        seasonality: Seasonality
+        process: integer
+            Index of the type of process.
+        kind_type: dict
+            Type of process, @see lib.MessageGenerator.mix.
+        stream: numpy.random.RandomState
+            Random number generator to draw the service demands from.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        while True:
+
+            # timeout before proceeding to the next transaction
+            yield self._env.timeout(seasonality.interval())
+
+            # the complete state of a transaction, so it can be handed off
+            transaction = {
+                "id":           uuid4(),
+                "start":        self._env.now,
+                "process":      process,
+                "kinds":        kind_type['kinds'],
+                "timeout":      kind_type['timeout'],
+                "priority":     kind_type['priority'],
+                "demands":      stream.standard_exponential(len(kind_type['kinds'])).tolist(),
+                "position":     0,
+                "requested_by": {"name": 'client', "kind": 'client'},
+                "open":         [],
+                "outcome":      None,
+            }
+
+            self._env.process(self.hop(transaction))
+
+    def hop(self, transaction):
+        """
+        Generator method to process the current hop of a transaction on one
+        of our servers, @see MessageGenerator.client_request.
+
+        Parameters
+        ----------
+        transaction: dict
+
+        Yields
+        ------
+        simpy.Event
+        """
+        kind = transaction['kinds'][transaction['position']]
+        requested_by = transaction['requested_by']
+
+        # test if the request is back at a previously accessed server
+        return_loop = next((index for (index, row) in enumerate(transaction['open'])
+                            if row['kind'] == kind), None)
+
+        if return_loop is not None:
+            server = self._servers[transaction['open'][return_loop]['server']]
+        else:
+            server = self._pools.get(kind).server()
+
+        # we can't continue without a server
+        if not server:
+            self._env.log(
+                f"{self._env.now};;ERROR;;;;{transaction['id']};{requested_by['name']};Error due to SERVER UNAVAILABLE", level=40)
+            transaction['outcome'] = 'unavailable'
+            self._finish(transaction)
+            return
+
+        # the server sends the next message
+        server.state()
+
+        # ask the server for a new request, with the priority of the
+        # transaction, a request that doesn't preempt can be shed by a full
+        # server, @see MessageGenerator.client_request
+        request = server.request(priority=transaction['priority'], preempt=False)
+        token = next(self._tokens)
+        self._requests[token] = (server, request)
+        row = {"kind": kind, "server": server.state()['name'], "shard": self._index, "token": token}
+        transaction['open'].append(row)
+
+        # send a message and wait for message or timeout to complete
+        sent_message = self._env.process(self.server_message(
+            transaction['id'], requested_by, request, server,
+            demand=transaction['demands'][transaction['position']], timeout=transaction['timeout']))
+        yield sent_message | self._env.timeout(transaction['timeout'])
+
+        # if message not triggered then timeout is past
+        if not sent_message.triggered:
+            sent_message.interrupt("TIMEOUT")
+            self._env.notify('timeout', server=server, kind=kind)
+
+        # a message that failed fails the transaction
+        if not (sent_message.triggered and sent_message.value is not False):
+            transaction['outcome'] = 'rejected' if sent_message.triggered else 'timeout'
+
+        # release all requests between occurrences of the same kind
+        if return_loop is not None:
+            for other in transaction['open'][return_loop:]:
+                self._release(other, row['server'])
+            transaction['open'] = transaction['open'][:return_loop] + [row]
+
+        # continue with the next hop, or finish the transaction
+        transaction['requested_by'] = {"name": row['server'], "kind": kind}
+        transaction['position'] += 1
+
+        if transaction['position'] == len(transaction['kinds']):
+            self._finish(transaction)
+        else:
+            self._send(self._shards[transaction['kinds'][transaction['position']]], ('hop', transaction))
+
+    def _finish(self, transaction):
+        """
+        Method to finish a transaction, releasing all of its requests.
+
+        Parameters
+        ----------
+        transaction: dict
+        """
+        for row in transaction['open']:
+            self._release(row, transaction['requested_by']['name'])
+
+        # tell the observers that the transaction is done
+        self._env.notify('transaction', id=transaction['id'], start=transaction['start'], end=self._env.now,
+                         process=transaction['process'], outcome=transaction['outcome'])
+
+    def _release(self, row, at=None):
+        """
+        Method to release a request, on this or another shard, @see
+        lib.MessageGenerator.MessageGenerator._release.
+
+        Parameters
+        ----------
+        row: dict
+            Request held by a transaction.
+        at: string
+            Name of the server the transaction is at.
+            Default: the request is released here and now.
+        """
+        # other servers learn about the release over the network
+        if at is not None and row['server'] != at:
+            self._send(row['shard'], ('release', row['token']))
+            return
+
+        # the request could be released already by a return loop
+        if row['token'] not in self._requests:
+            return
+
+        server, request = self._requests.pop(row['token'])
+        server.release(request=request)
+
+    def _send(self, shard, message):
+        """
+        Method to send a message to a shard after the network latency.
+
+        Parameters
+        ----------
+        shard: integer
+        message: tuple
+        """
+        if shard == self._index:
+            self._receive(self._env.now + self._latency, message)
+        else:
+            self._outbox.append((self._env.now + self._latency, shard, message))
+
+    def _receive(self, time, message):
+        """
+        Method to schedule a message at the time it arrives.
+
+        Parameters
+        ----------
+        time: float
+        message: tuple
+        """
+        event = self._env.timeout(time - self._env.now)
+        event.callbacks.append(lambda _: self._deliver(message))
+
+    def _deliver(self, message):
+        """
+        Method to handle a message that arrived.
+
+        Parameters
+        ----------
+        message: tuple
+        """
+        (type, payload) = message
+
+        if type == 'hop':
+            self._env.process(self.hop(payload))
+        else:
+            self._release({"shard": self._index, "token": payload})
+
+    def run(self, until, messages):
+        """
+        Method to run a window of the simulation.
+
+        Parameters
+        ----------
+        until: float
+            End of the window.
+        messages: list
+            List of (time, message) tuples that arrive at this shard.
+
+        Returns
+        -------
+        tuple
+            Messages for other shards, and the time of our next event.
+        """
+        # a message that arrived within the window it was sent in is late
+        for (time, message) in messages:
+            self._receive(max(time, self._env.now), message)
+
+        self._env.run(until=until)
+
+        outbox, self._outbox = self._outbox, []
+        return (outbox, self._env.peek())
+
+    def close(self):
+        """
+        Method to finish the shard.
+
+        Returns
+        -------
+        dict
+        """
+        self.statistics.events = self._env.events()
+        self._logger.close()
+
+        return {"statistics": self.statistics, "counts": self._env.counts()}
+
+
+def _worker(connection, index, kinds, config, seasonality, log_dir, name):
+    """
+    Function that runs a shard in a worker process, driven by the commands
+    of the coordinator.
+    """
+    try:
+        shard = Shard(index, kinds, config, seasonality, log_dir, name)
+
+        while True:
+            command = connection.recv()
+
+            if command[0] == 'run':
+                connection.send(('ok', shard.run(*command[1:])))
+            else:
+                connection.send(('ok', shard.close()))
+                break
+
+    # the coordinator should know why we stopped
+    except Exception:
+        connection.send(('error', traceback.format_exc()))
+
+    finally:
+        connection.close()
+
+
+def _receive(connection):
+    """
+    Function to receive the result of a command from a shard.
+    """
+    (status, result) = connection.recv()
+    if status == 'error':
+        raise RuntimeError(f"shard failed:\n{result}")
+
+    return result
+
+
+def _merge(parts, path):
+    """
+    Function to merge the parts of a logfile, ordered by time.
+
+    Parameters
+    ----------
+    parts: list
+        Paths to the parts, every part ordered by time.
+    path: string
+        Path to the merged logfile, the parts are appended to it.
+    """
+    files = [open(part) for part in parts]
+
+    try:
+        with open(path, 'a') as f:
+            f.writelines(heapq.merge(*files, key=lambda line: float(line.split(';', 1)[0])))
+    finally:
+        for file in files:
+            file.close()
+
+    for part in parts:
+        os.remove(part)
+
+
+def simulate(n, config, seasonality, log_dir, log_prefix, description, **kwargs):
+    """
+    Function that runs a sharded simulation, @see lib.Simulation.simulate.
+
+    Parameters
+    ----------
+    @see lib.Simulation.simulate
+
+    Keyworded parameters
+    --------------------
+    shards: integer
+        Number of shards (processes) to run.
+        Default: the number of kinds.
+    window: float
+        Simulated time the shards run between synchronizing, longer than the
+        network latency delivers some messages late, @see lib.Sharding.
+        Default: the network latency.
+    registry: Registry
+        Registry to record the simulation in.
+        [optional]
+    statistics: Statistics
+        Statistics to add the statistics of all shards to.
+        [optional]
+
+    Returns
+    -------
+    string
+    """
+    # for timing get current time
+    starttime = datetime.now()
+
+    # the lookahead of the shards is the latency between them
+    lookahead = config['network_latency'] if 'network_latency' in config else 0
+    if lookahead <= 0:
+        raise ValueError("sharding needs a network_latency larger than zero in the configuration")
+
+    # the shards may run further between synchronizing than is safe
+    window = kwargs['window'] if 'window' in kwargs and kwargs['window'] is not None else lookahead
+    if window < lookahead:
+        raise ValueError(f"the window of the shards can't be shorter than the network_latency {lookahead}")
+
+    # a shard hands a transaction over hop by hop, which needs a sequence
+    if any(graph(kinds) for kinds in config['process']):
+        raise ValueError("sharding does not support process graphs, only sequences of kinds")
+
+    # every shard generates the processes that start on its kinds at their
+    # own rate, a mix would have to be drawn from a single stream
+    if 'mix' in config:
+        raise ValueError("sharding does not support a mix of processes")
+
+    # neither do the shards know how to replay a trace, retry a message,
+    # break a circuit, inject errors, fail servers, scale pools, sample the
+    # log or advance with a fluid model, and results that silently differ
+    # from a single process run are worse than none
+    unsupported = [key for key in ('client', 'trace', 'error', 'scenarios', 'sampling', 'hybrid') if key in config] + \
+        sorted({key for server in config['servers'] for key in ('breaker', 'autoscaling') if key in server})
+    if unsupported:
+        raise ValueError(f"sharding does not support {', '.join(unsupported)}")
+
+    # divide the kinds over the shards
+    kinds = [server['kind'] for server in config['servers']]
+    groups = partition(kinds, kwargs['shards'] if 'shards' in kwargs else len(kinds))
+
+    # we need a logfile, as in a single process simulation
+    name = "{0}_{1:04d}_{2}_{3}".format(log_prefix, n,
+                                        datetime.now().strftime("%Y-%m-%d_%H-%M"),
+                                        description.replace(" ", "-"))
+    log_file = os.path.join(log_dir, f"{name}.csv")
+    error_file = os.path.join(log_dir, f"error-{name}.csv")
+
+    with open(log_file, 'w') as f:
+        f.write('Time;Server;Message_type;CPU Usage;Memory Usage;Latency;Transaction_ID;From_Server;Message\n')
+    with open(error_file, 'w') as f:
+        f.write('Time;Server;Error type;Start-Stop\n')
+
+    # start a worker process per shard
+    connections, workers = [], []
+    for index in range(len(groups)):
+        parent, child = Pipe()
+        worker = Process(target=_worker, args=(child, index, groups, config, seasonality, log_dir, name))
+        worker.start()
+        connections.append(parent)
+        workers.append(worker)
+
+    try:
+        # messages per shard that are to be delivered in the next window
+        inboxes = [[] for _ in groups]
+
+        # time of the next event of every shard
+        upcoming = [0.0 for _ in groups]
+        runtime = int(config['runtime'])
+        now = 0.0
+
+        while now < runtime:
+
+            # skip ahead to the first thing that happens on any shard
+            start = min(upcoming + [time for inbox in inboxes for (time, _) in inbox])
+            until = min(max(start, now) + window, runtime)
+
+            # all shards run the window in parallel
+            for (connection, inbox) in zip(connections, inboxes):
+                connection.send(('run', until, inbox))
+
+            inboxes = [[] for _ in groups]
+            for (index, connection) in enumerate(connections):
+                (outbox, upcoming[index]) = _receive(connection)
+
+                # route the messages, they arrive at the next window at the earliest
+                for (time, shard, message) in outbox:
+                    inboxes[shard].append((time, message))
+
+            now = until
+
+        # collect the results of all shards
+        for connection in connections:
+            connection.send(('close',))
+        results = [_receive(connection) for connection in connections]
+
+    finally:
+        for worker in workers:
+            worker.join()
+
+    # merge the logs of all shards
+    _merge([os.path.join(log_dir, f"{name}-shard{index}.csv") for index in range(len(groups))], log_file)
+
+    # merge the statistics of all shards
+    statistics = kwargs['statistics'] if 'statistics' in kwargs and kwargs['statistics'] is not None else Statistics()
+    for result in results:
+        statistics.merge(result['statistics'])
+
+    # keep track of the simulation, together with its logfiles
+    if 'registry' in kwargs and kwargs['registry'] is not None:
+        info = {}
+        for result in results:
+            for (level, number) in result['counts'].items():
+                info[level] = info.get(level, 0) + number
+
+        stats = {"info": info.get(20, 0), "errors": info.get(40, 0), "error_events": 0, "shards": len(groups)}
+        stats.update(statistics.summary())
+
+        kwargs['registry'].register(n, name,
+                                    description=description,
+                                    created=starttime,
+                                    config=config,
+                                    seed=config['seed'] if 'seed' in config else None,
+                                    runtime=config['runtime'],
+                                    walltime=(datetime.now() - starttime).total_seconds(),
+                                    log_file=log_file,
+                                    error_file=error_file,
+                                    stats=stats)
+
+    return name
@@ -0,0 +1,264 @@
+"""
+Class for acting as a server that shares its cores between all messages it is
+processing (processor sharing), instead of processing every message in a slot
+of its own for a fixed latency. Every message needs an amount of work (its
+service time on an idle core), and with n messages on c cores every message
+gets min(1, c / n) of a core, so all messages in flight slow down when the
+load grows. A message can wait for I/O before it needs the cpu, which is a
+pure delay that doesn't use a core.
+
+The server is event driven with virtual time: the work that every message
+received so far is the same, so it's a single number that advances with the
+share of a core, and a message is done once the virtual time reaches the work
+it needed when it started. Only the message that is done first has a timer,
+which is rescheduled whenever a message starts or leaves.
+
+The capacity of the server still limits the number of messages that are
+admitted, others queue as with a regular server.
+
+@file   lib/SharingServer.py
+@scope  public
+"""
+
+# dependencies
+from lib.Server import Server
+
+# 3rd party dependencies
+import heapq
+from itertools import count
+import numpy as np
+
+
+class SharingServer(Server):
+
+    def __init__(self, *args, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        @see lib.Server.Server
+
+        Keyworded arguments
+        -------------------
+        @see lib.Server.Server
+        cores: integer
+            Number of cores that are shared by the messages.
+            Default: 1.
+        io: float
+            Mean time a message waits for I/O (exponentially distributed)
+            before it needs the cpu.
+            Default: 0.
+        stream: numpy.random.RandomState
+            Random number generator for the I/O times and the work, @see
+            lib.Streams.
+            Default: numpy.random.
+        """
+        super().__init__(*args, **kwargs)
+
+        self._cores = kwargs['cores'] if 'cores' in kwargs else 1
+        self._io = kwargs['io'] if 'io' in kwargs else 0
+        self._stream = kwargs['stream'] if 'stream' in kwargs and kwargs['stream'] is not None else np.random
+
+        # virtual time, the work every message in flight received so far, and
+        # the moment it was last advanced
+        self._virtual = 0.0
+        self._advanced = self._env.now
+
+        # messages on the cpu, by the virtual time at which they are done
+        self._heap = []
+        self._active = 0
+
+        # messages by their completion event, and a sequence to break ties
+        self._jobs = {}
+        self._sequence = count()
+
+        # generation of the timer, older timers are ignored
+        self._generation = 0
+
+    def latency(self, demand=None):
+        """
+        Method to expose the work a message needs, i.e. its service time on
+        an idle core. Without a model of the service time, the work is
+        exponential with one over the capacity as mean, so a single core
+        degrades like a regular server, but for all messages in flight.
+
+        Parameters
+        ----------
+        demand: float
+            @see lib.Server.Server.latency.
+
+        Returns
+        -------
+        float
+        """
+        if self._service is not None:
+            return self._service.sample(self.cpu(), demand) * self.latencyscaler
+
+        work = demand if demand is not None else self._stream.exponential()
+        return work / self.capacity * self.latencyscaler
+
+    def cpu(self):
+        """
+        Method to expose the server's cpu usage, the fraction of the cores
+        that is busy.
+
+        Returns
+        -------
+        float
+        """
+        # a blocked server is fully used
+        if self._blocked:
+            return 1.0
+
+        return min(self._active, self._cores) / self._cores
+
+    def _rate(self):
+        """
+        Method to expose the share of a core every message on the cpu gets.
+
+        Returns
+        -------
+        float
+        """
+        return min(1.0, self._cores / self._active) if self._active else 0.0
+
+    def _advance(self):
+        """
+        Method to advance the virtual time until now.
+        """
+        self._virtual += self._rate() * (self._env.now - self._advanced)
+        self._advanced = self._env.now
+
+    def _schedule(self):
+        """
+        Method to schedule the timer of the message that is done first.
+        """
+        self._generation += 1
+
+        # messages that left early are removed lazily
+        while self._heap and self._heap[0][2]['cancelled']:
+            heapq.heappop(self._heap)
+
+        if not self._heap:
+            return
+
+        delay = max((self._heap[0][0] - self._virtual) / self._rate(), 0.0)
+        timer = self._env.timeout(delay)
+        timer.callbacks.append(lambda _, generation=self._generation: self._complete(generation))
+
+    def _complete(self, generation):
+        """
+        Method to complete the messages that are done, once their timer fires.
+
+        Parameters
+        ----------
+        generation: integer
+            Generation of the timer, a timer that was rescheduled does nothing.
+        """
+        if generation != self._generation:
+            return
+
+        self._advance()
+
+        # complete all messages that are done, up to some slack for rounding
+        while self._heap and self._heap[0][0] <= self._virtual + 1e-12:
+            (_, _, job) = heapq.heappop(self._heap)
+            if job['cancelled']:
+                continue
+
+            self._active -= 1
+            del self._jobs[id(job['event'])]
+            job['event'].succeed(self._env.now - job['message']['begin'])
+
+        self._schedule()
+
+    def _start(self, job):
+        """
+        Method to put a message on the cpu.
+
+        Parameters
+        ----------
+        job: dict
+        """
+        if job['cancelled']:
+            return
+
+        self._advance()
+        job['finish'] = self._virtual + job['message']['work']
+        heapq.heappush(self._heap, (job['finish'], next(self._sequence), job))
+        self._active += 1
+
+        self._schedule()
+
+    def serve(self, latency, message=None):
+        """
+        Method to process a message with the given amount of work.
+
+        Parameters
+        ----------
+        latency: float
+            Work the message needs, @see SharingServer.latency.
+        message: dict
+            Progress of the message, which is kept up to date (@see
+            SharingServer.settle), so it can be continued from a checkpoint.
+            [optional]
+
+        Returns
+        -------
+        simpy.Event
+            Event that succeeds with the time the message took, once it's done.
+        """
+        message = message if message is not None else {}
+        event = self._env.event()
+
+        # a restored message continues with the work it still needs
+        message.setdefault('begin', self._env.now)
+        message['work'] = latency
+
+        job = {"event": event, "message": message, "cancelled": False, "finish": None}
+        self._jobs[id(event)] = job
+
+        # wait for I/O first, unless the message is past that already
+        if 'io' not in message and self._io:
+            message['io'] = self._env.now + self._stream.exponential(self._io)
+
+        if 'io' in message and message['io'] > self._env.now:
+            timer = self._env.timeout(message['io'] - self._env.now)
+            timer.callbacks.append(lambda _: self._start(job))
+        else:
+            self._start(job)
+
+        return event
+
+    def cancel(self, event):
+        """
+        Method to stop processing a message, e.g. after a timeout.
+
+        Parameters
+        ----------
+        event: simpy.Event
+            @see SharingServer.serve.
+        """
+        job = self._jobs.pop(id(event), None)
+        if job is None:
+            return
+
+        job['cancelled'] = True
+
+        # a message on the cpu leaves its share to the others
+        if job['finish'] is not None:
+            self._advance()
+            self._active -= 1
+            self._schedule()
+
+    def settle(self):
+        """
+        Method to write the work that every message on the cpu still needs to
+        its progress, e.g. before a checkpoint.
+        """
+        self._advance()
+
+        for job in self._jobs.values():
+            if job['finish'] is not None:
+                job['message']['work'] = job['finish'] - self._virtual
@@ -0,0 +1,518 @@
+"""
+This file contains a function that runs a single simulation. It sets up the
+environment, server pools, loggers and generators from a configuration, and is
+used by both the command line tool and the webclient.
+
+@file   lib/Simulation.py
+@scope  public
+"""
+
+# dependencies
+from lib.Environment import Environment, RealtimeEnvironment
+from lib.MultiServers import MultiServers
+from lib.Servers import Servers
+from lib.Logger import Logger
+from lib.MessageGenerator import MessageGenerator, mix
+from lib.ServiceTime import create as service_time
+from lib.ErrorGenerator import ErrorGenerator
+from lib.Scenarios import create as scenario
+from lib.Autoscaler import Autoscaler
+from lib.Seasonality import TransactionInterval as Seasonality
+from lib.Monitor import Monitor
+from lib.Profiler import Profiler
+from lib.Statistics import Statistics
+from lib.Analytic import Analytic
+from lib.Hybrid import Hybrid
+from lib.Checkpoint import Checkpoint, restore, compatible, checkpointable
+from lib.Warmup import Warmup
+from lib.Guard import Guard
+from lib.Records import Records
+from lib.Sampling import SampledLogger
+from lib.Streams import Streams
+from lib.Trace import Trace, TraceInterval
+
+# 3rd party dependencies
+import os
+import random
+import logging
+from datetime import datetime
+import numpy as np
+
+# messages about the run go to the log of the application, not the simulation
+LOGGER = logging.getLogger(__name__)
+
+
+def simulate(n, config, seasonality, log_dir, log_prefix, description, **kwargs):
+    """
+    Function that runs a simulation. This simulation can be configured by passing
+    a configuration dictionary, and specifying where all logs will be written to.
+
+    Parameters
+    ----------
+    n: int
+        The Nth simulation.
+    config: dict
+        Configuration for the simulation. Should contain the following keys:
+        - servers:      List of dictionaries, describing a server pool (kind,
+                        size, capacity, and optionally random to pick servers
+                        randomly instead of by the shortest queue, service
+                        to model the service time, @see lib.ServiceTime, and
+                        sharing to share cores between the messages, with keys
+                        cores and io, @see lib.SharingServer, shedding and
+                        queue to bound the queues, @see lib.Server.Server,
+                        breaker to put circuit breakers in front of the
+                        servers, @see lib.CircuitBreaker, and autoscaling
+                        to scale the pool during the run, @see
+                        lib.Autoscaler).
+        - process:      Sequence of kinds of servers, describing how a process within
+                        the simulation runs, or a graph with parallel and
+                        conditional branches, @see lib.Plan.
+        - runtime:      Until when the simulation should run.
+        - max_volumne:  Maximum number of events.
+        - network_latency: Optional network latency between two hops of a
+                        transaction.
+        - seed:         Optional seed for the random number generators.
+        - crn:          Optionally draw the arrivals, service demands, routing,
+                        errors and fluid steps from dedicated streams derived
+                        from the seed (common random numbers), @see lib.Streams, so
+                        variants of a scenario can be compared with the
+                        same random numbers.
+        - trace:        Optional dictionary to replay the arrivals of a trace
+                        instead of drawing them from the seasonality, with
+                        keys path, scale (default 1), loop (default false)
+                        and gap between the replays (default the mean time
+                        between arrivals), @see lib.Trace.
+        - hybrid:       Optional dictionary to advance quiet periods with a fluid
+                        model, @see lib.Hybrid.Hybrid for its keys (threshold,
+                        utilization and step).
+        - mix:          Optional list with a dict for every process, to draw
+                        the process of every transaction from a single
+                        stream of arrivals by weight, with keys weight
+                        (default 1), timeout (default the timeout), priority
+                        (default 1, lower goes first), seasonality (a
+                        seasonality file that scales the weight over time)
+                        and the behaviour of the client, @see client.
+        - client:       Optional dictionary with the behaviour of the client
+                        when a message fails, with keys retries, backoff,
+                        multiplier, jitter and deadline, @see
+                        lib.MessageGenerator.mix.
+        - error:        Optional dictionary to block a random server now and
+                        then, with keys errorwait and error_duration (bounds
+                        of the uniform time between and length of the
+                        errors) and reject (a blocked server rejects its
+                        requests, instead of queueing them), @see
+                        lib.ErrorGenerator.
+        - scenarios:    Optional list of failure and maintenance scenarios,
+                        e.g. failures of every server with a time to failure
+                        and repair, outages of a pool or zone, rolling
+                        restarts, slowdowns and maintenance windows, @see
+                        lib.Scenarios.
+        - slo:          Optional service level objective, with keys latency,
+                        percentile and timeouts, @see
+                        lib.Statistics.Statistics.slo, the cost of the run
+                        (server-seconds) is reported against it.
+        - sampling:     Optional dictionary to write a sample of the INFO lines
+                        of the log, with every line weighted, with keys mode
+                        (head or reservoir), rate and size, @see
+                        lib.Sampling.
+    seasonality: Seasonality
+        Seasonality object to use for the simulation. This defines the intervals
+        between events.
+    log_dir: string
+        Path pointing to where all logs should be written.
+    log_prefix: string
+        Prefix of every log file.
+
+    Keyworded parameters
+    --------------------
+    registry: Registry
+        Registry to record the simulation in.
+        [optional]
+    channel: Channel
+        Channel to publish aggregated metrics on, every second of simulated time.
+        [optional]
+    realtime: float
+        Run the simulation at a scaled wall clock rate, this many wall clock
+        seconds per simulated second. Logs are written while the simulation
+        runs, so they can be fed to a live system at a controlled rate.
+        [optional]
+    profile: string
+        Profile the simulation, and write the profile as collapsed stacks to
+        this path. A table of the profile is printed as well.
+        [optional]
+    statistics: Statistics
+        Online statistics to keep up to date during the simulation.
+        Default: a new Statistics instance.
+        [optional]
+    checkpoint: string
+        Periodically write a checkpoint of the simulation to this path.
+        [optional]
+    checkpoint_interval: float
+        Simulated time between two checkpoints.
+        Default: 3600.
+    resume: dict
+        Checkpoint to continue the simulation from, @see lib.Checkpoint.load.
+        The simulation continues with the name and logfiles of the checkpoint.
+        [optional]
+    warm: dict
+        Checkpoint of the steady state of the same scenario to start from, to
+        skip the warm-up, @see lib.Checkpoint.load. Unlike resuming, this is a
+        new simulation with its own logfiles and statistics, and it runs for
+        the runtime of the configuration from the moment of the checkpoint.
+        The configuration should have the same servers and processes, and a
+        seed in the configuration takes precedence over the random states of
+        the checkpoint, so warm runs can be replicated.
+        [optional]
+    warmup: bool|string
+        Detect the end of the warm-up, @see lib.Warmup, and reset the
+        statistics once it is over. If this is a path, a checkpoint of the
+        steady state is written to it, to warm start other runs from.
+        [optional]
+    early_stop: dict
+        Stop the simulation early once it clearly violates this service level
+        objective, @see lib.Guard.
+        [optional]
+    records: bool
+        Write a summary record of every transaction next to the logfiles, as
+        records-<name>.npz, @see lib.Records.
+        [optional]
+
+    Returns
+    -------
+    string
+    """
+    # for timing get current time
+    starttime = datetime.now()
+
+    # the checkpoint to continue from, if any
+    resume = kwargs['resume'] if 'resume' in kwargs else None
+
+    # the steady state to start from, if any
+    warm = kwargs['warm'] if 'warm' in kwargs else None
+    if warm is not None:
+        compatible(warm, config)
+
+    # both are restored the same way
+    snapshot = resume or warm
+
+    # seed the random number generators so a run can be reproduced, a resumed
+    # run restores their states instead
+    seed = config['seed'] if 'seed' in config else None
+    if seed is not None and resume is None:
+        np.random.seed(seed)
+        random.seed(seed)
+
+    # dedicated random number streams, when using common random numbers
+    streams = Streams(seed) if 'crn' in config and config['crn'] else None
+
+    # we need a new environment which we can run, paced by the wall clock if requested
+    realtime = kwargs['realtime'] if 'realtime' in kwargs else None
+    initial_time = snapshot['time'] if snapshot else 0
+    environment = (RealtimeEnvironment(initial_time=initial_time, factor=realtime) if realtime
+                   else Environment(initial_time=initial_time))
+
+    # moment the simulation ends, a warm start runs for the runtime from the
+    # moment of its checkpoint
+    until = int(config['runtime']) + (warm['time'] if warm else 0)
+    if resume and 'until' in resume['meta']:
+        until = resume['meta']['until']
+
+    # identifiers of the servers of a restored simulation, by kind
+    uuids = {pool['kind']: pool['uuids'] for pool in snapshot['pools']} if snapshot else {}
+
+    # we need a server pool
+    servers = MultiServers()
+
+    # iterate over all of the servers that need to be configured that
+    # we received from the client
+    for server in config['servers']:
+
+        # append a new server pool to the multiserver system
+        # a resumed simulation continues with the same servers
+        identifiers = {"uuids": uuids[server['kind']]} if server['kind'] in uuids else {}
+
+        # and with the server-seconds its pools used so far
+        if snapshot and server['kind'] in snapshot.get('cost', {}):
+            identifiers['cost'] = snapshot['cost'][server['kind']]
+
+        # the service time is modelled per kind, if configured
+        service = service_time(server['service']) if 'service' in server else None
+
+        # servers share their cores between the messages, if configured
+        sharing = dict(server['sharing'], stream=streams.stream(f"io.{server['kind']}") if streams else None) \
+            if 'sharing' in server else None
+
+        pool = Servers(environment, size=server['size'], capacity=server['capacity'], kind=server['kind'],
+                       stream=streams.stream(f"routing.{server['kind']}") if streams else None,
+                       service=service, sharing=sharing, shedding=server['shedding'] if 'shedding' in server else None,
+                       queue=server['queue'] if 'queue' in server else None,
+                       breaker=server['breaker'] if 'breaker' in server else None, **identifiers)
+
+        # pick servers randomly instead of by the shortest queue, if configured
+        if 'random' in server:
+            pool.random(server['random'])
+
+        servers.append(pool)
+
+    # we need a logger that will log all events that happen in the simulation
+    name = "{0}_{1:04d}_{2}_{3}".format(log_prefix, n,
+                                        datetime.now().strftime("%Y-%m-%d_%H-%M"),
+                                        description.replace(" ", "-"))
+
+    # a resumed simulation continues its logfiles, without what was logged
+    # after the checkpoint
+    if resume:
+        name = resume['meta']['name']
+        for (type, prefix) in (('info', ''), ('error', 'error-')):
+            path = os.path.join(log_dir, f"{prefix}{name}.csv")
+            if os.path.exists(path) and type in resume['logs']:
+                os.truncate(path, resume['logs'][type])
+
+    logger = Logger(name, directory=log_dir, show_stdout=False, usequeue=False)
+
+    # we also need a logger for all error events that happen in the simulation
+    error_logger = Logger(f"error-{name}", directory=log_dir, show_stdout=False)
+
+    # Start QueueListener
+    if hasattr(logger, "listener"):
+        logger.listener.start()
+
+    # a sampled log has the weight of every line in an extra column
+    sampling = config['sampling'] if 'sampling' in config else None
+
+    # Enter first line for correct .csv headers
+    if not resume:
+        logger.log(
+            'Time;Server;Message_type;CPU Usage;Memory Usage;Latency;Transaction_ID;From_Server;Message' +
+            (';Weight' if sampling else ''))
+        error_logger.log('Time;Server;Error type;Start-Stop')
+
+    # only a sample of the info lines is written, if configured
+    if sampling:
+        logger = SampledLogger(logger, sampling, seed=seed)
+        environment.observer(logger)
+
+    # we can use the logger for the simulation, so we know where all logs will be written
+    environment.logger(logger)
+    environment.logger(error_logger, type="error")
+
+    # we keep online statistics of the simulation
+    statistics = kwargs['statistics'] if 'statistics' in kwargs else Statistics()
+    environment.observer(statistics)
+
+    # a resumed simulation continues counting where it was
+    if resume:
+        if resume['statistics'] is not None:
+            statistics.merge(resume['statistics'])
+        statistics.events += resume['events']
+        for (type, counts) in resume['counts'].items():
+            environment.restore_counts(counts, type=type)
+
+    # a summary record of every transaction if requested, the records of a
+    # resumed simulation would miss everything before the checkpoint
+    records = None
+    if 'records' in kwargs and kwargs['records']:
+        if resume:
+            raise ValueError("transaction records are not supported for resumed simulations")
+        records = Records(environment, os.path.join(log_dir, f"records-{name}.npz"))
+
+    # a warm start has no warm-up, its statistics start right away
+    if warm:
+        statistics.start = warm['time']
+
+    # the analytic approximation needs the seasonality file itself
+    seasonality_file = seasonality
+
+    # we need a new form of seasonality
+    seasonality = Seasonality(seasonality, enviroment=environment, max_volume=config["max_volume"],
+                              stream=streams.stream('arrivals') if streams else None)
+
+    # every process replays its own arrivals of a trace, if configured
+    trace = config['trace'] if 'trace' in config else None
+    if trace:
+        trace = Trace(trace['path'], processes=range(len(config['process'])),
+                      scale=trace['scale'] if 'scale' in trace else 1,
+                      loop=trace['loop'] if 'loop' in trace else False,
+                      gap=trace['gap'] if 'gap' in trace else None)
+    sources = [TraceInterval(trace, enviroment=environment, process=index) if trace else seasonality
+               for index in range(len(config['process']))]
+
+    # types of processes, with their weight in the mix, timeout and priority,
+    # the weights can vary with a seasonality of their own
+    types = [dict(kind_type, seasonality=Seasonality(kind_type['seasonality'], enviroment=environment)
+                  if kind_type['seasonality'] else None) for kind_type in mix(config)]
+
+    # a mix of processes shares a single generator, which draws the type of
+    # every transaction, unless every process replays its own arrivals
+    groups = [types] if 'mix' in config and not trace else [[kind_type] for kind_type in types]
+
+    # now, we can attach the MessageGenerator to the simulation envoirment
+    latency = config['network_latency'] if 'network_latency' in config else 0
+    generators = [MessageGenerator(environment, servers, sources[index], kinds=group[0]['kinds'],
+                                   timeout=config['timeout'], latency=latency, mix=group,
+                                   restore=snapshot['generators'][index] if snapshot else None,
+                                   stream=streams.stream(f"service.{index}") if streams else None,
+                                   client=streams.stream(f"client.{index}") if streams else None)
+                  for (index, group) in enumerate(groups)]
+
+    # advance the quiet periods with a fluid model if requested
+    hybrid = None
+    if 'hybrid' in config and trace:
+        LOGGER.warning("The fluid model needs a seasonality, traces are replayed without it")
+    elif 'hybrid' in config:
+        analytic = Analytic(config, seasonality_file)
+        hybrid = Hybrid(environment, servers, generators, seasonality, analytic,
+                        mix=types if 'mix' in config else None,
+                        stream=streams.stream('hybrid') if streams else None, **config['hybrid'])
+
+    # publish the metrics of the simulation while it runs, if someone is listening
+    if 'channel' in kwargs and kwargs['channel'] is not None:
+        Monitor(environment, servers, kwargs['channel'])
+
+    # count and time all events of the simulation if requested
+    profile = kwargs['profile'] if 'profile' in kwargs else None
+    profiler = Profiler(environment).instrument(servers, seasonality) if profile else None
+
+    # Add error generator if specified
+    errors = None
+    if 'error' in config:
+        LOGGER.info("With error function")
+        errors = ErrorGenerator(environment, servers, config['error']['errorwait'],
+                                config['error']['error_duration'],
+                                restore=snapshot['errors'] if snapshot else None,
+                                stream=streams.stream('errors') if streams else None,
+                                reject=config['error']['reject'] if 'reject' in config['error'] else False)
+
+    # scale the pools during the run, if configured
+    for server in config['servers']:
+        if 'autoscaling' in server:
+            Autoscaler(environment, servers.get(server['kind']), server['autoscaling'], seasonality=seasonality)
+
+    # failure and maintenance scenarios, each runs as a single process
+    for (index, scenario_config) in enumerate(config['scenarios'] if 'scenarios' in config else []):
+        scenario(environment, servers, scenario_config,
+                 stream=streams.stream(f"scenarios.{index}") if streams else None)
+
+    # continue the transactions that were in flight, with their requests
+    if snapshot:
+        restore(snapshot, servers, generators, random_state=not (warm and seed is not None),
+                streams=streams)
+
+    # periodically checkpoint the simulation if requested
+    checkpoint = kwargs['checkpoint'] if 'checkpoint' in kwargs else None
+
+    # a simulation that is checkpointed, resumed or starts from its steady
+    # state can't have features that a checkpoint doesn't hold
+    if checkpoint or snapshot or isinstance(kwargs.get('warmup'), str):
+        checkpointable(config)
+
+    if checkpoint:
+        Checkpoint(environment, checkpoint,
+                   kwargs['checkpoint_interval'] if 'checkpoint_interval' in kwargs else 3600,
+                   servers=servers, generators=generators, errors=errors, statistics=statistics,
+                   loggers={"info": logger, "error": error_logger},
+                   streams=streams,
+                   meta={"n": n, "name": name, "config": config, "seasonality": seasonality_file,
+                         "log_dir": log_dir, "log_prefix": log_prefix, "description": description,
+                         "created": resume['meta']['created'] if resume else starttime, "until": until})
+
+    # detect the end of the warm-up if requested, and checkpoint the steady state
+    warmup = kwargs['warmup'] if 'warmup' in kwargs else None
+    if warmup and hybrid is not None:
+        LOGGER.warning("Warm-up detection is not supported in hybrid mode, statistics include the warm-up")
+    elif warmup:
+        steady = None
+        if isinstance(warmup, str):
+            steady = Checkpoint(environment, warmup, None,
+                                servers=servers, generators=generators, errors=errors, statistics=statistics,
+                                loggers={"info": logger, "error": error_logger},
+                                streams=streams,
+                                meta={"n": n, "name": name, "config": config, "seasonality": seasonality_file,
+                                      "log_dir": log_dir, "log_prefix": log_prefix, "description": description,
+                                      "created": starttime})
+        Warmup(environment, statistics, checkpoint=steady)
+
+    # stop the simulation once it clearly violates its objective if requested
+    if 'early_stop' in kwargs and kwargs['early_stop'] is not None:
+        Guard(environment, statistics, kwargs['early_stop'])
+
+    # run the simulation with a certain runtime (runtime). this runtime is not equivalent
+    # to the current time (measurements). this should be the seasonality of the system.
+    # for example, day or week.
+    if realtime:
+        # the wall clock starts now, not when the environment was constructed
+        environment.sync()
+    environment.run(until=until)
+
+    # the number of events tells how much work the simulation was
+    statistics.events += environment.events()
+
+    if statistics.stopped is not None:
+        LOGGER.warning(f"Stopped early at {statistics.stopped:.1f}, the objective is clearly violated")
+
+    # the server-seconds every pool used
+    for pool in servers.pools():
+        statistics.charge(pool.kind(), pool.cost())
+
+    # report the cost of scaling the pools against the objective
+    if any('autoscaling' in server for server in config['servers']):
+        costs = ", ".join(f"{kind} {cost:.0f}" for (kind, cost) in statistics.cost.items())
+        LOGGER.info(f"Autoscaling: {sum(statistics.cost.values()):.0f} server-seconds ({costs})")
+        if 'slo' in config:
+            slo = statistics.slo(config['slo'])
+            LOGGER.info(f"SLO {'met' if slo['met'] else 'missed'}: p{slo['percentile']} latency {slo['latency']:.4f}s, "
+                        f"{slo['timeouts']:.2%} of the messages timed out")
+
+    # report how well the simulation kept up with the wall clock
+    if realtime:
+        drift = environment.drift()
+        LOGGER.info(f"Realtime drift over {drift['steps']} events: mean {drift['mean']:.4f}s, "
+                    f"max {drift['max']:.4f}s, last {drift['last']:.4f}s")
+
+    # report how much of the simulation was advanced with the fluid model
+    if hybrid is not None:
+        fluid = hybrid.fluid()
+        LOGGER.info(f"Hybrid: {fluid['fluid']:.0f}s ({fluid['fraction']:.1%}) of simulated time in fluid mode")
+
+    # the summary records of the transactions
+    if records is not None:
+        LOGGER.info(f"Records of {len(records)} transactions written to {records.write()}")
+
+    # report where the wall time went
+    if profiler is not None:
+        profiler.uninstall().write(profile)
+        LOGGER.info(profiler.report())
+        LOGGER.info(f"Collapsed stacks written to {profile}")
+
+    # Start QueueListener
+    if hasattr(logger, "listener"):
+        logger.listener.stop()
+
+    # we're done logging
+    logger.close()
+    error_logger.close()
+
+    # keep track of the simulation, together with its logfiles
+    if 'registry' in kwargs and kwargs['registry'] is not None:
+
+        # summary statistics of the simulation
+        info, errors = environment.counts(), environment.counts(type="error")
+        stats = {"info": info.get(20, 0), "errors": info.get(40, 0), "error_events": sum(errors.values())}
+        stats.update(statistics.summary())
+        if realtime:
+            stats['drift'] = environment.drift()
+        if hybrid is not None:
+            stats['hybrid'] = hybrid.fluid()
+
+        kwargs['registry'].register(n, name,
+                                    description=description,
+                                    created=resume['meta']['created'] if resume else starttime,
+                                    config=config,
+                                    seed=seed,
+                                    runtime=config['runtime'],
+                                    walltime=(datetime.now() - starttime).total_seconds(),
+                                    log_file=os.path.join(log_dir, f"{name}.csv"),
+                                    error_file=os.path.join(log_dir, f"error-{name}.csv"),
+                                    stats=stats)
+
+    return name
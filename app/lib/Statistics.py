@@ -0,0 +1,498 @@
+"""
+Classes for keeping online statistics of a simulation. Statistics are updated
+as events happen in the simulation, so no logfile has to be parsed afterwards
+to know e.g. the throughput or the latency percentiles of a run.
+
+@file   lib/Statistics.py
+@scope  public
+"""
+
+# dependencies
+import math
+
+
+class Histogram(object):
+    """
+    Histogram with logarithmically spaced bins. This keeps a fixed amount of
+    memory, regardless of the number of values added, while percentiles can
+    still be estimated with a small relative error.
+    """
+
+    def __init__(self, low=1e-4, high=1e4, bins_per_decade=20):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        low: float
+            Upper bound of the lowest bin, smaller values end up in this bin.
+            Default: 1e-4.
+        high: float
+            Lower bound of the highest bin, larger values end up in this bin.
+            Default: 1e4.
+        bins_per_decade: integer
+            Number of bins per factor ten.
+            Default: 20.
+        """
+        self._low = low
+        self._bins_per_decade = bins_per_decade
+
+        # number of bins between the low and high bound, plus an underflow
+        # and an overflow bin
+        self._size = int(round(math.log10(high / low) * bins_per_decade)) + 2
+        self._counts = [0] * self._size
+
+        # exact aggregates of all values
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        """
+        Method to add a value to the histogram.
+
+        Parameters
+        ----------
+        value: float
+            Value to add.
+        weight: float
+            Number of times the value should be counted.
+
+        Returns
+        -------
+        self
+        """
+        # find the bin of the value
+        if value <= self._low:
+            index = 0
+        else:
+            index = min(int(math.log10(value / self._low) * self._bins_per_decade) + 1, self._size - 1)
+
+        self._counts[index] += weight
+
+        # update the exact aggregates
+        self.count += weight
+        self.total += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        # allow chaining
+        return self
+
+    def merge(self, other):
+        """
+        Method to add all values of another histogram with the same bins.
+
+        Parameters
+        ----------
+        other: Histogram
+
+        Returns
+        -------
+        self
+        """
+        # we can only add up the bins if they are the same
+        if (other._low, other._bins_per_decade, other._size) != (self._low, self._bins_per_decade, self._size):
+            raise ValueError("histograms have different bins")
+
+        self._counts = [a + b for (a, b) in zip(self._counts, other._counts)]
+
+        # update the exact aggregates
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        # allow chaining
+        return self
+
+    def mean(self):
+        """
+        Method to expose the mean of all values.
+
+        Returns
+        -------
+        float
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """
+        Method to estimate a percentile of all values.
+
+        Parameters
+        ----------
+        q: float
+            Percentile to estimate, between 0 and 100.
+
+        Returns
+        -------
+        float
+        """
+        if not self.count:
+            return 0.0
+
+        # number of values at or below the percentile
+        rank = self.count * q / 100
+
+        cumulative = 0
+        for (index, count) in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= rank and count:
+
+                # expose the upper edge of the bin, bounded by the exact extremes
+                edge = self._low * 10 ** (index / self._bins_per_decade)
+                return min(max(edge, self.min), self.max)
+
+        return self.max
+
+    def bins(self):
+        """
+        Method to expose the non-empty bins of the histogram.
+
+        Returns
+        -------
+        list
+            List of (upper edge, count) tuples.
+        """
+        return [(self._low * 10 ** (index / self._bins_per_decade), count)
+                for (index, count) in enumerate(self._counts) if count]
+
+    def summary(self):
+        """
+        Method to expose a summary of the histogram.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            "count":    self.count,
+            "mean":     self.mean(),
+            "min":      self.min if self.count else 0.0,
+            "max":      self.max if self.count else 0.0,
+            "p50":      self.percentile(50),
+            "p90":      self.percentile(90),
+            "p99":      self.percentile(99),
+        }
+
+
+class Statistics(object):
+    """
+    Observer that keeps online statistics of a simulation. Install it on an
+    environment to have it notified of all events.
+
+    @see Environment.observer
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        # number of transactions that were completed
+        self.transactions = 0
+
+        # number of messages that were processed by a server
+        self.hops = 0
+
+        # number of messages that timed out
+        self.timeouts = 0
+
+        # number of messages that were shed by a full server
+        self.rejected = 0
+
+        # number of messages that were retried, and of transactions that
+        # were abandoned at their deadline
+        self.retries = 0
+        self.deadlines = 0
+
+        # end-to-end latency of the transactions
+        self.latency = Histogram()
+
+        # number of events scheduled by the simulation, set when it is done
+        self.events = 0
+
+        # hops, timeouts, rejections and the sum of the cpu usage seen by
+        # hops, by kind
+        self.kinds = {}
+
+        # end-to-end latency of the transactions, by type of process
+        self.processes = {}
+
+        # time the messages waited in the queue of a server, processed or
+        # not, and the time the server took to process them, by server
+        self.servers = {}
+
+        # moment the statistics started, after the warm-up of the simulation
+        self.start = 0.0
+
+        # server-seconds used by the pools, by kind, set when it is done
+        self.cost = {}
+
+        # moment the simulation was stopped early, @see lib.Guard
+        self.stopped = None
+
+    def reset(self, start=0.0):
+        """
+        Method to forget everything that happened so far, e.g. at the end of
+        the warm-up of a simulation. The number of events is kept, as it tells
+        how much work the simulation was.
+
+        Parameters
+        ----------
+        start: float
+            Moment the statistics start (again).
+            Default: 0.
+
+        Returns
+        -------
+        self
+        """
+        self.transactions = 0
+        self.hops = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.retries = 0
+        self.deadlines = 0
+        self.latency = Histogram()
+        self.kinds = {}
+        self.processes = {}
+        self.servers = {}
+        self.start = start
+
+        # allow chaining
+        return self
+
+    def notify(self, event, data):
+        """
+        Method that is called by the environment when an event occurs.
+
+        Parameters
+        ----------
+        event: string
+            Name of the event.
+        data: dict
+            Data describing the event.
+        """
+        if event == 'hop':
+            self.hops += 1
+            kind = self._kind(data['kind'])
+            kind['hops'] += 1
+            kind['cpu'] += data['cpu']
+
+            # a saturated server is one where the messages wait, rather than
+            # one that is slow to process them
+            server = self._server(data['server'].name())
+            server['wait'].add(data['wait'] if 'wait' in data else 0.0)
+            server['service'].add(data['latency'])
+
+        # a message that failed waited as well, leaving it out would only
+        # show the wait of the messages that made it
+        elif event == 'failed':
+            self._server(data['server'].name())['wait'].add(data['wait'])
+
+        elif event == 'transaction':
+            self.transactions += 1
+            self.latency.add(data['end'] - data['start'])
+            self._process(data['process'] if 'process' in data else 0).add(data['end'] - data['start'])
+
+        elif event == 'timeout':
+            self.timeouts += 1
+            self._kind(data['kind'])['timeouts'] += 1
+
+        elif event == 'rejected':
+            self.rejected += 1
+            self._kind(data['kind'])['rejected'] += 1
+
+        elif event == 'retry':
+            self.retries += 1
+
+        elif event == 'deadline':
+            self.deadlines += 1
+
+        # a step of the fluid model accounts for many transactions at once
+        elif event == 'fluid':
+            self.transactions += data['transactions']
+            self.timeouts += data['timeouts']
+            for latency in data['latencies']:
+                self.latency.add(float(latency))
+
+            for (name, counters) in data['kinds'].items():
+                kind = self._kind(name)
+                kind['hops'] += counters['hops']
+                kind['cpu'] += counters['cpu'] * counters['hops']
+                self.hops += counters['hops']
+
+    def merge(self, other):
+        """
+        Method to add the statistics of another (part of a) simulation, e.g.
+        of another shard.
+
+        Parameters
+        ----------
+        other: Statistics
+
+        Returns
+        -------
+        self
+        """
+        self.transactions += other.transactions
+        self.hops += other.hops
+        self.timeouts += other.timeouts
+        self.rejected += getattr(other, 'rejected', 0)
+        self.retries += getattr(other, 'retries', 0)
+        self.deadlines += getattr(other, 'deadlines', 0)
+        self.events += other.events
+        self.latency.merge(other.latency)
+        self.start = max(self.start, other.start)
+
+        for (name, counters) in other.kinds.items():
+            kind = self._kind(name)
+            for key in kind:
+                kind[key] += counters.get(key, 0)
+
+        for (process, latency) in other.processes.items():
+            self._process(process).merge(latency)
+
+        for (name, histograms) in getattr(other, 'servers', {}).items():
+            server = self._server(name)
+            server['wait'].merge(histograms['wait'])
+            server['service'].merge(histograms['service'])
+
+        for (kind, cost) in getattr(other, 'cost', {}).items():
+            self.charge(kind, cost)
+
+        # allow chaining
+        return self
+
+    def charge(self, kind, cost):
+        """
+        Method to add the server-seconds a pool used.
+
+        Parameters
+        ----------
+        kind: string
+            Kind of the servers of the pool.
+        cost: float
+            Server-seconds, @see lib.Servers.cost.
+
+        Returns
+        -------
+        self
+        """
+        self.cost[kind] = self.cost.get(kind, 0.0) + cost
+
+        # allow chaining
+        return self
+
+    def slo(self, targets):
+        """
+        Method to check the statistics against a service level objective.
+
+        Parameters
+        ----------
+        targets: dict
+            Objective, with the keys latency (maximum end-to-end latency at
+            the percentile), percentile (default 99) and timeouts (maximum
+            fraction of the messages that time out), both optional.
+
+        Returns
+        -------
+        dict
+            Latency at the percentile, fraction of the messages that timed
+            out, and whether the objective is met.
+        """
+        percentile = targets['percentile'] if 'percentile' in targets else 99
+        latency = self.latency.percentile(percentile)
+
+        messages = self.hops + self.timeouts
+        timeouts = self.timeouts / messages if messages else 0.0
+
+        met = ('latency' not in targets or latency <= targets['latency']) and \
+            ('timeouts' not in targets or timeouts <= targets['timeouts'])
+
+        return {"percentile": percentile, "latency": latency, "timeouts": timeouts, "met": met}
+
+    def _kind(self, kind):
+        """
+        Method to get the counters of a kind of server.
+
+        Parameters
+        ----------
+        kind: string
+
+        Returns
+        -------
+        dict
+        """
+        if kind not in self.kinds:
+            self.kinds[kind] = {"hops": 0, "timeouts": 0, "rejected": 0, "cpu": 0.0}
+
+        return self.kinds[kind]
+
+    def _process(self, process):
+        """
+        Method to get the latency histogram of a type of process.
+
+        Parameters
+        ----------
+        process: integer
+            Index of the type of process.
+
+        Returns
+        -------
+        Histogram
+        """
+        if process not in self.processes:
+            self.processes[process] = Histogram()
+
+        return self.processes[process]
+
+    def _server(self, name):
+        """
+        Method to get the wait and service time histograms of a server.
+
+        Parameters
+        ----------
+        name: string
+            Name of the server.
+
+        Returns
+        -------
+        dict
+        """
+        if name not in self.servers:
+            self.servers[name] = {"wait": Histogram(), "service": Histogram()}
+
+        return self.servers[name]
+
+    def summary(self):
+        """
+        Method to expose a summary of the statistics.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            "events":       self.events,
+            "start":        self.start,
+            "transactions": self.transactions,
+            "hops":         self.hops,
+            "timeouts":     self.timeouts,
+            "rejected":     self.rejected,
+            "retries":      self.retries,
+            "deadlines":    self.deadlines,
+            "latency":      self.latency.summary(),
+            "kinds":        {kind: {"hops": counters['hops'],
+                                    "timeouts": counters['timeouts'],
+                                    "rejected": counters.get('rejected', 0),
+                                    "cpu": counters['cpu'] / counters['hops'] if counters['hops'] else 0.0}
+                             for (kind, counters) in self.kinds.items()},
+            "processes":    {process: latency.summary() for (process, latency) in sorted(self.processes.items())},
+            "servers":      {name: {"wait": histograms['wait'].summary(), "service": histograms['service'].summary()}
+                             for (name, histograms) in sorted(getattr(self, 'servers', {}).items())},
+            "cost":         dict(self.cost),
+            "stopped":      getattr(self, 'stopped', None),
+        }
@@ -0,0 +1,89 @@
+"""
+Class for drawing random numbers from dedicated, named streams. Normally all
+components of a simulation draw from the same global random number generator,
+so a change in one component (e.g. the load balancing) shifts the numbers that
+all other components draw. With common random numbers (CRN), the arrivals,
+the service demands, the routing and the errors each have their own stream
+derived from the seed, so two variants of a scenario see exactly the same
+arrivals, demands and errors, and their difference can be measured with far
+fewer replications.
+
+Every stream is a numpy RandomState, so it can be used wherever the
+numpy.random module is used.
+
+@file   lib/Streams.py
+@scope  public
+"""
+
+# 3rd party dependencies
+import zlib
+import numpy as np
+
+
+class Streams(object):
+
+    def __init__(self, seed=None):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        seed: integer
+            Seed all streams are derived from.
+            Default: 0.
+        """
+        self._seed = seed if seed is not None else 0
+
+        # streams by name, created when first used
+        self._streams = {}
+
+    def stream(self, name):
+        """
+        Method to get a stream by its name. The same seed and name always give
+        the same stream, regardless of the other streams that are used.
+
+        Parameters
+        ----------
+        name: string
+            Name of the stream, e.g. 'arrivals' or 'routing.balance'.
+
+        Returns
+        -------
+        numpy.random.RandomState
+        """
+        if name not in self._streams:
+
+            # independent seed for every name
+            sequence = np.random.SeedSequence(self._seed, spawn_key=(zlib.crc32(name.encode()),))
+            self._streams[name] = np.random.RandomState(sequence.generate_state(4))
+
+        return self._streams[name]
+
+    def state(self):
+        """
+        Method to expose the states of all streams, e.g. for a checkpoint.
+
+        Returns
+        -------
+        dict
+        """
+        return {name: stream.get_state() for (name, stream) in self._streams.items()}
+
+    def restore(self, state):
+        """
+        Method to continue all streams from their states.
+
+        Parameters
+        ----------
+        state: dict
+            @see Streams.state.
+
+        Returns
+        -------
+        self
+        """
+        for (name, stream_state) in state.items():
+            self.stream(name).set_state(stream_state)
+
+        # allow chaining
+        return self
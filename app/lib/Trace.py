@@ -0,0 +1,315 @@
+"""
+Classes for replaying recorded arrivals, e.g. from production logs, instead of
+drawing them from a seasonality. A trace is a file with the moment of every
+arrival (in seconds) and optionally the process it belongs to (the index of
+the process in the configuration). Traces can be:
+
+- csv, separated by ';' with a 'time' and optionally a 'process' column;
+- binary (.bin), little-endian records of a float64 time and int32 process.
+
+Both can be gzipped (.gz). A trace is read in chunks, once for all of its
+processes, which each get their own arrivals, @see Trace. Only a bounded part
+of it is in memory, no matter how large the file is, as long as the processes
+are spread over the trace: the arrivals that are read for one process are
+kept for the others until they're replayed.
+
+The arrivals have to be sorted by time, a trace that goes back in time, has
+no arrivals, or none of a process that is replayed, raises a ValueError.
+
+@file   lib/Trace.py
+@scope  public
+"""
+
+# 3rd party dependencies
+import gzip
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# layout of a record in a binary trace
+RECORD = np.dtype([('time', '<f8'), ('process', '<i4')])
+
+
+def chunks(path, size=4096):
+    """
+    Generator function to read a trace in chunks.
+
+    Parameters
+    ----------
+    path: string
+        Path to the trace.
+    size: integer
+        Number of arrivals per chunk.
+        Default: 4096.
+
+    Yields
+    ------
+    tuple
+        Times and processes of the arrivals in the chunk, as numpy arrays.
+    """
+    # binary traces are read record by record
+    if path.endswith('.bin') or path.endswith('.bin.gz'):
+        with (gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')) as f:
+            while True:
+                data = f.read(size * RECORD.itemsize)
+                if not data:
+                    return
+                records = np.frombuffer(data[:len(data) - len(data) % RECORD.itemsize], dtype=RECORD)
+                yield (records['time'].astype(float), records['process'].astype(int))
+
+    # csv traces are read with pandas, which handles the compression
+    for frame in pd.read_csv(path, sep=';', chunksize=size):
+        times = frame['time'].to_numpy(dtype=float)
+        processes = frame['process'].to_numpy(dtype=int) if 'process' in frame else np.zeros(len(frame), dtype=int)
+        yield (times, processes)
+
+
+def convert(source, target, size=4096):
+    """
+    Function to convert a trace to another format, e.g. a large csv trace to
+    a binary one, which is faster to read.
+
+    Parameters
+    ----------
+    source: string
+        Path to the trace to convert.
+    target: string
+        Path to write the converted trace to, its extension decides the format.
+    size: integer
+        Number of arrivals per chunk.
+        Default: 4096.
+    """
+    binary = target.endswith('.bin') or target.endswith('.bin.gz')
+    compressed = target.endswith('.gz')
+
+    with (gzip.open(target, 'wb' if binary else 'wt') if compressed
+          else open(target, 'wb' if binary else 'w')) as f:
+
+        if not binary:
+            f.write("time;process\n")
+
+        for (times, processes) in chunks(source, size):
+            if binary:
+                records = np.empty(len(times), dtype=RECORD)
+                records['time'], records['process'] = times, processes
+                f.write(records.tobytes())
+            else:
+                f.write(''.join(f"{float(time)!r};{int(process)}\n" for (time, process) in zip(times, processes)))
+
+
+class Trace(object):
+    """
+    Trace reads a trace once for all of its processes, and hands every
+    process its own arrivals, @see TraceInterval.
+    """
+
+    def __init__(self, path, processes=(0,), scale=1, loop=False, gap=None, size=4096):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        path: string
+            Path to the trace.
+        processes: list
+            Indices of the processes whose arrivals are replayed.
+            Default: the first process.
+        scale: float
+            Factor to scale the time with, e.g. 0.5 replays the trace twice
+            as fast.
+            Default: 1.
+        loop: bool
+            Replay the trace again once it's done, otherwise there are no
+            arrivals after the trace.
+            Default: False.
+        gap: float
+            Time between the last arrival of a replay and the first of the
+            next, in the time of the trace, so they don't arrive at once.
+            Default: the mean time between the arrivals of the trace.
+        size: integer
+            Number of arrivals that are read at once.
+            Default: 4096.
+        """
+        self.path = path
+        self._scale = scale
+        self._loop = loop
+        self._gap = gap
+        self._size = size
+
+        # the trace starts at the moment of its first arrival, of any process
+        first = chunks(path, 1)
+        (times, _) = next(first, (np.empty(0), None))
+        first.close()
+        if not len(times):
+            raise ValueError(f"trace {path} has no arrivals")
+        self._origin = float(times[0])
+
+        # duration of the trace, known once it has been read completely
+        self._duration = None
+
+        # offset of the current replay of the trace
+        self._offset = 0.0
+
+        # arrivals that were read, but not replayed yet, by process
+        self._queues = {process: deque() for process in processes}
+        self._reader = self._read()
+
+    def _read(self):
+        """
+        Generator method to read the trace in chunks, and divide the arrivals
+        over the processes, as moments in simulated time. The trace is read
+        again when it loops.
+
+        Yields
+        ------
+        None
+            After every chunk.
+        """
+        while True:
+            last = self._origin
+            count = 0
+            seen = set()
+            for (times, processes) in chunks(self.path, self._size):
+                if not len(times):
+                    continue
+
+                # an arrival before the one before it is replayed too late
+                backwards = np.flatnonzero(np.diff(np.concatenate(([last], times))) < 0)
+                if len(backwards):
+                    raise ValueError(f"trace {self.path} is not sorted by time, at arrival {count + backwards[0]}")
+
+                last = times[-1]
+                count += len(times)
+
+                for (process, queue) in self._queues.items():
+                    moments = times[processes == process]
+                    if len(moments):
+                        seen.add(process)
+                        queue.append((moments - self._origin) * self._scale + self._offset)
+                yield
+
+            # every process that is replayed needs arrivals
+            missing = sorted(set(self._queues) - seen)
+            if missing:
+                raise ValueError(f"trace {self.path} has no arrivals of process {missing[0]}")
+
+            # the next replay starts a gap after this one ended
+            gap = self._gap if self._gap is not None else (last - self._origin) / (count - 1) if count > 1 else 0.0
+            self._duration = (last - self._origin + gap) * self._scale
+            if not self._loop or self._duration <= 0:
+                return
+            self._offset += self._duration
+
+    def next(self, process):
+        """
+        Method to get the next chunk of arrivals of a process.
+
+        Parameters
+        ----------
+        process: integer
+            Index of the process.
+
+        Returns
+        -------
+        numpy.ndarray|None
+            Moments of the arrivals, or None when the trace is done.
+        """
+        queue = self._queues[process]
+
+        # read on until the process has arrivals, or the trace is done
+        while not queue:
+            if next(self._reader, False) is False:
+                return None
+
+        return queue.popleft()
+
+
+class TraceInterval(object):
+    """
+    TraceInterval replays the arrivals of one process from a trace, through
+    the same interval interface as a seasonality, @see lib.Seasonality.
+    """
+
+    def __init__(self, path, enviroment=None, process=0, scale=1, loop=False, gap=None, size=4096):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        path: string|Trace
+            Path to the trace, or the trace that is shared by all of its
+            processes, so it's only read once.
+        enviroment: instance of Envoirment class
+            Environment to take the current time from.
+        process: integer
+            Index of the process whose arrivals are replayed.
+            Default: 0.
+        scale: float
+            @see Trace, unless the trace is shared.
+        loop: bool
+            @see Trace, unless the trace is shared.
+        gap: float
+            @see Trace, unless the trace is shared.
+        size: integer
+            @see Trace, unless the trace is shared.
+        """
+        self._trace = path if isinstance(path, Trace) else \
+            Trace(path, processes=(process,), scale=scale, loop=loop, gap=gap, size=size)
+        self.path = self._trace.path
+        self.env = enviroment
+        self._process = process
+
+        # moment of the last arrival, when there's no environment
+        self._last = 0.0
+
+        # arrivals that were read ahead, and the position within them
+        self._times = np.empty(0)
+        self._position = 0
+
+    def _next(self):
+        """
+        Method to get the moment of the next arrival.
+
+        Returns
+        -------
+        float
+            Moment of the next arrival, or infinity when the trace is done.
+        """
+        while self._position >= len(self._times):
+            times = self._trace.next(self._process)
+            if times is None:
+                return math.inf
+            self._times = times
+            self._position = 0
+
+        moment = self._times[self._position]
+        self._position += 1
+        return moment
+
+    def interval(self, timestamp=None):
+        """
+        Method to get the time until the next arrival. Arrivals before the
+        current time are skipped, so a restored simulation continues at the
+        right position in the trace.
+
+        Parameters
+        ----------
+        timestamp: float
+            Current time, otherwise the time of the environment is used.
+
+        Returns
+        -------
+        float
+        """
+        # If no timestamp is given, use Simpy envoirment to get time
+        if timestamp is None:
+            timestamp = self.env.now if self.env is not None else self._last
+
+        # skip arrivals before the current time, with some slack for rounding
+        moment = self._next()
+        while moment < timestamp - 1e-9:
+            moment = self._next()
+
+        self._last = moment
+        return max(float(moment - timestamp), 0.0)
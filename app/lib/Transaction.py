@@ -0,0 +1,127 @@
+"""
+Class for keeping the state of a transaction that is in flight. The state of a
+simpy process is hidden in its generator, which can't be stored. A transaction
+keeps everything that is needed to continue it explicitly: the hop it is at,
+the requests it holds on servers, and what it is waiting for. This way a
+running simulation can be checkpointed, @see lib.Checkpoint.
+
+@file   lib/Transaction.py
+@scope  public
+"""
+
+
+class Transaction(object):
+
+    def __init__(self, id, kinds, start):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        id: uuid4
+            Identifier of the transaction.
+        kinds: list
+            Sequence of kinds of servers the transaction visits.
+        start: float
+            Moment the transaction started.
+        """
+        self.id = id
+        self.kinds = kinds
+        self.start = start
+
+        # index of the hop the transaction is at
+        self.position = 0
+
+        # the server (or client) that sends the next message
+        self.requested_by = {"name": 'client', "kind": 'client'}
+
+        # requests that are held, as dicts with the kind, server and request
+        self.open = []
+
+        # what the transaction waits for, as a dict with the phase ('latency',
+        # 'backoff' or 'message') and until when it waits
+        self.waiting = None
+
+        # the message that is being processed by a server, as a dict with the
+        # moment it was sent, and once processing started the moment it ends
+        # (or the work it still needs, on a server that shares its cores)
+        self.message = None
+
+        # service demand per hop, when drawn up front (common random numbers)
+        self.demands = None
+
+        # index of the type of process, @see lib.MessageGenerator.mix
+        self.process = 0
+
+        # number of times the message of the current hop was retried
+        self.attempts = 0
+
+        # how the transaction went, 'ok' or the way its last failed message
+        # failed: 'timeout', 'rejected', 'preempted', 'deadline' or
+        # 'unavailable'
+        self.outcome = 'ok'
+
+    def state(self, requests):
+        """
+        Method to expose the state of the transaction as plain data.
+
+        Parameters
+        ----------
+        requests: dict
+            References to requests by their id, @see lib.Checkpoint.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            "id":           self.id,
+            "kinds":        self.kinds,
+            "start":        self.start,
+            "position":     self.position,
+            "requested_by": dict(self.requested_by),
+            "open":         [{"kind": row['kind'],
+                              "server": row['server'].name() if row['server'] else None,
+                              "request": requests.get(id(row['request']))}
+                             for row in self.open],
+            "waiting":      self.waiting,
+            "message":      self.message,
+            "demands":      self.demands,
+            "process":      self.process,
+            "attempts":     self.attempts,
+            "outcome":      self.outcome,
+        }
+
+    @classmethod
+    def restore(cls, state, servers):
+        """
+        Method to restore a transaction from its state. The requests are
+        restored separately, as they need to be restored per server in the
+        order they were made, @see lib.Checkpoint.restore.
+
+        Parameters
+        ----------
+        state: dict
+            @see Transaction.state.
+        servers: dict
+            Servers by name.
+
+        Returns
+        -------
+        Transaction
+        """
+        transaction = cls(state['id'], state['kinds'], state['start'])
+        transaction.position = state['position']
+        transaction.requested_by = state['requested_by']
+        transaction.open = [{"kind": row['kind'],
+                             "server": servers[row['server']] if row['server'] else None,
+                             "request": None}
+                            for row in state['open']]
+        transaction.waiting = state['waiting']
+        transaction.message = state['message']
+        transaction.demands = state['demands'] if 'demands' in state else None
+        transaction.process = state['process'] if 'process' in state else 0
+        transaction.attempts = state['attempts'] if 'attempts' in state else 0
+        transaction.outcome = state['outcome'] if 'outcome' in state else 'ok'
+
+        return transaction
@@ -0,0 +1,181 @@
+"""
+Class for detecting the end of the warm-up of a simulation. Every simulation
+starts with empty queues, so the first part of a run is biased towards low
+latencies. The warm-up is detected with MSER-5 (the marginal standard error
+rule on batches of 5 observations) on the mean latency of the transactions per
+interval of simulated time. Once the warm-up is over, the statistics of the
+simulation are reset, so they only describe the steady state, and optionally a
+checkpoint is written that later runs can start from (a warm start).
+
+@file   lib/Warmup.py
+@scope  public
+"""
+
+# 3rd party dependencies
+import logging
+import numpy as np
+
+# messages about the run go to the log of the application, not the simulation
+LOGGER = logging.getLogger(__name__)
+
+
+def mser(series, batch=5):
+    """
+    Function to find the truncation point of a series with the marginal
+    standard error rule. The series is averaged in batches, and the number of
+    batches to drop is the one that minimizes the standard error of the mean
+    of the remaining batches.
+
+    Parameters
+    ----------
+    series: list
+        Observations, in order.
+    batch: integer
+        Number of observations per batch.
+        Default: 5.
+
+    Returns
+    -------
+    integer|None
+        Number of observations to drop, or None when the series is too short
+        to tell, i.e. the truncation point is in its second half.
+    """
+    # means of the complete batches
+    count = len(series) // batch
+    if count < 2:
+        return None
+    means = np.asarray(series[:count * batch], dtype=float).reshape(count, batch).mean(axis=1)
+
+    # sums of the remaining batches for every truncation point
+    sums = np.cumsum(means[::-1])[::-1]
+    squares = np.cumsum((means ** 2)[::-1])[::-1]
+    remaining = np.arange(count, 0, -1)
+
+    # standard error of the remaining batches, the last batch on its own
+    # can't be judged
+    errors = (squares - sums ** 2 / remaining)[:-1] / remaining[:-1] ** 2
+    truncate = int(np.argmin(errors))
+
+    # a truncation point in the second half means the run is too short
+    if truncate > count / 2:
+        return None
+
+    return truncate * batch
+
+
+class Warmup(object):
+
+    def __init__(self, envoirment, statistics, interval=1, batch=5, minimum=10, **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        envoirment: instance of Envoirment class
+        statistics: Statistics
+            Online statistics of the simulation, reset once the warm-up is over.
+        interval: float
+            Simulated time that is averaged into one observation.
+            Default: 1.
+        batch: integer
+            Number of observations per batch.
+            Default: 5.
+        minimum: integer
+            Minimum number of batches before the warm-up can be over.
+            Default: 10.
+
+        Keyworded parameters
+        --------------------
+        checkpoint: Checkpoint
+            Checkpoint to write once the warm-up is over.
+            [optional]
+        """
+        # Set simpy Envoirment
+        self._env = envoirment
+
+        self._statistics = statistics
+        self._interval = interval
+        self._batch = batch
+        self._minimum = minimum
+
+        # optional checkpoint of the steady state
+        self._checkpoint = kwargs['checkpoint'] if 'checkpoint' in kwargs else None
+
+        # mean latency per interval, and the moment every interval ended
+        self._series = []
+        self._times = []
+
+        # latencies of the current interval
+        self._total = 0.0
+        self._count = 0
+
+        # moment the warm-up was over, if it is
+        self.end = None
+
+        # we need to be notified of the completed transactions
+        envoirment.observer(self)
+
+        # Initialize warm-up process
+        self.warmup_process = envoirment.process(self.warmup())
+
+    def notify(self, event, data):
+        """
+        Method that is called by the environment when an event occurs.
+
+        Parameters
+        ----------
+        event: string
+            Name of the event.
+        data: dict
+            Data describing the event.
+        """
+        if event == 'transaction' and self.end is None:
+            self._total += data['end'] - data['start']
+            self._count += 1
+
+    def warmup(self):
+        """
+        Generator method to observe the simulation until the warm-up is over.
+
+        Yields
+        ------
+        simpy.Timeout
+        """
+        # number of batches at which the series is judged next, the series is
+        # judged less often as it grows so long warm-ups stay cheap
+        judge = self._minimum
+
+        while self.end is None:
+
+            # wait for the interval to pass
+            yield self._env.timeout(self._interval)
+
+            # intervals without completed transactions tell nothing
+            if self._count:
+                self._series.append(self._total / self._count)
+                self._times.append(self._env.now)
+                self._total, self._count = 0.0, 0
+
+            if len(self._series) < judge * self._batch:
+                continue
+            judge = max(judge + 1, int(judge * 1.05))
+
+            # the truncation point is known once it is in the first half
+            truncate = mser(self._series, batch=self._batch)
+            if truncate is None:
+                continue
+
+            # let all other events of this moment happen first, so the
+            # checkpoint describes a consistent state
+            while self._env.peek() <= self._env.now:
+                yield self._env.timeout(0)
+
+            self.end = self._env.now
+            LOGGER.info(f"Warm-up over at {self.end:.1f}, steady since {self._times[truncate - 1] if truncate else 0:.1f}")
+
+            # statistics only describe the steady state from now on
+            self._statistics.reset(start=self.end)
+
+            # the steady state can be used as starting point of other runs
+            if self._checkpoint is not None:
+                self._checkpoint.write()
@@ -11,17 +11,12 @@ part clean from these declarations.
 
 # third party dependencies
 from lib.LogProcessing import get_endpoint_json, show_dash_graphs
-from lib.Environment import Environment
-from lib.MultiServers import MultiServers
-from lib.Servers import Servers
-from lib.Logger import Logger
-from lib.MessageGenerator import MessageGenerator
-from lib.ErrorGenerator import ErrorGenerator
-from lib.Seasonality import TransactionInterval as Seasonality
-
-import os
-from os.path import isfile, join, normpath, dirname, basename, getctime, exists
-from flask import request, render_template, send_file
+from lib.Registry import Registry
+from lib.Channel import Channel
+from lib.Simulation import simulate
+
+from os.path import join, normpath, dirname, basename, exists, splitext
+from flask import request, render_template, send_file, Response
 from flask.json import jsonify, load
 from datetime import datetime
 import time
@@ -29,7 +24,9 @@ import requests
 import zipfile
 import io
 import pathlib
-import glob
+import threading
+import json
+from collections import OrderedDict
 from uuid import uuid4
 
 # we need to setup logging configuration here,
@@ -46,6 +43,12 @@ Seasonality_folder = normpath(join(dirname(__file__), 'seasonality'))
 Seasonality_file = 'week.csv'
 file_prefix = "log"
 
+# number of simulations listed on the index page
+LIST_LIMIT = 100
+
+# number of metric streams of finished simulations that are kept around
+STREAM_LIMIT = 10
+
 
 def install(client, dashapp):
     """
@@ -57,8 +60,32 @@ def install(client, dashapp):
         Flask application to install the routes on.
     """
 
-    # global simulation count
-    simc = len(glob.glob(os.path.join(LOG_PATH, file_prefix+'*')))
+    # registry that keeps track of all simulations and their logfiles
+    registry = Registry()
+
+    # register the logfiles of simulations that ran without the registry
+    registry.scan(LOG_PATH, prefix=file_prefix)
+
+    # channels with live metrics of simulations, by simulation id
+    streams = OrderedDict()
+
+    def logfile(f):
+        """
+        Function to look up the path of a logfile by its name, as listed on
+        the index, simulations from the command line write their logfiles
+        to another directory.
+
+        Parameters
+        ----------
+        f: string
+            Name of the logfile.
+
+        Returns
+        -------
+        string|None
+        """
+        record = registry.find(splitext(basename(f))[0])
+        return record['log_file'] if record and record['log_file'] and exists(record['log_file']) else None
 
     # declare the index route
     @client.route('/')
@@ -71,11 +98,11 @@ def install(client, dashapp):
         string
         """
 
-        # Scan the logfile directory
-        list_of_files = glob.glob(join(LOG_PATH, 'log_*.csv'))
-
-        # Return only the filename to get no errors with old functions
-        log_filenames = [basename(filename) for filename in list_of_files]
+        # list the most recent simulations from the registry, of a single
+        # date (YYYY-MM-DD) if given
+        log_filenames = [basename(record['log_file'])
+                         for record in registry.list(limit=LIST_LIMIT, date=request.args.get('date'))
+                         if record['log_file']]
 
         if log_filenames and 'f' in request.args:
             # Parse URL request file f using last_created default
@@ -161,6 +188,10 @@ def install(client, dashapp):
             runtime: int
                 Runtime of the simulation (defined by simpy package).
 
+            stream: any
+                When given, the simulation runs in the background and its
+                metrics can be followed on /simulation/<id>/stream.
+
         Returns
         -------
         GET: dict
@@ -168,91 +199,139 @@ def install(client, dashapp):
         """
         if request.method == "POST":
 
-            # nonlocal use of the simulation count
-            nonlocal simc
-
-            # increment the simulation count
-            simc += 1
-
-            # we need a new environment which we can run.
-            environment = Environment()
+            # id of the new simulation, reserved right away so simulations
+            # that run at the same time get their own id
+            simc = registry.reserve(description=request.form.get('description', 'Web simulation'))
+
+            # configuration of the simulation, as received from the client
+            config = {
+                "servers": [{"size": int(request.form['size']),
+                             "capacity": int(request.form['capacity']),
+                             "kind": kind.strip()} for kind in request.form['kinds'].split(',')],
+                "process": [[kind.strip() for kind in request.form['process'].split(',')]],
+                "timeout": int(request.form['timeout']),
+                "runtime": int(request.form['runtime']),
+                "max_volume": int(request.form['max_volume']),
+                "description": request.form.get('description', 'Web simulation'),
+            }
+
+            # arguments to run the simulation with, this also registers it
+            # together with its logfiles
+            arguments = dict(n=simc, config=config,
+                             seasonality=join(Seasonality_folder, Seasonality_file),
+                             log_dir=LOG_PATH, log_prefix=file_prefix,
+                             description=config['description'], registry=registry)
+
+            # run the simulation in the background if the client wants to follow it
+            if 'stream' in request.form:
+
+                # channel the simulation publishes its metrics on
+                channel = streams[simc] = Channel()
+
+                # forget about the oldest streams
+                while len(streams) > STREAM_LIMIT:
+                    streams.popitem(last=False)
+
+                def run():
+                    try:
+                        simulate(channel=channel, **arguments)
+                    except Exception:
+                        registry.discard(simc)
+                        raise
+                    finally:
+                        channel.close()
+
+                threading.Thread(target=run, daemon=True).start()
 
-            # we need a server pool
-            servers = MultiServers()
+            else:
+                # a simulation that fails gives up its id
+                try:
+                    simulate(**arguments)
+                except Exception:
+                    registry.discard(simc)
+                    raise
 
-            # iterate over all of the servers that need to be configured that
-            # we received from the client
-            for kind in request.form['kinds'].split(','):
+            # expose the id of the simulation
+            return jsonify(simc)
 
-                # append a new server pool to the multiserver system
-                servers.append(Servers(environment, size=int(request.form['size']), capacity=int(
-                    request.form['capacity']), kind=kind.strip()))
+        if request.method == "GET":
 
-            # Get the current date and time to append to the logger file name
-            log_timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+            # we need an id to look up
+            if 'id' not in request.args:
+                return jsonify({"message": "No simulation ID was given."})
 
-            # now that we have an output dir, we can construct our logger which
-            # we can use for the simulation
-            name = "{0}_{1:04d}_{2}".format(file_prefix, simc, log_timestamp)
-            logger = Logger(name, directory=LOG_PATH)
+            # look up the simulation in the registry
+            record = registry.get(int(request.args.get('id')))
 
-            # we also need a logger for all error events that happen in the simulation
-            error_logger = Logger(f"error-{name}", directory=LOG_PATH)
+            if record and record['log_file']:
+                # Logfile associated to given ID was successfully found
+                return jsonify({"data": basename(record['log_file']), "message": "success"})
 
-            # Enter first line for correct .csv headers
-            logger.log(
-                'Time;Server;Message_type;CPU Usage;Memory Usage;Latency;Transaction_ID;From_Server;Message')
-            error_logger.log('Time;Server;Error type;Start-Stop')
+            elif registry.count() > 0:
+                # No logfile associated to given ID was found
+                return jsonify({"message": "No logfile (.csv) with given ID exists."})
 
-            # we can use the logger for the simulation, so we know where all logs will be written
-            environment.logger(logger)
-            environment.logger(error_logger, type="error")
+            else:
+                # No simulations registered
+                return jsonify({"message": "No logfiles were found in /logs."})
 
-            # we need a new form of seasonality
-            seasonality = Seasonality(join(Seasonality_folder, Seasonality_file),
-                                      max_volume=int(request.form['max_volume']),
-                                      enviroment=environment)
+    @client.route('/simulations')
+    def simulations():
+        """
+        Function to list the simulations in the registry, newest first.
 
-            # now, we can attach the MessageGenerator to the simulation envoirment
-            MessageGenerator(environment, servers, seasonality=seasonality,
-                             kinds=[kind.strip() for kind in
-                                    request.form['process'].split(',')],
-                             timeout=int(request.form['timeout']))
+        Parameters
+        ----------
+        date: string
+            Optional date (YYYY-MM-DD) to list the simulations of.
+        limit: int
+            Maximum number of simulations to list (default: 100).
+        offset: int
+            Number of simulations to skip (default: 0).
 
-            # run the simulation with a certain runtime (runtime). this runtime is not equivalent
-            # to the current time (measurements). this should be the seasonality of the system.
-            # for example, day or week.
-            environment.run(until=int(request.form['runtime']))
+        Returns
+        -------
+        GET: JSON
+        """
+        records = registry.list(limit=int(request.args.get('limit', LIST_LIMIT)),
+                                offset=int(request.args.get('offset', 0)),
+                                date=request.args.get('date'))
 
-            # expose the id of the simulation
-            return jsonify(simc)
+        return jsonify({"data": records, "message": "success"})
 
-        if request.method == "GET":
+    @client.route('/simulation/<int:id>/stream')
+    def simulation_stream(id):
+        """
+        Function to stream the metrics of a running simulation as server-sent
+        events. Metrics that are published while the client is busy are
+        coalesced into a single event, so the client never falls behind.
 
-            if 'id' in request.args:
-                logfile_id = "{:04d}".format(int(request.args.get('id')))
+        Parameters
+        ----------
+        id: int
+            Id of the simulation.
 
-            # Scan the logfile directory
-            list_of_files = glob.glob(os.path.join(LOG_PATH, 'log_*.csv'))
+        Returns
+        -------
+        GET: text/event-stream
+        """
+        # we need a channel to follow
+        if id not in streams:
+            return jsonify({"message": "No running simulation with given ID exists."}), 404
 
-            # Return only the filename to get no errors with old functions
-            log_filenames = [os.path.basename(filename) for filename in list_of_files]
+        channel = streams[id]
 
-            if log_filenames:
+        def events():
 
-                logfile_ids = [f.split('_')[1] for f in log_filenames]
-                name_id_dict = dict(zip(logfile_ids, log_filenames))
+            # every batch of metrics becomes a single event
+            for messages in channel.subscribe():
+                yield f"data: {json.dumps(messages)}\n\n"
 
-                if logfile_id in logfile_ids:
-                    # Logfile associated to given ID was successfully found
-                    return jsonify({"data": name_id_dict[logfile_id], "message": "success"})
+            # tell the client that the simulation is done
+            yield "event: end\ndata: {}\n\n"
 
-                else:
-                    # No logfile associated to given ID was found
-                    return jsonify({"message": "No logfile (.csv) with given ID exists."})
-            else:
-                # No logfiles found (/logs is empty)
-                return jsonify({"message": "No logfiles were found in /logs."})
+        return Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache'})
 
     @client.route('/get_endpoint_data')
     def get_endpoint_data():
@@ -269,22 +348,19 @@ def install(client, dashapp):
         GET: JSON
         """
 
-        # Scan the logfile directory
-        list_of_files = glob.glob(join(LOG_PATH, 'log_*.csv'))
-
-        # Return only the filename to get no errors with old functions
-        log_filenames = [basename(filename) for filename in list_of_files]
+        # most recently created simulation
+        latest = registry.latest()
 
         # Only process/return endpoint_matrix if a logfile exists
-        if log_filenames:
-
-            last_created = basename(max(list_of_files,
-                                        key=getctime))
+        if latest and latest['log_file']:
 
             # Parse URL request file f using last_created default
-            f = request.args.get('f', default=last_created)
+            path = logfile(request.args['f']) if 'f' in request.args else latest['log_file']
+
+            if path is None:
+                return jsonify({"data": 0, "message": "No logfile found."}), 404
 
-            return get_endpoint_json(f)
+            return get_endpoint_json(path)
 
         else:
             json_convert = {"data": 0, "message": "No logfile found."}
@@ -327,10 +403,13 @@ def install(client, dashapp):
         """
 
         if 'f' in request.args:
-            f = request.args.get('f')
+            path = logfile(request.args.get('f'))
+            if path is None:
+                return jsonify({"message": "No logfile found."}), 404
+
             eventId = datetime.now().strftime('%Y%m-%d%H-%M%S-') + str(uuid4())
 
-            show_dash_graphs(dashapp, f, eventId)
+            show_dash_graphs(dashapp, path, eventId)
 
             return ({"message": "Dash graphs successfully generated."})
 
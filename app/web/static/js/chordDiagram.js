@@ -101,4 +101,104 @@ function d3ChordDiagram(endpoint_matrix) {
       console.log(failure_message)
 
   }
-}
\ No newline at end of file
+}
+function chordDiagramStream(streamUrl, selector) {
+
+      var container = d3.select(selector || "#chordDiagram");
+
+      // messages between kinds, summed over all metrics that were received,
+      // metrics that the stream dropped to keep up are missing
+      var counts = {};
+
+      // clear previous diagrams
+      container.selectAll("*").remove();
+
+      var svg = container.append("svg")
+          .attr("width", 500)
+          .attr("height", 500),
+          diagram = svg.append("g")
+          .attr("transform", "translate(250,250)");
+
+      var color = d3.scaleOrdinal(d3.schemeCategory20);
+
+      var source = new EventSource(streamUrl);
+
+      // every event contains a batch of coalesced metrics, of a second each
+      source.onmessage = function(event) {
+        JSON.parse(event.data).forEach(function(metrics) {
+          metrics.links.forEach(function(l) {
+            var key = l.source + ">" + l.target;
+            if (!counts[key]) counts[key] = { source: l.source, target: l.target, value: 0 };
+            counts[key].value += l.value;
+          });
+        });
+        update();
+      };
+
+      // the simulation is done, stop listening
+      source.addEventListener("end", function() {
+        source.close();
+      });
+
+      function update() {
+
+        // the kinds are the groups, the messages from one to another the ribbons
+        var names = [];
+        Object.values(counts).forEach(function(l) {
+          [l.source, l.target].forEach(function(kind) {
+            if (names.indexOf(kind) < 0) names.push(kind);
+          });
+        });
+        names.sort();
+
+        var matrix = names.map(function() { return names.map(function() { return 0; }); });
+        Object.values(counts).forEach(function(l) {
+          matrix[names.indexOf(l.source)][names.indexOf(l.target)] = l.value;
+        });
+
+        var res = d3.chord()
+            .padAngle(0.05)
+            .sortSubgroups(d3.descending)
+            (matrix);
+
+        // the diagram is drawn again for every update
+        diagram.selectAll("*").remove();
+
+        var group = diagram.append("g")
+          .selectAll("g")
+          .data(res.groups)
+          .enter()
+          .append("g");
+
+        group.append("path")
+            .style("fill", function(d) { return color(names[d.index]); })
+            .style("stroke", "black")
+            .attr("d", d3.arc()
+              .innerRadius(230)
+              .outerRadius(240)
+            );
+
+        group.append("title")
+            .text(function(d) { return names[d.index] + ": " + Math.round(d.value) + " messages"; });
+
+        diagram.append("g")
+          .selectAll("path")
+          .data(res)
+          .enter()
+          .append("path")
+            .attr("d", d3.ribbon()
+              .radius(220)
+            )
+            .style("fill", function(d) { return color(names[d.source.index]); })
+            .style("opacity", 0.7)
+            .style("stroke", "black")
+          .append("title")
+            .text(function(d) {
+              return "Source: " + names[d.source.index] + ", target: " + names[d.target.index]
+                + " (" + Math.round(d.source.value) + " messages)";
+            });
+      }
+
+      // expose the source, so the caller can stop listening
+      return source;
+}
@@ -97,3 +97,106 @@ function forceGraph(forcegraphDataUrl) {
       }
 
 }
+
+function forceGraphStream(streamUrl) {
+
+      var svg = d3.select("svg");
+
+      // there's no graph when no logfile was selected yet
+      if (svg.empty()) {
+        svg = d3.select("#Visualization").append("svg")
+            .attr("width", 800)
+            .attr("height", 600);
+      }
+
+      var width = +svg.attr("width"),
+          height = +svg.attr("height");
+
+      var color = d3.scaleOrdinal(d3.schemeCategory20);
+
+      // nodes and links by id, so they keep their position between updates
+      var nodes = {},
+          links = {};
+
+      var simulation = d3.forceSimulation()
+          .force("link", d3.forceLink().distance(200).id(function(d) { return d.id; }))
+          .force("charge", d3.forceManyBody())
+          .force("center", d3.forceCenter(width / 2, height / 2));
+
+      // clear previous graphs
+      svg.selectAll("*").remove();
+
+      var linkGroup = svg.append("g").attr("class", "links"),
+          nodeGroup = svg.append("g").attr("class", "nodes"),
+          status = svg.append("text").attr("x", 10).attr("y", 20);
+
+      var source = new EventSource(streamUrl);
+
+      // every event contains a batch of coalesced metrics, only the most recent
+      // metrics are drawn, so the graph never falls behind the simulation
+      source.onmessage = function(event) {
+        var batch = JSON.parse(event.data);
+        update(batch[batch.length - 1]);
+      };
+
+      // the simulation is done, stop listening
+      source.addEventListener("end", function() {
+        source.close();
+        status.text(status.text() + " (done)");
+      });
+
+      function update(metrics) {
+
+        // add nodes for kinds that were not seen before
+        metrics.links.forEach(function(l) {
+          [l.source, l.target].forEach(function(kind) {
+            if (!nodes[kind]) nodes[kind] = { id: kind, cpu: 0, queue: 0 };
+          });
+          var key = l.source + ">" + l.target;
+          if (!links[key]) links[key] = { source: l.source, target: l.target, value: 0 };
+        });
+
+        // update the metrics of all nodes and links
+        Object.values(nodes).forEach(function(n) {
+          n.cpu = metrics.cpu[n.id] || 0;
+          n.queue = metrics.queue[n.id] || 0;
+        });
+        Object.values(links).forEach(function(l) { l.value = 0; });
+        metrics.links.forEach(function(l) {
+          links[l.source + ">" + l.target].value = l.value;
+        });
+
+        status.text("t = " + Math.round(metrics.time) + "s, throughput: " + metrics.throughput
+          + "/s, timeouts: " + metrics.timeouts);
+
+        var link = linkGroup.selectAll("line")
+          .data(Object.values(links), function(d) { return (d.source.id || d.source) + ">" + (d.target.id || d.target); });
+        link = link.enter().append("line").merge(link)
+          .attr("stroke-width", function(d) { return Math.sqrt(d.value) * 0.5; });
+
+        var node = nodeGroup.selectAll("g")
+          .data(Object.values(nodes), function(d) { return d.id; });
+        var entered = node.enter().append("g");
+        entered.append("circle").attr("fill", function(d) { return color(d.id); });
+        entered.append("text").attr('x', 6).attr('y', 3);
+        node = entered.merge(node);
+
+        // scale the nodes by their cpu usage, and show the queue length
+        node.select("circle").attr("r", function(d) { return 5 + 20 * d.cpu; });
+        node.select("text").text(function(d) { return d.id + " (queue: " + d.queue + ")"; });
+
+        simulation.nodes(Object.values(nodes)).on("tick", function() {
+          link
+            .attr("x1", function(d) { return d.source.x; })
+            .attr("y1", function(d) { return d.source.y; })
+            .attr("x2", function(d) { return d.target.x; })
+            .attr("y2", function(d) { return d.target.y; });
+          node.attr("transform", function(d) { return "translate(" + d.x + "," + d.y + ")"; });
+        });
+        simulation.force("link").links(Object.values(links));
+        simulation.alpha(0.3).restart();
+      }
+
+      // expose the source, so the caller can stop listening
+      return source;
+}
@@ -52,6 +52,9 @@ onload = function() {
             // append all data entries to the formdata
             Object.entries(form.data()).forEach(([k, v]) => formdata.set(k, v));
 
+            // run the simulation in the background, so we can follow it live
+            formdata.set('stream', 1);
+
             /**
              *  Post request to startup a new simulation based on the
              *  values of the form.
@@ -62,8 +65,11 @@ onload = function() {
 
                 // test output
                 console.log(res);
-                
 
+                // follow the metrics of the simulation in the force graph,
+                // and the messages between kinds in the chord diagram
+                forceGraphStream(`/simulation/${res}/stream`);
+                chordDiagramStream(`/simulation/${res}/stream`);
             });
 
             // console.log(simID)
@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import math
+
+import pytest
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Analytic import Analytic, exceeds, truncated
+
+SEASONALITY = os.path.join(APP, 'seasonality', 'week.csv')
+
+
+def configuration(name):
+    with open(os.path.join(APP, name)) as f:
+        return json.load(f)
+
+
+def test_truncated_latency():
+    # without a timeout to speak of, the mean of queueing plus service
+    assert truncated(1e6, 0.5, 2.0, 4.0) == pytest.approx(0.5 / 4 + 0.5 * (1 / 2 + 1 / 4))
+    assert truncated(1e6, 1.0, 4.0, 4.0) == pytest.approx(0.5)
+
+    # the mean is the integral of the probability to take longer
+    steps = 100000
+    integral = sum(exceeds((step + 0.5) / steps, 0.3, 2.0, 3.0) for step in range(steps)) / steps
+    assert truncated(1.0, 0.3, 2.0, 3.0) == pytest.approx(integral, rel=1e-6)
+
+    # a saturated server takes until the timeout
+    assert truncated(5.0, 1.0, 0.0, 1.0) == 5.0
+
+
+def test_saturated_latency_is_truncated():
+    summary = Analytic(configuration('one_high.json'), SEASONALITY).summary()
+
+    # balance is visited twice, and authentication once, they always time out
+    assert summary['saturated'] == ['authentication', 'balance']
+    assert math.isfinite(summary['latency']), "Expected the latency to be truncated at the timeouts"
+    assert 15 <= summary['latency'] < 16, f"Expected three timeouts of 5s, got {summary['latency']}"
+
+    # the transactions that arrive within the latency of the end are in flight
+    assert summary['transactions'] == pytest.approx(6690, rel=0.02), "Expected the simulated transactions"
+
+
+def test_timeout_of_the_process():
+    config = configuration('one_high.json')
+    config.update(max_volume=120, timeout=0.05)
+    tight = Analytic(config, SEASONALITY).summary()
+
+    # the timeout of the process in the mix takes precedence
+    config['mix'] = [{"timeout": 5}]
+    loose = Analytic(config, SEASONALITY).summary()
+
+    for kind in ('balance', 'authentication'):
+        assert loose['kinds'][kind]['timeout'] < tight['kinds'][kind]['timeout'], \
+            f"Expected fewer timeouts of {kind} with the timeout of the process"
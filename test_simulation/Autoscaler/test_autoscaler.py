@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+
+import pytest
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Simulation import simulate
+from lib.Statistics import Statistics
+
+SEASONALITY = os.path.join(APP, 'seasonality', 'week.csv')
+
+
+class Scaling(Statistics):
+    """
+    Statistics that also remember how the pools were scaled.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scales = []
+
+    def notify(self, event, data):
+        if event == 'scale':
+            self.scales.append((data['kind'], data['state'], data['size']))
+        super().notify(event, data)
+
+
+def run(tmp_path, name, autoscaling, kinds, size=None):
+    with open(os.path.join(APP, name)) as f:
+        config = json.load(f)
+    config.update(seed=1, runtime=40)
+    for server in config['servers']:
+        if server['kind'] in kinds:
+            server['autoscaling'] = autoscaling
+            server['size'] = size or server['size']
+
+    statistics = Scaling()
+    simulate(1, config, SEASONALITY, str(tmp_path), 'log', 'autoscaling', statistics=statistics)
+    return statistics
+
+
+def test_target_tracking_scales_out_under_load(tmp_path):
+    autoscaling = {"target": 0.6, "interval": 5, "delay": 5, "cooldown": 10, "max": 3}
+    fixed = run(tmp_path, 'one_high.json', autoscaling, ())
+    scaled = run(tmp_path, 'one_high.json', autoscaling, ('balance', 'authentication'))
+
+    # the saturated pools grow, up to their maximum
+    started = [(kind, size) for (kind, state, size) in scaled.scales if state == 'start']
+    assert {kind for (kind, _) in started} == {'balance', 'authentication'}, "Expected both pools to scale out"
+    assert max(size for (_, size) in started) == 3, "Expected the pools to grow to their maximum"
+
+    # which costs server-seconds, but fewer messages time out
+    assert scaled.cost['authentication'] > 40 and scaled.cost['credit'] == pytest.approx(40), \
+        "Expected only the scaled pools to cost more"
+    assert scaled.summary()['timeouts'] < fixed.summary()['timeouts'], "Expected fewer timeouts"
+
+
+def test_scheduled_scaling_follows_the_seasonality(tmp_path):
+    # the first point of the seasonality scales the peak of 20 servers down to 4
+    autoscaling = {"policy": "schedule", "servers": 20, "interval": 5, "delay": 0}
+    scaled = run(tmp_path, 'one_low.json', autoscaling, ('credit',))
+
+    assert [size for (_, state, size) in scaled.scales] == [2, 3, 4], "Expected the pool to grow to 4 servers"
+
+
+def test_pool_scales_in_one_by_one(tmp_path):
+    autoscaling = {"target": 0.6, "interval": 5, "delay": 0, "cooldown": 0, "min": 2}
+    scaled = run(tmp_path, 'one_low.json', autoscaling, ('credit',), size=5)
+
+    # an idle pool shrinks one server per interval, down to its minimum
+    assert scaled.scales == [('credit', 'stop', 4), ('credit', 'stop', 3), ('credit', 'stop', 2)], \
+        "Expected the pool to shrink one by one"
+    # a removed server costs until it's found idle, at the next decision
+    assert scaled.cost['credit'] == pytest.approx(5 * 10 + 4 * 5 + 3 * 5 + 2 * 20, abs=1), \
+        "Expected the removed servers to no longer cost"
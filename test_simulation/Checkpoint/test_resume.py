@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import shutil
+import logging
+
+import pytest
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Simulation import simulate
+from lib.Statistics import Statistics
+from lib.Checkpoint import load
+
+SEASONALITY = os.path.join(APP, 'seasonality', 'week.csv')
+
+
+def summary(statistics):
+    # the number of events differs, a restored simulation schedules its
+    # processes anew
+    result = statistics.summary()
+    return (result['transactions'], result['hops'], result['timeouts'], result['rejected'], result['latency'])
+
+
+def lines(f):
+    return [line.split(';')[:6] + line.split(';')[7:] for line in f]
+
+
+@pytest.mark.parametrize('name,crn', [('one_error.json', False), ('one_high.json', True)])
+def test_resume_gives_the_same_run(tmp_path, name, crn):
+    logging.getLogger().setLevel(logging.INFO)
+    with open(os.path.join(APP, name)) as f:
+        config = json.load(f)
+    config.update(seed=1, runtime=60, crn=crn)
+
+    # an uninterrupted run, which leaves its last checkpoint behind
+    first, second = tmp_path / 'first', tmp_path / 'second'
+    os.makedirs(first)
+    path = str(tmp_path / 'checkpoint.gz')
+    statistics = Statistics()
+    log = simulate(1, config, SEASONALITY, str(first), 'log', 'resume', statistics=statistics,
+                   checkpoint=path, checkpoint_interval=25)
+
+    # a run that died after its last checkpoint continues from there
+    snapshot = load(path)
+    assert 0 < snapshot['time'] < 60, "Expected a checkpoint halfway the run"
+    shutil.copytree(first, second)
+
+    meta = snapshot['meta']
+    resumed = Statistics()
+    simulate(meta['n'], meta['config'], meta['seasonality'], str(second), meta['log_prefix'], meta['description'],
+             statistics=resumed, resume=snapshot)
+
+    assert summary(resumed) == summary(statistics), "Expected the statistics of the uninterrupted run"
+    # the ids of the transactions that arrive after the checkpoint are new
+    for prefix in ('', 'error-'):
+        with open(first / f"{prefix}{log}.csv") as a, open(second / f"{prefix}{log}.csv") as b:
+            assert lines(a) == lines(b), f"Expected the {prefix}log of the uninterrupted run"
+
+
+def test_hybrid_is_not_supported(tmp_path):
+    with open(os.path.join(APP, 'one_low.json')) as f:
+        config = json.load(f)
+    config.update(runtime=10, hybrid={})
+
+    with pytest.raises(ValueError, match="checkpoints are not supported for the hybrid mode"):
+        simulate(1, config, SEASONALITY, str(tmp_path), 'log', 'hybrid', checkpoint=str(tmp_path / 'checkpoint.gz'))
@@ -0,0 +1,64 @@
+import os
+import sys
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Environment import Environment
+from lib.CircuitBreaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def half_open():
+    env = Environment()
+    breaker = CircuitBreaker(env, "test#1", threshold=0.5, window=10, minimum=2, cooldown=5)
+
+    # messages that were sent while the breaker was closed fail and open it
+    breaker.record(False).record(False)
+    assert breaker.state()['state'] == OPEN, "Expected the breaker to open"
+
+    env.run(until=5)
+    assert breaker.available(), "Expected the breaker to let a probe through after the cooldown"
+    assert breaker.state()['state'] == HALF_OPEN, "Expected the breaker to be half-open"
+
+    return (env, breaker)
+
+
+def test_only_the_probe_closes():
+    (env, breaker) = half_open()
+    probe = breaker.attempt()
+
+    # late outcomes of messages sent before don't decide
+    breaker.record(True)
+    assert breaker.state()['state'] == HALF_OPEN, "Expected a message without token to be ignored"
+    assert not breaker.available(), "Expected a single probe at a time"
+
+    breaker.record(True, probe=probe)
+    assert breaker.state()['state'] == CLOSED, "Expected the probe to close the breaker"
+
+
+def test_only_the_probe_reopens():
+    (env, breaker) = half_open()
+    probe = breaker.attempt()
+
+    breaker.record(False)
+    assert breaker.state()['state'] == HALF_OPEN, "Expected a message without token to be ignored"
+
+    breaker.record(False, probe=probe)
+    assert breaker.state()['state'] == OPEN, "Expected the failed probe to open the breaker"
+
+
+def test_expired_probe_is_ignored():
+    (env, breaker) = half_open()
+    expired = breaker.attempt()
+
+    # a probe without outcome no longer counts after a cooldown
+    env.run(until=10)
+    assert breaker.available(), "Expected a new probe after a cooldown"
+    probe = breaker.attempt()
+
+    breaker.record(False, probe=expired)
+    assert breaker.state()['state'] == HALF_OPEN, "Expected the outcome of an expired probe to be ignored"
+
+    breaker.record(True, probe=probe)
+    assert breaker.state()['state'] == CLOSED, "Expected the new probe to close the breaker"
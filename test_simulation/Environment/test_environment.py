@@ -0,0 +1,46 @@
+import os
+import sys
+import json
+import logging
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Environment import Environment
+from lib.Simulation import simulate
+from lib.Statistics import Statistics
+
+SEASONALITY = os.path.join(APP, 'seasonality', 'week.csv')
+
+
+def test_counting_events_leaves_the_ids_alone():
+    env = Environment()
+    for delay in range(5):
+        env.timeout(delay)
+
+    # asking for the number of events does not schedule or consume anything
+    assert env.events() == 5, "Expected the number of scheduled events"
+    assert env.events() == 5, "Expected the same number when asked twice"
+
+    env.run()
+    first = env.timeout(1)
+    assert env.events() == 6, "Expected the next event to be counted"
+
+    # and the events happen as scheduled
+    second = env.timeout(1)
+    env.run()
+    assert first.processed and second.processed, "Expected both events to happen"
+
+
+def test_simulation_logs_instead_of_printing(tmp_path, capsys, caplog):
+    with open(os.path.join(APP, 'one_low.json')) as f:
+        config = json.load(f)
+    config.update(seed=1, runtime=60, max_volume=10, hybrid={})
+
+    with caplog.at_level(logging.INFO, logger='lib.Simulation'):
+        simulate(1, config, SEASONALITY, str(tmp_path), 'log', 'logging', statistics=Statistics())
+
+    assert capsys.readouterr().out == "", "Expected nothing on the standard output"
+    assert any(record.name == 'lib.Simulation' and record.getMessage().startswith('Hybrid:')
+               for record in caplog.records), "Expected the report of the hybrid mode in the log"
@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import logging
+
+import numpy as np
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Simulation import simulate
+from lib.Statistics import Statistics
+
+
+def seasonality(path, points):
+    with open(path, 'w') as f:
+        f.write("time;scaler_value\n")
+        f.writelines(f"{time};{scaler}\n" for (time, scaler) in points)
+    return str(path)
+
+
+def configuration(**kwargs):
+    with open(os.path.join(APP, 'one_low.json')) as f:
+        config = json.load(f)
+    config.update(runtime=900, max_volume=40, hybrid={"threshold": 0.1}, **kwargs)
+    return config
+
+
+def run(tmp_path, config, curve):
+    statistics = Statistics()
+    log = simulate(1, config, curve, str(tmp_path), 'log', 'hybrid', statistics=statistics)
+    return statistics.summary(), log
+
+
+def test_fluid_steps_draw_from_the_streams(tmp_path):
+    # a busy start, followed by a quiet period that is advanced with the fluid model
+    curve = seasonality(tmp_path / 'load.csv', [(0, 1.0), (300, 0.05), (3600, 0.05)])
+
+    # with common random numbers nothing draws from the global generator, so
+    # its state does not matter
+    summaries = []
+    for state in (1, 2):
+        np.random.seed(state)
+        summary, _ = run(tmp_path, configuration(crn=True), curve)
+        summaries.append((summary['transactions'], summary['timeouts'], summary['latency']))
+
+    assert summaries[0] == summaries[1], "Expected the same run regardless of the global generator"
+
+
+def test_mix_is_evaluated_every_step(tmp_path):
+    logging.getLogger().setLevel(logging.INFO)
+    curve = seasonality(tmp_path / 'load.csv', [(0, 1.0), (300, 0.05), (3600, 0.05)])
+
+    # the weight of the second process drops to zero once the system is quiet
+    weight = seasonality(tmp_path / 'weight.csv', [(0, 1.0), (600, 0.0), (3600, 0.0)])
+    config = configuration(seed=1, process=[["balance"], ["credit"]],
+                           mix=[{}, {"seasonality": weight}])
+    _, log = run(tmp_path, config, curve)
+
+    with open(tmp_path / f"{log}.csv") as f:
+        steps = [line.split(';') for line in f if ';FLUID;' in line]
+
+    credit = [float(step[-1].split()[0]) for step in steps if step[1].startswith('credit') and float(step[0]) > 400]
+    balance = [float(step[-1].split()[0]) for step in steps if step[1].startswith('balance') and float(step[0]) > 400]
+    assert credit and balance, "Expected fluid steps of both kinds"
+    assert all(messages == 0 for messages in credit), "Expected no messages of a process without weight"
+    assert all(messages > 0 for messages in balance), "Expected all messages on the other process"
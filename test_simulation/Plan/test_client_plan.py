@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Simulation import simulate
+from lib.Records import load
+
+
+def run(tmp_path, process):
+    config = {
+        "servers": [{"size": 1, "capacity": 100, "kind": kind} for kind in ("balance", "payment", "credit")],
+        "process": [process],
+        "timeout": 5,
+        "runtime": 30,
+        "max_volume": 70,
+        "seed": 1,
+    }
+
+    name = simulate(1, config, os.path.join(APP, 'seasonality', 'week.csv'), str(tmp_path), 'test', 'plan',
+                    records=True)
+
+    (transactions, hops) = load(os.path.join(str(tmp_path), f"records-{name}.npz"))
+    assert len(transactions), "Expected transactions, got none"
+
+    # only the processed messages, the failed ones are hops too
+    return (transactions, hops[hops['outcome'] == 'ok'])
+
+
+def test_any_succeeds_on_the_healthy_branch(tmp_path):
+    (transactions, hops) = run(tmp_path, ["balance", {"any": [{"hop": "payment", "timeout": 0.00001}, "credit"]}])
+
+    outcomes = set(transactions['outcome'])
+    assert outcomes == {'ok'}, f"Expected only ok, got {outcomes}"
+
+    # the healthy branch wasn't cancelled
+    credit = (hops['kind'] == 'credit').sum()
+    assert credit == len(transactions), f"Expected {len(transactions)} credit hops, got {credit}"
+
+
+def test_all_fails_on_a_failing_branch(tmp_path):
+    (transactions, hops) = run(tmp_path, ["balance", {"all": [{"hop": "payment", "timeout": 0.00001}, "credit"]},
+                                          "credit"])
+
+    # only the rare payment that is faster than its timeout succeeds
+    paid = hops[hops['kind'] == 'payment']['transaction'].unique()
+    ok = transactions.index[transactions['outcome'] == 'ok']
+    assert set(ok) == set(paid), "Expected the transactions with a payment to be ok"
+    assert len(ok) < len(transactions) / 2, f"Expected most transactions to time out, got {len(ok)} ok"
+
+    failed = transactions[transactions['outcome'] != 'ok']
+    outcomes = set(failed['outcome'])
+    assert outcomes == {'timeout'}, f"Expected only timeout, got {outcomes}"
+
+    # a failed transaction doesn't continue after the failed node
+    after = hops[hops['transaction'].isin(failed.index)].groupby('transaction').size().max()
+    assert after <= 2, f"Expected at most 2 hops per failed transaction, got {after}"
+
+
+def test_any_fails_when_all_branches_fail(tmp_path):
+    (transactions, hops) = run(tmp_path, ["balance", {"any": [{"hop": "payment", "timeout": 0.00001},
+                                                              {"hop": "credit", "timeout": 0.00001}]}])
+
+    # only a transaction with a branch that was faster than its timeout is ok
+    succeeded = hops[hops['kind'] != 'balance']['transaction'].unique()
+    ok = transactions.index[transactions['outcome'] == 'ok']
+    assert set(ok) == set(succeeded), "Expected the transactions with a processed branch to be ok"
+    assert len(ok) < len(transactions) / 2, f"Expected most transactions to time out, got {len(ok)} ok"
+
+    outcomes = set(transactions['outcome']) - {'ok'}
+    assert outcomes == {'timeout'}, f"Expected only timeout, got {outcomes}"
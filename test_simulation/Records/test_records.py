@@ -0,0 +1,98 @@
+import os
+import sys
+import zipfile
+
+import pytest
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Environment import Environment
+from lib.Simulation import simulate
+from lib.Records import Records, critical, load
+
+
+class Server(object):
+
+    def __init__(self, name):
+        self._name = name
+
+    def name(self):
+        return self._name
+
+
+def run(tmp_path, process):
+    config = {
+        "servers": [{"size": 1, "capacity": 100, "kind": kind} for kind in ("balance", "payment", "credit")],
+        "process": [process],
+        "timeout": 5,
+        "runtime": 30,
+        "max_volume": 70,
+        "seed": 1,
+    }
+
+    name = simulate(1, config, os.path.join(APP, 'seasonality', 'week.csv'), str(tmp_path), 'test', 'records',
+                    records=True)
+
+    return load(os.path.join(str(tmp_path), f"records-{name}.npz"))
+
+
+def test_critical_path_of_parallel_branches():
+    hop = lambda name, start, end, outcome='ok': {"server": name, "start": start, "end": end, "outcome": outcome}
+
+    # the join waits for the longest branch
+    hops = [hop('a', 0, 1), hop('b', 1, 3), hop('c', 1, 2), hop('d', 3, 4)]
+    assert [row['server'] for row in critical(hops)] == ['a', 'b', 'd'], "Expected the longest branch"
+
+    # the first branch that succeeds cancels the others
+    hops = [hop('a', 0, 1), hop('b', 1, 2, 'cancelled'), hop('c', 1, 2), hop('d', 2, 3)]
+    assert [row['server'] for row in critical(hops)] == ['a', 'c', 'd'], "Expected the branch that succeeded"
+
+
+def test_failed_hops_are_recorded(tmp_path):
+    (transactions, hops) = run(tmp_path, ["balance", {"any": [{"hop": "payment", "timeout": 0.00001}, "credit"]}])
+
+    payment = hops[hops['kind'] == 'payment']
+    assert len(payment), "Expected the failed payments to be hops"
+    assert 'timeout' in set(payment['outcome']), "Expected payments that timed out"
+
+    # the transaction only waited for the branch that succeeded
+    assert not hops[hops['outcome'] != 'ok']['critical'].any(), "Expected failed hops off the critical path"
+
+
+def test_all_waits_for_the_longest_branch(tmp_path):
+    (transactions, hops) = run(tmp_path, ["balance", {"all": ["payment", "credit"]}])
+    hops = hops.assign(duration=hops['wait'] + hops['service'])
+
+    branches = hops[hops['kind'] != 'balance'].groupby('transaction')['duration'].max()
+    balance = hops[hops['kind'] == 'balance'].set_index('transaction')['duration']
+    expected = (balance + branches).reindex(transactions.index)
+
+    recorded = transactions['wait'] + transactions['service']
+    assert recorded.to_numpy() == pytest.approx(expected.to_numpy()), "Expected balance and the longest branch"
+    assert (hops[hops['kind'] != 'balance'].groupby('transaction')['critical'].sum() == 1).all(), \
+        "Expected a single branch on the critical path"
+
+
+def test_records_are_written_in_chunks(tmp_path):
+    env = Environment()
+    path = os.path.join(str(tmp_path), 'records.npz')
+    records = Records(env, path, chunk=2)
+
+    for index in range(5):
+        records.notify('hop', {"id": index, "kind": 'a', "server": Server('a#1'), "wait": 0.0, "latency": 0.0})
+        records.notify('transaction', {"id": index, "start": 0.0, "end": 0.0})
+
+    # the complete chunks are written before the simulation is done
+    assert os.path.getsize(path) > 0, "Expected the first chunks to be written"
+    records.write()
+
+    with zipfile.ZipFile(path) as f:
+        chunks = [name for name in f.namelist() if name.startswith('id.')]
+    assert len(chunks) == 3, f"Expected 3 chunks, got {chunks}"
+
+    (transactions, hops) = load(path)
+    assert len(records) == 5, "Expected 5 transactions recorded"
+    assert list(transactions['id']) == [str(index) for index in range(5)], "Expected the transactions in order"
+    assert list(hops['transaction']) == list(range(5)), "Expected every hop to refer to its transaction"
@@ -0,0 +1,67 @@
+import os
+import sys
+import logging
+
+import pytest
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+flask = pytest.importorskip('flask')
+
+import routes
+from lib.Registry import Registry
+from lib.Simulation import simulate
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # the routes and the command line share a registry, but not a log directory
+    registry = Registry(str(tmp_path / 'simulations.db'))
+    monkeypatch.setattr(routes, 'Registry', lambda: registry)
+    monkeypatch.setattr(routes, 'LOG_PATH', str(tmp_path / 'logs'))
+
+    app = flask.Flask(__name__)
+    routes.install(app, None)
+
+    return (app.test_client(), registry)
+
+
+def test_logfile_of_another_directory(tmp_path, client):
+    (client, registry) = client
+
+    # the logfiles are only written at the info level
+    logging.getLogger().setLevel(logging.INFO)
+
+    # a simulation of the command line writes to its own directory
+    config = {"servers": [{"size": 1, "capacity": 10, "kind": "balance"}], "process": [["balance"]],
+              "timeout": 5, "runtime": 5, "max_volume": 5, "seed": 1}
+    os.makedirs(tmp_path / 'Logs')
+    n = registry.reserve(description='cli')
+    name = simulate(n, config, os.path.join(APP, 'seasonality', 'week.csv'), str(tmp_path / 'Logs'), 'log', 'cli',
+                    registry=registry)
+
+    response = client.get(f'/get_endpoint_data?f={name}.csv')
+    assert response.status_code == 200, f"Expected the logfile to be found, got {response.status_code}"
+    assert response.get_json()['links'], "Expected the links between the servers"
+
+    response = client.get('/get_endpoint_data?f=log_9999_2020-01-01_00-00_missing.csv')
+    assert response.status_code == 404, f"Expected an unknown logfile to be not found, got {response.status_code}"
+
+
+def test_failed_simulation_gives_up_its_id(tmp_path, client):
+    (client, registry) = client
+
+    n = registry.reserve(description='fails')
+    with pytest.raises(KeyError):
+        simulate(n, {"servers": []}, os.path.join(APP, 'seasonality', 'week.csv'), str(tmp_path), 'log', 'fails',
+                 registry=registry)
+    registry.discard(n)
+
+    assert registry.get(n) is None, "Expected the reservation to be discarded"
+
+    # a registered simulation is kept
+    registry.register(n + 1, 'log_done', log_file='done.csv')
+    registry.discard(n + 1)
+    assert registry.get(n + 1) is not None, "Expected a registered simulation to be kept"
@@ -0,0 +1,70 @@
+import os
+import sys
+import logging
+
+import pandas as pd
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Simulation import simulate
+from lib.Sampling import SampledLogger
+
+
+class Lines(object):
+
+    def __init__(self):
+        self.lines = []
+
+    def log(self, message, level=20):
+        self.lines.append(message)
+
+
+def sample(seed):
+    lines = Lines()
+    logger = SampledLogger(lines, {"mode": "head", "rate": 0.5}, seed=seed)
+
+    # two lines of every transaction, and the transactions end in between
+    for index in range(100):
+        logger.log(f"{index};server;INFO;;;;{index};client;Requesting")
+    for index in range(100):
+        logger.log(f"{index};server;INFO;;;;{index};server;Requesting")
+        logger.notify('transaction', {"id": index})
+
+    return lines.lines
+
+
+def test_same_seed_same_sample():
+    lines = sample(1)
+    assert lines == sample(1), "Expected the same sample for the same seed"
+    assert lines != sample(2), "Expected another sample for another seed"
+
+    # a transaction is either complete or not in the log at all
+    ids = pd.Series([line.split(';')[6] for line in lines]).value_counts()
+    assert (ids == 2).all(), "Expected both lines of the sampled transactions"
+    assert 25 < len(ids) < 75, f"Expected about half of the transactions, got {len(ids)}"
+
+
+def test_simulation_samples_the_same_transactions(tmp_path):
+    logging.getLogger().setLevel(logging.INFO)
+    config = {
+        "servers": [{"size": 1, "capacity": 100, "kind": kind} for kind in ("balance", "payment")],
+        "process": [["balance", "payment"]],
+        "timeout": 5,
+        "runtime": 30,
+        "max_volume": 70,
+        "seed": 1,
+        "sampling": {"mode": "head", "rate": 0.1},
+    }
+
+    logs = []
+    for n in (1, 2):
+        directory = tmp_path / str(n)
+        os.makedirs(directory)
+        name = simulate(n, config, os.path.join(APP, 'seasonality', 'week.csv'), str(directory), 'test', 'sampling')
+        logs.append(pd.read_csv(directory / f"{name}.csv", sep=';'))
+
+    # the ids of the transactions differ between runs, when they're logged doesn't
+    assert len(logs[0]), "Expected a sample of the lines"
+    assert list(logs[0]['Time']) == list(logs[1]['Time']), "Expected the same lines in both runs"
@@ -0,0 +1,50 @@
+import os
+import sys
+import logging
+
+import pytest
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Simulation import simulate
+from lib.LogProcessing import read_log, weighted_metrics
+
+CONFIG = {
+    "servers": [{"size": 2, "capacity": 100, "kind": kind} for kind in ("balance", "payment")],
+    "process": [["balance", "payment"]],
+    "timeout": 5,
+    "runtime": 60,
+    "max_volume": 70,
+    "seed": 1,
+    "crn": True,
+}
+
+
+def metrics(tmp_path, name, **kwargs):
+    logging.getLogger().setLevel(logging.INFO)
+    directory = tmp_path / name
+    os.makedirs(directory)
+    log = simulate(1, dict(CONFIG, **kwargs), os.path.join(APP, 'seasonality', 'week.csv'), str(directory),
+                   'test', name)
+
+    # the servers are new in every run, their kind is the same
+    df = read_log(str(directory / f"{log}.csv"))
+    df = df[df['Message_type'] == 'INFO'].assign(Kind=lambda df: df['Server'].str.split('#').str[0])
+    return df, weighted_metrics(df, ['Kind']).set_index('Kind')
+
+
+@pytest.mark.parametrize('sampling', [{"mode": "head", "rate": 0.3}, {"mode": "reservoir", "size": 2}])
+def test_sample_estimates_the_full_log(tmp_path, sampling):
+    full, expected = metrics(tmp_path, 'full')
+    sample, estimated = metrics(tmp_path, 'sampled', sampling=sampling)
+
+    assert (full['Weight'] == 1).all(), "Expected every line of the full log to stand for itself"
+    assert len(sample) < len(full) / 2, "Expected a sample of the lines"
+
+    for kind in ('balance', 'payment'):
+        assert estimated.loc[kind, 'Messages'] == pytest.approx(expected.loc[kind, 'Messages'], rel=0.2), \
+            f"Expected the number of messages on {kind}"
+        assert estimated.loc[kind, 'Latency'] == pytest.approx(expected.loc[kind, 'Latency'], rel=0.2), \
+            f"Expected the mean latency on {kind}"
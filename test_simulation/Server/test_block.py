@@ -0,0 +1,88 @@
+import os
+import sys
+
+from simpy import Environment, Interrupt
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Server import Server, Rejected
+
+
+def user(env, server, name, arrival, outcomes):
+    yield env.timeout(arrival)
+    request = server.request(preempt=False)
+    try:
+        yield request
+        outcomes[name] = ('granted', env.now)
+        yield env.timeout(10)
+        outcomes[name] = ('done', env.now)
+    except Interrupt:
+        outcomes[name] = ('preempted', env.now)
+    except Rejected as cause:
+        outcomes[name] = (str(cause), env.now)
+    finally:
+        server.release(request)
+
+
+def failure(env, server, start, end, **kwargs):
+    yield env.timeout(start)
+    server.block(**kwargs)
+    yield env.timeout(end - start)
+    server.unblock(**kwargs)
+
+
+def test_block_preempts_and_queues():
+    env = Environment()
+    server = Server(env, 2, kind='balance', uuid='a')
+    outcomes = {}
+
+    # a and b are served when the server goes down, c arrives while it's down
+    env.process(user(env, server, 'a', 0, outcomes))
+    env.process(user(env, server, 'b', 1, outcomes))
+    env.process(user(env, server, 'c', 3, outcomes))
+    env.process(failure(env, server, 2, 5))
+    env.run()
+
+    assert outcomes['a'] == ('preempted', 2) and outcomes['b'] == ('preempted', 2), \
+        "Expected the messages in process to be preempted"
+    assert outcomes['c'] == ('done', 15), "Expected the queued message to be served once unblocked"
+    assert not server.blocked() and not server.users, "Expected the server to be free again"
+
+
+def test_overlapping_blocks():
+    env = Environment()
+    server = Server(env, 1, kind='balance', uuid='a')
+    outcomes = {}
+
+    # two failures overlap, the server is only up when both are over
+    env.process(failure(env, server, 1, 4))
+    env.process(failure(env, server, 2, 6))
+    env.process(user(env, server, 'a', 3, outcomes))
+    env.run()
+
+    assert outcomes['a'] == ('done', 16), "Expected the message to wait for both failures"
+
+
+def test_block_with_reject_and_drain():
+    env = Environment()
+    server = Server(env, 1, kind='balance', uuid='a')
+    outcomes = {}
+
+    # a holds the server, b waits in the queue when it starts to reject
+    env.process(user(env, server, 'a', 0, outcomes))
+    env.process(user(env, server, 'b', 1, outcomes))
+    env.process(user(env, server, 'c', 3, outcomes))
+    env.process(user(env, server, 'd', 5, outcomes))
+    env.process(failure(env, server, 2, 4, reject=True, drain=True))
+
+    env.run(until=3.5)
+    assert server.drained(), "Expected the load balancer to skip the server"
+    env.run()
+
+    assert outcomes['a'] == ('preempted', 2), "Expected the message in process to be preempted"
+    assert outcomes['b'] == ('SERVER BLOCKED', 2), "Expected the queue to be rejected"
+    assert outcomes['c'] == ('SERVER BLOCKED', 3), "Expected new messages to be rejected"
+    assert outcomes['d'] == ('done', 15), "Expected messages to be served after the failure"
+    assert not server.drained(), "Expected the load balancer to use the server again"
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+from simpy import Environment
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Server import Server, Rejected
+
+
+def user(env, server, name, arrival, priority, outcomes):
+    yield env.timeout(arrival)
+    request = server.request(priority=priority, preempt=False)
+    try:
+        yield request
+    except Rejected as cause:
+        outcomes[name] = cause.policy
+        return
+
+    outcomes[name] = env.now
+    yield env.timeout(1)
+    server.release(request)
+
+
+def run(policy):
+    env = Environment()
+    server = Server(env, 1, kind='balance', uuid='a', shedding=policy, queue=2)
+
+    # a is served, b and c fill the queue, and d arrives at a full queue
+    outcomes = {}
+    for (name, arrival, priority) in (('a', 0, 1), ('b', 0.1, 1), ('c', 0.2, 2), ('d', 0.3, 1)):
+        env.process(user(env, server, name, arrival, priority, outcomes))
+    env.run()
+    return outcomes
+
+
+@pytest.mark.parametrize('policy,victim', [('drop-newest', 'd'), ('drop-oldest', 'b'), ('priority', 'c')])
+def test_policy_sheds_its_victim(policy, victim):
+    outcomes = run(policy)
+
+    assert outcomes[victim] == policy, f"Expected {victim} to be shed with {policy}"
+    granted = [name for (name, outcome) in outcomes.items() if name != victim]
+    assert all(isinstance(outcomes[name], (int, float)) for name in granted), "Expected the others to be served"
+
+
+def test_priority_serves_the_important_requests_first():
+    outcomes = run('priority')
+
+    # d has a higher priority than the c it replaced, so it's served after b
+    assert outcomes['a'] == 0 and outcomes['b'] == 1 and outcomes['d'] == 2, "Expected a, b and d in turn"
+
+
+def test_unbounded_without_policy():
+    env = Environment()
+    server = Server(env, 1, kind='balance', uuid='a', queue=2)
+
+    outcomes = {}
+    for (index, name) in enumerate('abcde'):
+        env.process(user(env, server, name, index / 10, 1, outcomes))
+    env.run()
+
+    assert sorted(outcomes.values()) == [0, 1, 2, 3, 4], "Expected every request to be served in turn"
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        Server(Environment(), 1, kind='balance', uuid='a', shedding='drop-random')
@@ -0,0 +1,61 @@
+import os
+import sys
+import json
+
+import pytest
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Simulation import simulate
+from lib.Sharding import simulate as simulate_sharded
+from lib.Statistics import Statistics
+
+SEASONALITY = os.path.join(APP, 'seasonality', 'week.csv')
+
+
+def configuration(name, runtime):
+    with open(os.path.join(APP, name)) as f:
+        config = json.load(f)
+
+    # the shards draw from the common random numbers, and need a latency
+    config.update(seed=3, crn=True, network_latency=0.01, runtime=runtime)
+    return config
+
+
+@pytest.mark.parametrize('name,runtime,shards', [
+    ('one_low.json', 100, 2),
+    ('one_low.json', 100, 4),
+    ('one_high.json', 30, 2),
+])
+def test_same_results_as_a_single_process(tmp_path, name, runtime, shards):
+    config = configuration(name, runtime)
+
+    single = Statistics()
+    simulate(1, config, SEASONALITY, str(tmp_path), 'log', 'single', statistics=single)
+
+    sharded = Statistics()
+    simulate_sharded(2, config, SEASONALITY, str(tmp_path), 'log', 'sharded', statistics=sharded, shards=shards)
+
+    assert single.transactions > 0, "Expected transactions to be processed"
+    assert sharded.transactions == single.transactions, "Expected the same transactions"
+    assert sharded.timeouts == single.timeouts, "Expected the same timeouts"
+    assert sharded.hops == single.hops, "Expected the same hops"
+    assert sharded.latency.mean() == pytest.approx(single.latency.mean()), "Expected the same latency"
+
+
+@pytest.mark.parametrize('name', ['config.json', 'one_error.json'])
+def test_errors_are_not_supported(tmp_path, name):
+    config = configuration(name, 10)
+
+    with pytest.raises(ValueError, match="does not support error"):
+        simulate_sharded(1, config, SEASONALITY, str(tmp_path), 'log', 'sharded')
+
+
+def test_autoscaling_is_not_supported(tmp_path):
+    config = configuration('one_low.json', 10)
+    config['servers'][0]['autoscaling'] = {"max": 2}
+
+    with pytest.raises(ValueError, match="does not support autoscaling"):
+        simulate_sharded(1, config, SEASONALITY, str(tmp_path), 'log', 'sharded')
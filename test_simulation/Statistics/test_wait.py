@@ -0,0 +1,52 @@
+import os
+import sys
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Environment import Environment
+from lib.Servers import Servers
+from lib.MessageGenerator import MessageGenerator
+from lib.Statistics import Statistics
+
+
+class Client(object):
+
+    # messages are processed as by the generator of a simulation
+    server_message = MessageGenerator.server_message
+
+    def __init__(self, env):
+        self._env = env
+        self._timeout = 1
+
+
+def send(env, client, server, timeout):
+    request = server.request()
+    message = env.process(client.server_message('transaction', {"name": 'client', "kind": 'client'}, request, server))
+    yield message | env.timeout(timeout)
+
+    if not message.triggered:
+        message.interrupt("TIMEOUT")
+
+
+def test_timed_out_message_waits_in_histogram():
+    env = Environment()
+    statistics = Statistics()
+    env.observer(statistics)
+
+    server = Servers(env, size=1, capacity=1, kind='a').servers()[0]
+
+    # another transaction holds the only slot of the server
+    held = server.request()
+    env.run(until=1)
+    assert held.triggered, "Expected the slot to be held"
+
+    # the message waits in the queue until it times out
+    env.process(send(env, Client(env), server, 2))
+    env.run(until=5)
+
+    wait = statistics.servers[server.name()]['wait']
+    assert statistics.hops == 0, "Expected the message not to be processed"
+    assert wait.count == 1, "Expected the wait of the timed out message"
+    assert abs(wait.max - 2) < 1e-9, "Expected the message to wait until it timed out"
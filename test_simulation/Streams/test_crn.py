@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import logging
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+from lib.Simulation import simulate
+from lib.Statistics import Statistics
+from lib.Streams import Streams
+
+SEASONALITY = os.path.join(APP, 'seasonality', 'week.csv')
+
+
+class Arrivals(Statistics):
+    """
+    Statistics that also remember when the transactions arrived.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.arrivals = []
+
+    def notify(self, event, data):
+        if event == 'transaction':
+            self.arrivals.append(data['start'])
+        super().notify(event, data)
+
+
+def run(tmp_path, size, crn):
+    logging.getLogger().setLevel(logging.INFO)
+    with open(os.path.join(APP, 'one_error.json')) as f:
+        config = json.load(f)
+    config.update(seed=1, runtime=60, crn=crn)
+
+    # the variant has more balance servers, so routing draws more random numbers
+    config['servers'][0]['size'] = size
+
+    directory = tmp_path / f"{size}-{crn}"
+    os.makedirs(directory)
+    statistics = Arrivals()
+    log = simulate(1, config, SEASONALITY, str(directory), 'log', 'crn', statistics=statistics)
+
+    # the moments the errors started and stopped, the servers have new names
+    with open(directory / f"error-{log}.csv") as f:
+        errors = [line.split(';')[0] for line in f if line[0].isdigit()]
+
+    # the transactions that arrive within a few timeouts of the end may still be in flight
+    return sorted(start for start in statistics.arrivals if start < 60 - 3 * config['timeout']), errors
+
+
+def test_streams_are_independent():
+    # drawing from one stream does not shift another
+    first, second = Streams(1), Streams(1)
+    first.stream('routing.balance').random_sample(1000)
+
+    assert (first.stream('arrivals').random_sample(10) == second.stream('arrivals').random_sample(10)).all(), \
+        "Expected the arrivals regardless of the routing"
+    assert (Streams(1).stream('arrivals').random_sample(10) != Streams(2).stream('arrivals').random_sample(10)).any(), \
+        "Expected other arrivals with another seed"
+
+
+def test_variants_see_the_same_arrivals(tmp_path):
+    one, three = run(tmp_path, 1, True), run(tmp_path, 3, True)
+
+    assert one[0] and one[0] == three[0], "Expected the same arrivals in both variants"
+    assert one[1] and one[1] == three[1], "Expected the same errors in both variants"
+
+    # without common random numbers the routing shifts the arrivals
+    assert run(tmp_path, 1, False)[0] != run(tmp_path, 3, False)[0], "Expected other arrivals without crn"
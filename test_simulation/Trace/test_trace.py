@@ -0,0 +1,94 @@
+import os
+import sys
+import math
+
+import pytest
+
+# Adjust location of the simulation relative to this test file
+APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../app'))
+sys.path.insert(0, APP)
+
+import lib.Trace
+from lib.Trace import Trace, TraceInterval
+from lib.Simulation import simulate
+from lib.Statistics import Statistics
+
+
+def write(tmp_path, rows, name='trace.csv'):
+    path = str(tmp_path / name)
+    with open(path, 'w') as f:
+        f.write("time;process\n")
+        f.writelines(f"{time};{process}\n" for (time, process) in rows)
+    return path
+
+
+def replay(interval):
+    moments, now = [], 0.0
+    while True:
+        step = interval.interval(now)
+        if math.isinf(step):
+            return moments
+        now += step
+        moments.append(now)
+
+
+def test_empty_trace(tmp_path):
+    path = write(tmp_path, [])
+
+    with pytest.raises(ValueError, match=f"trace {path} has no arrivals"):
+        TraceInterval(path)
+
+
+def test_process_without_arrivals(tmp_path):
+    path = write(tmp_path, [(0, 0), (1, 0)])
+    interval = TraceInterval(Trace(path, processes=[0, 1]), process=1)
+
+    with pytest.raises(ValueError, match=f"trace {path} has no arrivals of process 1"):
+        interval.interval(0)
+
+
+def test_unsorted_trace(tmp_path):
+    path = write(tmp_path, [(0, 0), (2, 0), (1, 0)])
+
+    with pytest.raises(ValueError, match="is not sorted by time, at arrival 2"):
+        replay(TraceInterval(path))
+
+
+def test_processes_share_a_single_read(tmp_path, monkeypatch):
+    rows = [(time, time % 3) for time in range(30)]
+    path = write(tmp_path, rows)
+
+    # count the times the trace is read, apart from its first arrival
+    reads = []
+    chunks = lib.Trace.chunks
+    monkeypatch.setattr(lib.Trace, 'chunks', lambda path, size=4096: reads.append(size) or chunks(path, size))
+
+    trace = Trace(path, processes=range(3), size=4)
+    intervals = [TraceInterval(trace, process=process) for process in range(3)]
+    moments = [replay(interval) for interval in intervals]
+
+    assert [size for size in reads if size != 1] == [4], "Expected the trace to be read once"
+    for process in range(3):
+        expected = [float(time) for (time, other) in rows if other == process]
+        assert moments[process] == expected, f"Expected the arrivals of process {process}"
+
+
+@pytest.mark.parametrize('loop,transactions', [(False, 200), (True, 500)])
+def test_simulation_replays_the_trace(tmp_path, loop, transactions):
+    # two processes that arrive in turns, every 0.1 second, for 20 seconds
+    path = write(tmp_path, [(index * 0.1, index % 2) for index in range(200)])
+    config = {
+        "servers": [{"size": 1, "capacity": 100, "kind": kind} for kind in ("a", "b")],
+        "process": [["a"], ["b"]],
+        "timeout": 5,
+        "runtime": 50,
+        "max_volume": 50,
+        "seed": 1,
+        "trace": {"path": path, "loop": loop},
+    }
+
+    statistics = Statistics()
+    simulate(1, config, os.path.join(APP, 'seasonality', 'week.csv'), str(tmp_path), 'test', 'trace',
+             statistics=statistics)
+
+    assert statistics.transactions == transactions, f"Expected {transactions} transactions"